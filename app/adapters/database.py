@@ -1,11 +1,66 @@
+import asyncio
+import functools
+import logging
+import random
+import re
 import ssl
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Iterator
+from collections.abc import Mapping
+from collections.abc import Sequence
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from types import TracebackType
 from typing import Any
 from typing import Type
+from typing import TypeVar
 
+import asyncpg
 from databases import Database as _Database
 from databases.core import Connection
 from databases.core import Transaction
+from opentelemetry.trace import Span
+from opentelemetry.trace import SpanKind
+
+from app import metrics
+from app import tracing
+
+T = TypeVar("T")
+
+LOGGER = logging.getLogger(__name__)
+
+# how often we're willing to EXPLAIN the same (slow) query shape
+EXPLAIN_COOLDOWN_SECONDS = 300
+
+# selects the native asyncpg adapter, rather than the `databases` one
+ASYNCPG_SCHEME = "asyncpg"
+# per connection, for asyncpg's prepared statements
+STATEMENT_CACHE_SIZE = 1024
+# connection lifetimes are shortened by up to this fraction, such
+# that connections opened together aren't all recycled together
+CONNECTION_LIFETIME_JITTER = 0.1
+# the most recent acquire waits kept, for adaptive pool sizing
+ACQUIRE_WAITS_WINDOW = 10_000
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMERIC_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAM_RE = re.compile(r"(?<!:):[a-zA-Z_]\w*")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+# string literals are matched (and skipped), so that they're left as-is
+_NAMED_PARAM_RE = re.compile(r"'(?:[^']|'')*'|(?<!:):([a-zA-Z_]\w*)")
+
+
+def _server_settings(statement_timeout_ms: int | None) -> dict[str, str]:
+    if statement_timeout_ms is None:
+        return {}
+    return {"statement_timeout": str(statement_timeout_ms)}
 
 
 def _create_pool(
@@ -13,12 +68,17 @@ def _create_pool(
     min_pool_size: int,
     max_pool_size: int,
     ssl: bool | ssl.SSLContext,
+    statement_timeout_ms: int | None,
+    init: Callable[[asyncpg.Connection], Awaitable[None]],
 ) -> _Database:
+    # NOTE: `databases` passes unknown options through to asyncpg's pool
     return _Database(
         url=dsn,
         min_size=min_pool_size,
         max_size=max_pool_size,
         ssl=ssl,
+        server_settings=_server_settings(statement_timeout_ms),
+        init=init,
     )
 
 
@@ -35,20 +95,98 @@ def dsn(
     return f"{scheme}://{user}:{password}@{host}:{port}/{database}"
 
 
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query: str) -> str:
+    """\
+    Normalize a query into a fingerprint, such that queries of
+    the same shape (but with differing values) group together.
+    """
+    query = _STRING_LITERAL_RE.sub("?", query)
+    query = _NUMERIC_LITERAL_RE.sub("?", query)
+    query = _BIND_PARAM_RE.sub("?", query)
+    query = _IN_LIST_RE.sub("IN (...)", query)
+    return _WHITESPACE_RE.sub(" ", query).strip()
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def positional(query: str) -> tuple[str, tuple[str, ...]]:
+    """\
+    Convert a query's named (`:name`) parameters into postgres' positional
+    (`$1`) ones, returning the names in the order of their positions.
+    """
+    names: list[str] = []
+
+    def replace(match: re.Match[str]) -> str:
+        name = match[1]
+        if name is None:
+            return match[0]
+
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    return _NAMED_PARAM_RE.sub(replace, query), tuple(names)
+
+
+@dataclass(frozen=True, slots=True)
+class _QueryStats:
+    operation: str
+    query: str
+    acquire_seconds: float
+    query_seconds: float
+    rows: int | None
+
+
+@contextmanager
+def _query_span(operation: str, query: str) -> Iterator[Span]:
+    with tracing.tracer.start_as_current_span(
+        f"db.{operation}",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": "postgresql",
+            "db.operation": operation,
+            "db.statement": query,
+        },
+    ) as span:
+        yield span
+
+
 class Database:
+    """\
+    A database, through the `databases` library.
+
+    Queries are timed, traced & logged when slow here, while the driver-level
+    operations (`_fetch_all` & co.) are overridden by other adapters.
+    """
+
     def __init__(
         self,
         dsn: str,
         db_ssl: bool | ssl.SSLContext,
         min_pool_size: int,
         max_pool_size: int,
+        name: str,
+        slow_query_threshold_ms: int,
+        explain_slow_queries: bool = False,
+        statement_timeout_ms: int | None = None,
     ) -> None:
         self.pool = _create_pool(
             dsn,
             min_pool_size,
             max_pool_size,
             db_ssl,
+            statement_timeout_ms,
+            init=self._init_connection,
         )
+        self.min_pool_size = min_pool_size
+        self.max_pool_size = max_pool_size
+        self.name = name
+        self.slow_query_threshold_ms = slow_query_threshold_ms
+        self.explain_slow_queries = explain_slow_queries
+
+        self._explained_at: dict[str, float] = {}
+        self._background_tasks: set[asyncio.Task[None]] = set()
+        self._acquire_waits: deque[float] = deque(maxlen=ACQUIRE_WAITS_WINDOW)
 
     async def __aenter__(self) -> "Database":
         await self.connect()
@@ -82,40 +220,603 @@ class Database:
     async def disconnect(self) -> None:
         await self.pool.disconnect()
 
+    # NOTE: `databases` doesn't expose pool statistics,
+    # so we reach into the underlying asyncpg pool.
+    def _asyncpg_pool(self) -> asyncpg.Pool | None:
+        return self.pool._backend._pool  # type: ignore[attr-defined]
+
+    def pool_size(self) -> int:
+        asyncpg_pool = self._asyncpg_pool()
+        return asyncpg_pool.get_size() if asyncpg_pool is not None else 0
+
+    def pool_idle_size(self) -> int:
+        asyncpg_pool = self._asyncpg_pool()
+        return asyncpg_pool.get_idle_size() if asyncpg_pool is not None else 0
+
+    def pool_max_size(self) -> int:
+        """The most connections which may be acquired at once."""
+        return self.max_pool_size
+
+    def take_acquire_waits(self) -> list[float]:
+        """The connection acquire waits (in seconds) observed since last taken."""
+        acquire_waits = list(self._acquire_waits)
+        self._acquire_waits.clear()
+        return acquire_waits
+
+    async def _init_connection(self, connection: asyncpg.Connection) -> None:
+        metrics.DB_POOL_CONNECTIONS_OPENED_TOTAL.labels(database=self.name).inc()
+        connection.add_termination_listener(self._on_connection_closed)
+
+    def _on_connection_closed(self, connection: asyncpg.Connection) -> None:
+        metrics.DB_POOL_CONNECTIONS_CLOSED_TOTAL.labels(database=self.name).inc()
+
+    async def _run_query(
+        self,
+        operation: str,
+        query: str,
+        values: dict | list | None,
+        run: Callable[[Any], Awaitable[T]],
+        count_rows: Callable[[T], int] | None = None,
+    ) -> T:
+        with _query_span(operation, query) as span:
+            started_at = time.perf_counter()
+            async with self.connection() as connection:
+                acquired_at = time.perf_counter()
+                result = await run(connection)
+                finished_at = time.perf_counter()
+
+            self._observe_query(
+                _QueryStats(
+                    operation=operation,
+                    query=query,
+                    acquire_seconds=acquired_at - started_at,
+                    query_seconds=finished_at - acquired_at,
+                    rows=count_rows(result) if count_rows is not None else None,
+                ),
+                values,
+                span,
+            )
+
+        return result
+
+    def _observe_query(
+        self,
+        stats: _QueryStats,
+        values: dict | list | None,
+        span: Span,
+    ) -> None:
+        metrics.DB_CONNECTION_ACQUIRE_SECONDS.labels(database=self.name).observe(
+            stats.acquire_seconds
+        )
+        self._acquire_waits.append(stats.acquire_seconds)
+        metrics.DB_STATEMENT_LATENCY_SECONDS.labels(
+            database=self.name,
+            operation=stats.operation,
+        ).observe(stats.query_seconds)
+        span.set_attribute("db.acquire_ms", stats.acquire_seconds * 1000)
+        if stats.rows is not None:
+            metrics.DB_ROWS_RETURNED.labels(operation=stats.operation).observe(
+                stats.rows
+            )
+            span.set_attribute("db.rows", stats.rows)
+
+        if stats.query_seconds * 1000 < self.slow_query_threshold_ms:
+            return
+
+        query_fingerprint = fingerprint(stats.query)
+        LOGGER.warning(
+            "Slow database query",
+            extra={
+                "database": self.name,
+                "operation": stats.operation,
+                "fingerprint": query_fingerprint,
+                "duration_ms": round(stats.query_seconds * 1000, 3),
+                "acquire_ms": round(stats.acquire_seconds * 1000, 3),
+                "rows": stats.rows,
+            },
+        )
+
+        # EXPLAIN only makes sense for single statements
+        if self.explain_slow_queries and not isinstance(values, list):
+            self._schedule_explain(query_fingerprint, stats.query, values)
+
+    def _schedule_explain(
+        self,
+        query_fingerprint: str,
+        query: str,
+        values: dict | None,
+    ) -> None:
+        now = time.monotonic()
+        last_explained_at = self._explained_at.get(query_fingerprint)
+        if (
+            last_explained_at is not None
+            and now - last_explained_at < EXPLAIN_COOLDOWN_SECONDS
+        ):
+            return
+
+        self._explained_at[query_fingerprint] = now
+        task = asyncio.create_task(self._explain(query_fingerprint, query, values))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _explain(
+        self,
+        query_fingerprint: str,
+        query: str,
+        values: dict | None,
+    ) -> None:
+        # NOTE: plain EXPLAIN plans the statement without executing it,
+        # so this is safe for writes as well as reads.
+        try:
+            async with self.connection() as connection:
+                recs = await self._fetch_all(connection, f"EXPLAIN {query}", values)
+        except Exception:
+            LOGGER.warning(
+                "Failed to EXPLAIN slow database query",
+                exc_info=True,
+                extra={"database": self.name, "fingerprint": query_fingerprint},
+            )
+            return
+
+        plan = "\n".join(rec["QUERY PLAN"] for rec in recs)
+        LOGGER.warning(
+            "Slow database query plan",
+            extra={
+                "database": self.name,
+                "fingerprint": query_fingerprint,
+                "plan": plan,
+                "sequential_scan": "Seq Scan" in plan,
+            },
+        )
+
+    # driver-level operations, on an acquired connection
+
+    async def _fetch_one(
+        self,
+        connection: Connection,
+        query: str,
+        values: dict | None,
+    ) -> Mapping[str, Any] | None:
+        rec = await connection.fetch_one(query, values)
+        return dict(rec._mapping) if rec is not None else None
+
+    async def _fetch_all(
+        self,
+        connection: Connection,
+        query: str,
+        values: dict | None,
+    ) -> list[Mapping[str, Any]]:
+        recs = await connection.fetch_all(query, values)
+        return [dict(rec._mapping) for rec in recs]
+
+    async def _fetch_val(
+        self,
+        connection: Connection,
+        query: str,
+        values: dict | None,
+    ) -> Any:
+        return await connection.fetch_val(query, values)
+
+    async def _execute(
+        self,
+        connection: Connection,
+        query: str,
+        values: dict | None,
+    ) -> Any:
+        return await connection.execute(query, values)
+
+    async def _execute_many(
+        self,
+        connection: Connection,
+        query: str,
+        values: list,
+    ) -> None:
+        await connection.execute_many(query, values)
+
+    async def _copy_records_to_table(
+        self,
+        connection: Connection,
+        table: str,
+        records: list[tuple[Any, ...]],
+        columns: Sequence[str],
+    ) -> None:
+        await connection.raw_connection.copy_records_to_table(
+            table,
+            records=records,
+            columns=columns,
+        )
+
+    # NOTE: records are dicts with either adapter, as callers may serialize
+    # (or otherwise need to copy) them.
+
     async def fetch_one(
         self,
         query: str,
         values: dict | None = None,
-    ) -> dict[str, Any] | None:
-        async with self.pool.connection() as connection:
-            rec = await connection.fetch_one(query, values)
+    ) -> Mapping[str, Any] | None:
+        rec = await self._run_query(
+            "fetch_one",
+            query,
+            values,
+            lambda connection: self._fetch_one(connection, query, values),
+            count_rows=lambda rec: 1 if rec is not None else 0,
+        )
 
-        return dict(rec._mapping) if rec is not None else None
+        return rec
 
     async def fetch_all(
         self,
         query: str,
         values: dict | None = None,
-    ) -> list[dict[str, Any]]:
-        async with self.pool.connection() as connection:
-            recs = await connection.fetch_all(query, values)
+    ) -> list[Mapping[str, Any]]:
+        recs = await self._run_query(
+            "fetch_all",
+            query,
+            values,
+            lambda connection: self._fetch_all(connection, query, values),
+            count_rows=len,
+        )
 
-        return [dict(rec._mapping) for rec in recs]
+        return recs
 
     async def fetch_val(self, query: str, values: dict | None = None) -> Any:
-        async with self.pool.connection() as connection:
-            val = await connection.fetch_val(query, values)
+        val = await self._run_query(
+            "fetch_val",
+            query,
+            values,
+            lambda connection: self._fetch_val(connection, query, values),
+            count_rows=lambda val: 1 if val is not None else 0,
+        )
 
         return val
 
     async def execute(self, query: str, values: dict | None = None) -> Any:
-        async with self.pool.connection() as connection:
-            result = await connection.execute(query, values)
+        result = await self._run_query(
+            "execute",
+            query,
+            values,
+            lambda connection: self._execute(connection, query, values),
+        )
 
         return result
 
     async def execute_many(self, query: str, values: list) -> None:
-        async with self.pool.connection() as connection:
-            await connection.execute_many(query, values)
+        await self._run_query(
+            "execute_many",
+            query,
+            values,
+            lambda connection: self._execute_many(connection, query, values),
+        )
 
         return None
+
+    async def copy_records_to_table(
+        self,
+        table: str,
+        records: list[tuple[Any, ...]],
+        columns: Sequence[str],
+    ) -> None:
+        """Bulk load records into a table, using postgres' COPY protocol."""
+        await self._run_query(
+            "copy",
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN",
+            records,
+            lambda connection: self._copy_records_to_table(
+                connection,
+                table,
+                records,
+                columns,
+            ),
+            count_rows=lambda _: len(records),
+        )
+
+
+class AsyncpgDatabase(Database):
+    """\
+    A `Database` built directly on an asyncpg pool.
+
+    Unlike the `databases` adapter, queries aren't compiled through
+    sqlalchemy on every call and records aren't copied into dicts; named
+    parameters are converted once per query text, which asyncpg then
+    prepares once per connection.
+
+    As connections are acquired & released here, this adapter can also cap
+    the connections acquired at once below the pool's size (`resize`), and
+    recycle connections which have outlived a maximum lifetime.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        db_ssl: bool | ssl.SSLContext,
+        min_pool_size: int,
+        max_pool_size: int,
+        name: str,
+        slow_query_threshold_ms: int,
+        explain_slow_queries: bool = False,
+        statement_timeout_ms: int | None = None,
+        max_connection_lifetime_seconds: int | None = None,
+        adaptive_pool_size: bool = False,
+        acquire_timeout_seconds: float | None = None,
+    ) -> None:
+        self.dsn = dsn
+        self.db_ssl = db_ssl
+        self.min_pool_size = min_pool_size
+        self.max_pool_size = max_pool_size
+        self.statement_timeout_ms = statement_timeout_ms
+        self.pool: asyncpg.Pool | None = None  # type: ignore[assignment]
+        self.name = name
+        self.slow_query_threshold_ms = slow_query_threshold_ms
+        self.explain_slow_queries = explain_slow_queries
+        self.max_connection_lifetime_seconds = max_connection_lifetime_seconds
+        self.acquire_timeout_seconds = acquire_timeout_seconds
+
+        self._explained_at: dict[str, float] = {}
+        self._background_tasks: set[asyncio.Task[None]] = set()
+        self._acquire_waits: deque[float] = deque(maxlen=ACQUIRE_WAITS_WINDOW)
+        # server process id -> when the connection should be recycled
+        self._connections_expire_at: dict[int, float] = {}
+        self._connections_in_use = 0
+        # asyncpg pools can't be resized, so the pool is created at its
+        # largest, and slots above the current size are held back here
+        self._connection_slots = (
+            asyncio.Semaphore(max_pool_size) if adaptive_pool_size else None
+        )
+        self._held_back_slots = 0
+        # the connection of the current task's transaction, if any
+        self._transaction_connection: ContextVar[
+            tuple[asyncio.Task[Any] | None, asyncpg.Connection] | None
+        ] = ContextVar(f"{name}_transaction_connection", default=None)
+
+    async def connect(self) -> None:
+        _, _, address = self.dsn.partition("://")
+        self.pool = await asyncpg.create_pool(
+            f"postgresql://{address}",
+            min_size=self.min_pool_size,
+            max_size=self.max_pool_size,
+            ssl=self.db_ssl,
+            statement_cache_size=STATEMENT_CACHE_SIZE,
+            server_settings=_server_settings(self.statement_timeout_ms),
+            init=self._init_connection,
+        )
+
+    async def disconnect(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    def _asyncpg_pool(self) -> asyncpg.Pool | None:
+        return self.pool
+
+    def pool_max_size(self) -> int:
+        return self.max_pool_size - self._held_back_slots
+
+    async def resize(self, max_size: int) -> None:
+        """\
+        Change how many connections may be acquired at once, within the pool's
+        bounds, and never below those in use. Idle connections above the new
+        size are closed by asyncpg once they've been inactive for a while.
+        """
+        assert self._connection_slots is not None, "Pool isn't adaptively sized"
+        max_size = min(
+            max(max_size, self.min_pool_size, self._connections_in_use, 1),
+            self.max_pool_size,
+        )
+
+        while self.pool_max_size() < max_size:
+            self._connection_slots.release()
+            self._held_back_slots -= 1
+
+        # NOTE: slots beyond those in use are free, so this doesn't wait
+        while self.pool_max_size() > max_size and not self._connection_slots.locked():
+            await self._connection_slots.acquire()
+            self._held_back_slots += 1
+
+    async def _init_connection(self, connection: asyncpg.Connection) -> None:
+        await super()._init_connection(connection)
+
+        if self.max_connection_lifetime_seconds is not None:
+            lifetime = self.max_connection_lifetime_seconds * random.uniform(
+                1 - CONNECTION_LIFETIME_JITTER, 1
+            )
+            self._connections_expire_at[connection.get_server_pid()] = (
+                time.monotonic() + lifetime
+            )
+
+    def _on_connection_closed(self, connection: asyncpg.Connection) -> None:
+        super()._on_connection_closed(connection)
+        self._connections_expire_at.pop(connection.get_server_pid(), None)
+
+    def _expired(self, connection: asyncpg.Connection) -> bool:
+        expires_at = self._connections_expire_at.get(connection.get_server_pid())
+        return expires_at is not None and expires_at <= time.monotonic()
+
+    @asynccontextmanager
+    async def _acquire_slot(self) -> AsyncIterator[None]:
+        if self._connection_slots is None:
+            yield
+            return
+
+        async with asyncio.timeout(self.acquire_timeout_seconds):
+            await self._connection_slots.acquire()
+        try:
+            yield
+        finally:
+            self._connection_slots.release()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[asyncpg.Connection]:  # type: ignore[override]
+        # NOTE: as with `databases`, queries within a transaction run on its
+        # connection; but only in the task which started it, as child tasks
+        # inherit our context, and mustn't share a connection concurrently.
+        current = self._transaction_connection.get()
+        if current is not None and current[0] is asyncio.current_task():
+            yield current[1]
+            return
+
+        assert self.pool is not None, "Database is not connected"
+        async with self._acquire_slot():
+            async with self.pool.acquire(
+                timeout=self.acquire_timeout_seconds
+            ) as connection:
+                self._connections_in_use += 1
+                try:
+                    yield connection
+                finally:
+                    self._connections_in_use -= 1
+
+                # closing an acquired connection releases it to the
+                # pool, which opens a fresh one on the next acquire
+                if self._expired(connection):
+                    await connection.close(timeout=self.acquire_timeout_seconds)
+                    metrics.DB_POOL_CONNECTIONS_RECYCLED_TOTAL.labels(
+                        database=self.name
+                    ).inc()
+
+    @asynccontextmanager
+    async def transaction(  # type: ignore[override]
+        self,
+        *,
+        force_rollback: bool = False,
+        **kwargs: Any,
+    ) -> AsyncIterator[None]:
+        async with self.connection() as connection:
+            token = self._transaction_connection.set(
+                (asyncio.current_task(), connection)
+            )
+            try:
+                # nested transactions are savepoints
+                transaction = connection.transaction(**kwargs)
+                await transaction.start()
+                try:
+                    yield
+                except BaseException:
+                    await transaction.rollback()
+                    raise
+
+                if force_rollback:
+                    await transaction.rollback()
+                else:
+                    await transaction.commit()
+            finally:
+                self._transaction_connection.reset(token)
+
+    async def _fetch_one(  # type: ignore[override]
+        self,
+        connection: asyncpg.Connection,
+        query: str,
+        values: dict | None,
+    ) -> Mapping[str, Any] | None:
+        query, names = positional(query)
+        rec = await connection.fetchrow(query, *_arguments(names, values))
+        return dict(rec) if rec is not None else None
+
+    async def _fetch_all(  # type: ignore[override]
+        self,
+        connection: asyncpg.Connection,
+        query: str,
+        values: dict | None,
+    ) -> list[Mapping[str, Any]]:
+        query, names = positional(query)
+        recs = await connection.fetch(query, *_arguments(names, values))
+        return [dict(rec) for rec in recs]
+
+    async def _fetch_val(  # type: ignore[override]
+        self,
+        connection: asyncpg.Connection,
+        query: str,
+        values: dict | None,
+    ) -> Any:
+        query, names = positional(query)
+        return await connection.fetchval(query, *_arguments(names, values))
+
+    async def _execute(  # type: ignore[override]
+        self,
+        connection: asyncpg.Connection,
+        query: str,
+        values: dict | None,
+    ) -> Any:
+        # NOTE: as with `databases`, this returns the first column of
+        # the first row (if any), rather than the command's status.
+        query, names = positional(query)
+        return await connection.fetchval(query, *_arguments(names, values))
+
+    async def _execute_many(  # type: ignore[override]
+        self,
+        connection: asyncpg.Connection,
+        query: str,
+        values: list,
+    ) -> None:
+        query, names = positional(query)
+        await connection.executemany(
+            query,
+            [_arguments(names, value) for value in values],
+        )
+
+    async def _copy_records_to_table(  # type: ignore[override]
+        self,
+        connection: asyncpg.Connection,
+        table: str,
+        records: list[tuple[Any, ...]],
+        columns: Sequence[str],
+    ) -> None:
+        await connection.copy_records_to_table(
+            table,
+            records=records,
+            columns=columns,
+        )
+
+
+def _arguments(names: tuple[str, ...], values: dict | None) -> tuple[Any, ...]:
+    if not names:
+        return ()
+
+    assert values is not None, "Query has parameters, but no values were given"
+    return tuple(values[name] for name in names)
+
+
+def create(
+    dsn: str,
+    db_ssl: bool | ssl.SSLContext,
+    min_pool_size: int,
+    max_pool_size: int,
+    name: str,
+    slow_query_threshold_ms: int,
+    explain_slow_queries: bool = False,
+    statement_timeout_ms: int | None = None,
+    max_connection_lifetime_seconds: int | None = None,
+    adaptive_pool_size: bool = False,
+    acquire_timeout_seconds: float | None = None,
+) -> Database:
+    """Create a database, with the adapter selected by the dsn's scheme."""
+    if dsn.startswith(f"{ASYNCPG_SCHEME}://"):
+        return AsyncpgDatabase(
+            dsn,
+            db_ssl=db_ssl,
+            min_pool_size=min_pool_size,
+            max_pool_size=max_pool_size,
+            name=name,
+            slow_query_threshold_ms=slow_query_threshold_ms,
+            explain_slow_queries=explain_slow_queries,
+            statement_timeout_ms=statement_timeout_ms,
+            max_connection_lifetime_seconds=max_connection_lifetime_seconds,
+            adaptive_pool_size=adaptive_pool_size,
+            acquire_timeout_seconds=acquire_timeout_seconds,
+        )
+
+    # NOTE: `databases` acquires & releases connections itself
+    if max_connection_lifetime_seconds is not None or adaptive_pool_size:
+        raise ValueError(
+            "Connection lifetimes & adaptive pool sizing need the asyncpg adapter"
+        )
+
+    return Database(
+        dsn,
+        db_ssl=db_ssl,
+        min_pool_size=min_pool_size,
+        max_pool_size=max_pool_size,
+        name=name,
+        slow_query_threshold_ms=slow_query_threshold_ms,
+        explain_slow_queries=explain_slow_queries,
+        statement_timeout_ms=statement_timeout_ms,
+    )
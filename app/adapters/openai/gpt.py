@@ -9,6 +9,7 @@ from typing import TypedDict
 
 import openai
 
+from app import metrics
 from app import settings
 
 VALID_IMAGE_EXTENSIONS: set[str] = {".png", ".jpg", ".jpeg", ".gif"}
@@ -43,6 +44,17 @@ class AIModel(StrEnum):
 DEFAULT_AI_MODEL = AIModel.OPENAI_GPT_5_4
 
 
+class AIProvider(StrEnum):
+    OPENAI = "openai"
+    DEEPSEEK = "deepseek"
+
+
+def provider_for_model(model: AIModel) -> AIProvider:
+    if model in {AIModel.DEEPSEEK_CHAT, AIModel.DEEPSEEK_REASONER}:
+        return AIProvider.DEEPSEEK
+    return AIProvider.OPENAI
+
+
 class TextMessage(TypedDict):
     type: Literal["text"]
     text: str
@@ -99,6 +111,10 @@ class AIResponse:
     input_tokens: int
     output_tokens: int
     response_items: list[dict[str, Any]]
+    # the portion of input_tokens which were served from the provider's cache
+    cached_input_tokens: int = 0
+    # the portion of output_tokens which were spent on (hidden) reasoning
+    reasoning_tokens: int = 0
 
 
 def _message_content_to_text(content: Sequence[MessageContent]) -> str:
@@ -179,6 +195,12 @@ def _normalize_responses_response(response: Any) -> AIResponse:
         input_tokens=usage.input_tokens if usage is not None else 0,
         output_tokens=usage.output_tokens if usage is not None else 0,
         response_items=response_items,
+        cached_input_tokens=(
+            usage.input_tokens_details.cached_tokens if usage is not None else 0
+        ),
+        reasoning_tokens=(
+            usage.output_tokens_details.reasoning_tokens if usage is not None else 0
+        ),
     )
 
 
@@ -203,6 +225,17 @@ def _normalize_chat_response(response: Any) -> AIResponse:
         input_tokens=usage.prompt_tokens if usage is not None else 0,
         output_tokens=usage.completion_tokens if usage is not None else 0,
         response_items=[],
+        # NOTE: deepseek reports cache hits outside of the openai schema
+        cached_input_tokens=(
+            getattr(usage, "prompt_cache_hit_tokens", None) or 0
+            if usage is not None
+            else 0
+        ),
+        reasoning_tokens=(
+            usage.completion_tokens_details.reasoning_tokens or 0
+            if usage is not None and usage.completion_tokens_details is not None
+            else 0
+        ),
     )
 
 
@@ -233,13 +266,15 @@ async def send(
     OpenAI models use the Responses API. DeepSeek uses its OpenAI-compatible
     chat completions endpoint.
     """
-    if model in {AIModel.DEEPSEEK_CHAT, AIModel.DEEPSEEK_REASONER}:
+    latency_histogram = metrics.GPT_REQUEST_LATENCY_SECONDS.labels(model=model.value)
+
+    if provider_for_model(model) is AIProvider.DEEPSEEK:
         kwargs: dict[str, Any] = {"model": model.value, "messages": messages}
         if functions is not None:
             kwargs["functions"] = functions
-        return _normalize_chat_response(
-            await deepseek_client.chat.completions.create(**kwargs)
-        )
+        with latency_histogram.time():
+            chat_response = await deepseek_client.chat.completions.create(**kwargs)
+        return _normalize_chat_response(chat_response)
 
     input_items = [_message_to_responses_input(message) for message in messages]
     if response_context_items is not None:
@@ -255,4 +290,6 @@ async def send(
             _function_schema_to_responses_tool(function) for function in functions
         ]
 
-    return _normalize_responses_response(await openai_client.responses.create(**kwargs))
+    with latency_histogram.time():
+        response = await openai_client.responses.create(**kwargs)
+    return _normalize_responses_response(response)
@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Generic
+from typing import TypeVar
+
+from app import metrics
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """\
+    A mapping which evicts its least recently used entries past `maxsize`,
+    and optionally, entries which are older than `ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        value, stored_at = entry
+        if (
+            self.ttl_seconds is not None
+            and time.monotonic() - stored_at > self.ttl_seconds
+        ):
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            metrics.CACHE_EVICTIONS_TOTAL.labels(cache=self.name).inc()
+
+    def clear(self) -> None:
+        self._data.clear()
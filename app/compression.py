@@ -0,0 +1,108 @@
+# Compression of (large) message content, using zstd.
+#
+# Content is compressed with the newest trained dictionary, which makes
+# even a few hundred bytes of chat compress well. Dictionaries are
+# versioned (`content_dictionaries/v{N}.zdict`) and the version is recorded
+# in each row's codec, so older dictionaries must be kept for reading.
+# Without any dictionary, content is compressed with plain zstd.
+import functools
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import zstandard
+
+DICTIONARIES_PATH = Path(__file__).with_name("content_dictionaries")
+# smaller content doesn't compress enough to be worth the cpu
+COMPRESSION_THRESHOLD_BYTES = 512
+COMPRESSION_LEVEL = 3
+DICTIONARY_SIZE_BYTES = 64 * 1024
+
+ZSTD_CODEC = "zstd"
+_DICTIONARY_FILENAME_RE = re.compile(r"^v(\d+)\.zdict$")
+
+
+# NOTE: not frozen, as that doubles the cost of constructing one per row
+@dataclass(slots=True)
+class StoredContent:
+    """Content as stored; either plain `text`, or `data` compressed by `codec`."""
+
+    text: str | None = None
+    data: bytes | None = None
+    codec: str | None = None
+
+    def decode(self) -> str:
+        if self.text is not None:
+            return self.text
+
+        assert self.data is not None and self.codec is not None
+        return decompress(self.data, self.codec)
+
+
+def dictionary_codec(version: int) -> str:
+    return f"zstd-dict-v{version}"
+
+
+@functools.cache
+def dictionaries() -> dict[int, zstandard.ZstdCompressionDict]:
+    versions: dict[int, zstandard.ZstdCompressionDict] = {}
+    if DICTIONARIES_PATH.is_dir():
+        for path in DICTIONARIES_PATH.iterdir():
+            match = _DICTIONARY_FILENAME_RE.match(path.name)
+            if match is not None:
+                versions[int(match[1])] = zstandard.ZstdCompressionDict(
+                    path.read_bytes()
+                )
+    return versions
+
+
+@functools.cache
+def _compressor() -> tuple[str, zstandard.ZstdCompressor]:
+    if not dictionaries():
+        return ZSTD_CODEC, zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+
+    version = max(dictionaries())
+    return dictionary_codec(version), zstandard.ZstdCompressor(
+        level=COMPRESSION_LEVEL,
+        dict_data=dictionaries()[version],
+    )
+
+
+@functools.cache
+def _decompressor(codec: str) -> zstandard.ZstdDecompressor:
+    if codec == ZSTD_CODEC:
+        return zstandard.ZstdDecompressor()
+
+    for version, dictionary in dictionaries().items():
+        if codec == dictionary_codec(version):
+            return zstandard.ZstdDecompressor(dict_data=dictionary)
+
+    raise ValueError(f"Unknown content codec: {codec}")
+
+
+def current_codec() -> str:
+    """The codec which content is compressed with, on write."""
+    codec, _ = _compressor()
+    return codec
+
+
+def compress(content: str) -> StoredContent:
+    """Compress content if it's large enough, and compression pays off."""
+    raw_content = content.encode()
+    if len(raw_content) < COMPRESSION_THRESHOLD_BYTES:
+        return StoredContent(text=content)
+
+    codec, compressor = _compressor()
+    data = compressor.compress(raw_content)
+    if len(data) >= len(raw_content):
+        return StoredContent(text=content)
+
+    return StoredContent(data=data, codec=codec)
+
+
+def decompress(data: bytes, codec: str) -> str:
+    return _decompressor(codec).decompress(data).decode()
+
+
+def train_dictionary(samples: list[bytes], size: int = DICTIONARY_SIZE_BYTES) -> bytes:
+    return zstandard.train_dictionary(size, samples).as_bytes()
@@ -0,0 +1,185 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Iterator
+from contextvars import ContextVar
+from typing import Any
+
+from app import metrics
+from app.adapters.database import Database
+
+LOGGER = logging.getLogger(__name__)
+
+_ANALYTICS: ContextVar[bool] = ContextVar("analytics", default=False)
+
+# how far the replica has fallen behind the primary; zero when it's
+# replayed everything it's received, rather than growing while idle
+REPLICA_LAG_QUERY = """\
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+          OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+        THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class DatabaseRouter:
+    """\
+    Routes reads between the read replica and the primary.
+
+    Reads go to the replica while it's healthy & caught up, and otherwise
+    fall back to the primary. Reads of a thread which was written to within
+    the last `read_your_writes_seconds` also go to the primary, such that
+    e.g. a fresh turn is never missing from the next turn's context.
+
+    Within `analytics()`, reads which would go to the replica go through the
+    (separately sized) analytics pool instead, such that heavy reports can't
+    starve live conversations of connections.
+    """
+
+    def __init__(
+        self,
+        *,
+        primary: Database,
+        replica: Database,
+        analytics: Database | None = None,
+        max_replica_lag_ms: int,
+        read_your_writes_seconds: int,
+        health_check_interval_seconds: int,
+    ) -> None:
+        self.primary = primary
+        self.replica = replica
+        self.analytics = analytics
+        self.max_replica_lag = max_replica_lag_ms / 1000
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.health_check_interval_seconds = health_check_interval_seconds
+
+        # optimistic until the first health check says otherwise
+        self.primary_healthy = True
+        self.replica_healthy = True
+        self.replica_lag = 0.0
+
+        # thread id -> until when its reads are pinned to the primary
+        self._pinned_until: dict[int, float] = {}
+        self._health_check_task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        self._health_check_task = asyncio.create_task(self._check_health_forever())
+
+    async def stop(self) -> None:
+        if self._health_check_task is not None:
+            self._health_check_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._health_check_task
+
+    def replica_available(self) -> bool:
+        return self.replica_healthy and self.replica_lag <= self.max_replica_lag
+
+    def record_write(self, thread_id: int) -> None:
+        """Pin the thread's reads to the primary, until the replica has caught up."""
+        self._pinned_until[thread_id] = time.monotonic() + self.read_your_writes_seconds
+
+    def reader(self, thread_id: int | None = None) -> Database:
+        """The database to read (the given thread) from."""
+        # reports read from the replica through their own pool
+        replica = (
+            self.analytics
+            if self.analytics is not None and _ANALYTICS.get()
+            else self.replica
+        )
+
+        if not self.replica_available():
+            reason = "replica_unavailable"
+        elif thread_id is not None and self._is_pinned(thread_id):
+            reason = "read_your_writes"
+        else:
+            metrics.DB_ROUTED_READS_TOTAL.labels(
+                database=replica.name, reason="replica"
+            ).inc()
+            return replica
+
+        # a stale read beats a failed one
+        if not self.primary_healthy:
+            metrics.DB_ROUTED_READS_TOTAL.labels(
+                database=replica.name, reason="primary_unavailable"
+            ).inc()
+            return replica
+
+        metrics.DB_ROUTED_READS_TOTAL.labels(
+            database=self.primary.name, reason=reason
+        ).inc()
+        return self.primary
+
+    def _is_pinned(self, thread_id: int) -> bool:
+        pinned_until = self._pinned_until.get(thread_id)
+        return pinned_until is not None and time.monotonic() < pinned_until
+
+    async def check_health(self) -> None:
+        primary_result, replica_lag = await asyncio.gather(
+            self._probe(self.primary, "SELECT 1"),
+            self._probe(self.replica, REPLICA_LAG_QUERY),
+        )
+        primary_healthy = primary_result is not None
+        replica_healthy = replica_lag is not None
+
+        if primary_healthy != self.primary_healthy:
+            LOGGER.warning(
+                "Primary database health changed",
+                extra={"database": self.primary.name, "healthy": primary_healthy},
+            )
+        replica_was_available = self.replica_available()
+
+        self.primary_healthy = primary_healthy
+        self.replica_healthy = replica_healthy
+        if replica_lag is not None:
+            self.replica_lag = float(replica_lag)
+
+        if replica_was_available != self.replica_available():
+            LOGGER.warning(
+                "Read replica availability changed",
+                extra={
+                    "database": self.replica.name,
+                    "available": self.replica_available(),
+                    "healthy": replica_healthy,
+                    "lag_ms": round(self.replica_lag * 1000, 3),
+                },
+            )
+
+        now = time.monotonic()
+        for thread_id, pinned_until in list(self._pinned_until.items()):
+            if pinned_until <= now:
+                del self._pinned_until[thread_id]
+
+    async def _probe(self, database: Database, query: str) -> Any:
+        """Run a health check query; returning None should it fail."""
+        try:
+            async with asyncio.timeout(self.health_check_interval_seconds):
+                return await database.fetch_val(query)
+        except Exception:
+            LOGGER.debug(
+                "Database health check failed",
+                exc_info=True,
+                extra={"database": database.name},
+            )
+            return None
+
+    async def _check_health_forever(self) -> None:
+        while True:
+            try:
+                await self.check_health()
+            except Exception:
+                LOGGER.exception("Failed to check database health")
+
+            await asyncio.sleep(self.health_check_interval_seconds)
+
+
+@contextlib.contextmanager
+def analytics() -> Iterator[None]:
+    """Route the reads within to the analytics pool."""
+    token = _ANALYTICS.set(True)
+    try:
+        yield
+    finally:
+        _ANALYTICS.reset(token)
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+
+import discord
+import prometheus_client
+from aiohttp import web
+
+from app import settings
+from app import state
+
+LOGGER = logging.getLogger(__name__)
+
+DISCORD_CLIENT = web.AppKey("discord_client", discord.Client)
+
+routes = web.RouteTableDef()
+
+
+@routes.get("/metrics")
+async def metrics(request: web.Request) -> web.Response:
+    return web.Response(
+        body=prometheus_client.generate_latest(),
+        headers={"Content-Type": prometheus_client.CONTENT_TYPE_LATEST},
+    )
+
+
+@routes.get("/_health")
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+async def _check_databases() -> None:
+    await state.read_database.fetch_val("SELECT 1")
+    await state.write_database.fetch_val("SELECT 1")
+
+
+@routes.get("/_ready")
+async def ready(request: web.Request) -> web.Response:
+    if not request.app[DISCORD_CLIENT].is_ready():
+        return web.json_response(
+            {"status": "not_ready", "reason": "discord"},
+            status=503,
+        )
+
+    try:
+        await asyncio.wait_for(
+            _check_databases(),
+            timeout=settings.SERVICE_READINESS_TIMEOUT,
+        )
+    except Exception:
+        LOGGER.warning("Readiness check failed", exc_info=True)
+        return web.json_response(
+            {"status": "not_ready", "reason": "database"},
+            status=503,
+        )
+
+    return web.json_response({"status": "ok"})
+
+
+def create_app(discord_client: discord.Client) -> web.Application:
+    app = web.Application()
+    app[DISCORD_CLIENT] = discord_client
+    app.add_routes(routes)
+    return app
+
+
+async def start(
+    discord_client: discord.Client,
+    host: str,
+    port: int,
+) -> web.AppRunner:
+    runner = web.AppRunner(create_app(discord_client), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -1,12 +1,37 @@
+import asyncio
+import contextlib
+
+import discord
 import httpx
 
+from app import database_routing
+from app import http_server
+from app import loop_monitor
+from app import memory
+from app import metrics
+from app import openai_functions
+from app import openai_pricing
+from app import pool_tuning
 from app import settings
 from app import state
+from app import tracing
 from app.adapters import database
+from app.usecases import partition_maintenance
+from app.usecases import thread_retention
+from app.usecases import usage_rollups
+
+
+async def start(discord_client: discord.Client) -> None:
+    state.tracer_provider = tracing.configure(
+        app_env=settings.APP_ENV,
+        exporter=settings.TRACING_EXPORTER,
+        export_path=settings.TRACING_EXPORT_PATH,
+    )
 
+    # fail fast on a malformed price table, rather than on the first cost report
+    openai_pricing.price_table()
 
-async def start() -> None:
-    state.read_database = database.Database(
+    state.read_database = database.create(
         database.dsn(
             scheme=settings.READ_DB_SCHEME,
             user=settings.READ_DB_USER,
@@ -18,10 +43,19 @@ async def start() -> None:
         db_ssl=settings.READ_DB_USE_SSL,
         min_pool_size=settings.DB_POOL_MIN_SIZE,
         max_pool_size=settings.DB_POOL_MAX_SIZE,
+        name="read",
+        slow_query_threshold_ms=settings.DB_SLOW_QUERY_THRESHOLD_MS,
+        explain_slow_queries=settings.DB_EXPLAIN_SLOW_QUERIES,
+        max_connection_lifetime_seconds=(
+            settings.DB_POOL_MAX_CONNECTION_LIFETIME_SECONDS or None
+        ),
+        adaptive_pool_size=settings.DB_POOL_ADAPTIVE,
+        acquire_timeout_seconds=settings.DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
     )
     await state.read_database.connect()
+    metrics.track_database_pool(state.read_database)
 
-    state.write_database = database.Database(
+    state.write_database = database.create(
         database.dsn(
             scheme=settings.WRITE_DB_SCHEME,
             user=settings.WRITE_DB_USER,
@@ -33,13 +67,113 @@ async def start() -> None:
         db_ssl=settings.WRITE_DB_USE_SSL,
         min_pool_size=settings.DB_POOL_MIN_SIZE,
         max_pool_size=settings.DB_POOL_MAX_SIZE,
+        name="write",
+        slow_query_threshold_ms=settings.DB_SLOW_QUERY_THRESHOLD_MS,
+        explain_slow_queries=settings.DB_EXPLAIN_SLOW_QUERIES,
+        max_connection_lifetime_seconds=(
+            settings.DB_POOL_MAX_CONNECTION_LIFETIME_SECONDS or None
+        ),
+        adaptive_pool_size=settings.DB_POOL_ADAPTIVE,
+        acquire_timeout_seconds=settings.DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
     )
     await state.write_database.connect()
+    metrics.track_database_pool(state.write_database)
+
+    state.analytics_database = database.create(
+        database.dsn(
+            scheme=settings.READ_DB_SCHEME,
+            user=settings.READ_DB_USER,
+            password=settings.READ_DB_PASS,
+            host=settings.READ_DB_HOST,
+            port=settings.READ_DB_PORT,
+            database=settings.READ_DB_NAME,
+        ),
+        db_ssl=settings.READ_DB_USE_SSL,
+        min_pool_size=settings.ANALYTICS_DB_POOL_MIN_SIZE,
+        max_pool_size=settings.ANALYTICS_DB_POOL_MAX_SIZE,
+        name="analytics",
+        slow_query_threshold_ms=settings.DB_SLOW_QUERY_THRESHOLD_MS,
+        explain_slow_queries=settings.DB_EXPLAIN_SLOW_QUERIES,
+        statement_timeout_ms=settings.ANALYTICS_DB_STATEMENT_TIMEOUT_MS,
+        max_connection_lifetime_seconds=(
+            settings.DB_POOL_MAX_CONNECTION_LIFETIME_SECONDS or None
+        ),
+        adaptive_pool_size=settings.DB_POOL_ADAPTIVE,
+        acquire_timeout_seconds=settings.DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+    )
+    await state.analytics_database.connect()
+    metrics.track_database_pool(state.analytics_database)
+
+    state.database_router = database_routing.DatabaseRouter(
+        primary=state.write_database,
+        replica=state.read_database,
+        analytics=state.analytics_database,
+        max_replica_lag_ms=settings.DB_REPLICA_MAX_LAG_MS,
+        read_your_writes_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+        health_check_interval_seconds=settings.DB_HEALTH_CHECK_INTERVAL_SECONDS,
+    )
+    await state.database_router.check_health()
+    state.database_router.start()
+    metrics.track_database_router(state.database_router)
+
+    state.pool_tuner = None
+    if settings.DB_POOL_ADAPTIVE:
+        state.pool_tuner = pool_tuning.PoolTuner(
+            databases=[
+                state.read_database,
+                state.write_database,
+                state.analytics_database,
+            ],
+            target_acquire_wait_ms=settings.DB_POOL_TARGET_ACQUIRE_WAIT_MS,
+            interval_seconds=settings.DB_POOL_TUNE_INTERVAL_SECONDS,
+        )
+        await state.pool_tuner.start()
 
     state.http_client = httpx.AsyncClient()
 
+    state.loop_monitor = loop_monitor.LoopMonitor(
+        threshold_ms=settings.LOOP_LAG_THRESHOLD_MS,
+    )
+    state.loop_monitor.start()
+    metrics.track_loop_monitor(state.loop_monitor)
+
+    memory.register_cache("location", lambda: len(openai_functions.location_cache))
+    memory.register_cache(
+        "discord_messages", lambda: len(discord_client.cached_messages)
+    )
+    memory.register_cache("discord_users", lambda: len(discord_client.users))
+    memory.register_cache("discord_guilds", lambda: len(discord_client.guilds))
+
+    state.usage_rollups_task = asyncio.create_task(usage_rollups.run_backfills())
+    state.partition_maintenance_task = asyncio.create_task(
+        partition_maintenance.run_partition_maintenance()
+    )
+    state.thread_retention_task = asyncio.create_task(thread_retention.run_retention())
+
+    state.http_server = await http_server.start(
+        discord_client,
+        host=settings.APP_HOST,
+        port=settings.APP_PORT,
+    )
+
 
 async def stop() -> None:
+    await state.http_server.cleanup()
+    state.usage_rollups_task.cancel()
+    state.partition_maintenance_task.cancel()
+    state.thread_retention_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await state.usage_rollups_task
+    with contextlib.suppress(asyncio.CancelledError):
+        await state.partition_maintenance_task
+    with contextlib.suppress(asyncio.CancelledError):
+        await state.thread_retention_task
+    await state.loop_monitor.stop()
+    await state.database_router.stop()
+    if state.pool_tuner is not None:
+        await state.pool_tuner.stop()
     await state.http_client.aclose()
     await state.write_database.disconnect()
     await state.read_database.disconnect()
+    await state.analytics_database.disconnect()
+    state.tracer_provider.shutdown()
@@ -0,0 +1,164 @@
+import json
+import logging.handlers
+import queue
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timezone
+from typing import Any
+
+from opentelemetry import trace
+
+# repeated warnings & errors (of the same shape) beyond the burst
+# within a window are sampled, to avoid logging storms during outages
+RATE_LIMIT_BURST = 10
+RATE_LIMIT_WINDOW_SECONDS = 60
+RATE_LIMIT_SAMPLE_EVERY = 100
+MAX_RATE_LIMITED_KEYS = 1024
+
+# attributes every LogRecord has; anything else was passed via `extra`
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__.keys()
+    | {"message", "asctime", "request_id", "suppressed"}
+)
+
+_log_context: ContextVar[dict[str, Any]] = ContextVar("log_context", default={})
+
+
+@contextmanager
+def bind(**fields: Any) -> Iterator[None]:
+    """Attach fields to all log records emitted within this context."""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Capture the emitting task's context, before the record changes threads."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span_context = trace.get_current_span().get_span_context()
+        if span_context.is_valid:
+            record.request_id = format(span_context.trace_id, "032x")
+
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+@dataclass(slots=True)
+class _RateLimitState:
+    window_started_at: float
+    count: int = 0
+    suppressed: int = 0
+
+
+class RateLimitFilter(logging.Filter):
+    def __init__(
+        self,
+        *,
+        burst: int = RATE_LIMIT_BURST,
+        window_seconds: float = RATE_LIMIT_WINDOW_SECONDS,
+        sample_every: int = RATE_LIMIT_SAMPLE_EVERY,
+    ) -> None:
+        super().__init__()
+        self.burst = burst
+        self.window_seconds = window_seconds
+        self.sample_every = sample_every
+        self._states: dict[tuple[Any, ...], _RateLimitState] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+
+        exc_type = record.exc_info[0] if record.exc_info else None
+        key = (record.name, record.levelno, record.msg, exc_type)
+        now = time.monotonic()
+
+        state = self._states.get(key)
+        if state is None:
+            if len(self._states) >= MAX_RATE_LIMITED_KEYS:
+                self._states.clear()
+            state = self._states[key] = _RateLimitState(window_started_at=now)
+        elif now - state.window_started_at >= self.window_seconds:
+            # NOTE: keep the suppressed count, so the next record reports it
+            state.window_started_at = now
+            state.count = 0
+
+        state.count += 1
+        if state.count > self.burst and state.count % self.sample_every != 0:
+            state.suppressed += 1
+            return False
+
+        if state.suppressed:
+            record.suppressed = state.suppressed
+            state.suppressed = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        log: dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(
+                record.created, tz=timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "thread_id": getattr(record, "thread_id", None),
+        }
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed is not None:
+            log["suppressed"] = suppressed
+
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key not in log:
+                log[key] = value
+
+        if record.exc_info:
+            log["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            log["stack"] = self.formatStack(record.stack_info)
+
+        return json.dumps(log, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # NOTE: unlike the stdlib, we leave formatting (and the traceback
+        # rendering, which reads source files) to the background writer.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure(*, level: str) -> logging.handlers.QueueListener:
+    """\
+    Route all logging through a queue, written out as JSON by a
+    background thread, so that logging never blocks the event loop.
+
+    Returns the listener, which must be stopped to flush remaining logs.
+    """
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+    queue_handler.addFilter(ContextFilter())
+
+    root_logger = logging.getLogger()
+    root_logger.handlers = [queue_handler]
+    root_logger.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
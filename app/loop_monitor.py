@@ -0,0 +1,109 @@
+import asyncio
+import contextlib
+import logging
+import statistics
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from app import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.1
+# 60s worth of samples to compute lag percentiles over
+RECENT_LAGS_WINDOW = 600
+
+
+class LoopMonitor:
+    """\
+    Measures event loop scheduling lag, and logs the stack of
+    whatever is blocking the loop once it exceeds a threshold.
+
+    Lag is measured from a heartbeat task on the loop, while blocking
+    code is caught by a watchdog thread, since the loop itself can't
+    run anything while it's blocked.
+    """
+
+    def __init__(self, *, threshold_ms: int) -> None:
+        self.threshold = threshold_ms / 1000
+
+        self._recent_lags: deque[float] = deque(maxlen=RECENT_LAGS_WINDOW)
+        self._last_heartbeat = time.monotonic()
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._heartbeat_task: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop_event = threading.Event()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_heartbeat = time.monotonic()
+
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(
+            target=self._watch,
+            name="event-loop-watchdog",
+            daemon=True,
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop_event.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._heartbeat_task
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+
+    def lag_quantile(self, quantile: float) -> float:
+        if len(self._recent_lags) < 2:
+            return self._recent_lags[0] if self._recent_lags else 0.0
+
+        cut_points = statistics.quantiles(self._recent_lags, n=100)
+        return cut_points[min(int(quantile * 100), 99) - 1]
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected_at = loop.time() + SAMPLE_INTERVAL
+            self._last_heartbeat = time.monotonic()
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+            lag = max(loop.time() - expected_at, 0.0)
+            self._recent_lags.append(lag)
+            metrics.EVENT_LOOP_LAG_SECONDS.observe(lag)
+
+    def _watch(self) -> None:
+        reported_heartbeat: float | None = None
+        while not self._stop_event.wait(SAMPLE_INTERVAL / 2):
+            last_heartbeat = self._last_heartbeat
+            blocked_for = time.monotonic() - last_heartbeat - SAMPLE_INTERVAL
+            if blocked_for < self.threshold or last_heartbeat == reported_heartbeat:
+                continue
+
+            # report each stall once, while the culprit is still on the stack
+            reported_heartbeat = last_heartbeat
+            self._report_blocked(blocked_for)
+
+    def _report_blocked(self, blocked_for: float) -> None:
+        assert self._loop is not None and self._loop_thread_id is not None
+
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else None
+        task = asyncio.current_task(self._loop)
+
+        metrics.EVENT_LOOP_BLOCKS_TOTAL.inc()
+        LOGGER.warning(
+            "Event loop blocked",
+            extra={
+                "blocked_ms": round(blocked_for * 1000, 3),
+                "handler": task.get_name() if task is not None else None,
+                "stack": stack,
+            },
+        )
@@ -1,33 +1,67 @@
 #!/usr/bin/env python3
+import asyncio
 import io
 import logging
 import os.path
 import sys
 from collections import defaultdict
+from collections.abc import AsyncIterator
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Sequence
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
 from datetime import datetime
 from datetime import timedelta
+from datetime import timezone
+from typing import TypeVar
 
 import discord.abc
+from asyncpg.exceptions import QueryCanceledError
+from opentelemetry.trace import SpanKind
 
 # add .. to path
 srv_root = os.path.join(os.path.dirname(__file__), "..")
 sys.path.append(srv_root)
 
 from app.errors import Error
+from app.errors import ErrorCode
 from app.models import DiscordBot
 from app.usecases import ai_conversations
+from app.usecases import thread_retention
 
 
+from app import database_routing
 from app import discord_message_utils, openai_pricing
+from app import logger
+from app import memory
+from app import metrics
+from app import profiling
 from app import settings
+from app import slowlog
+from app import tracing
+from app import transcripts
 from app.adapters.openai import gpt
 from app.repositories import thread_messages
 from app.repositories import threads
+from app.repositories import usage_daily
 
 
 LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 MAX_CONTENT_LENGTH = 100
+# discord's limits for uploads outside of (boosted) guilds
+DEFAULT_UPLOAD_SIZE_LIMIT = 10 * 1024 * 1024
+MAX_ATTACHMENTS_PER_MESSAGE = 10
+MAX_PROFILE_TOP_N = 25
+MONTHLY_COST_DAYS = 30
+
+# interaction tokens (and so, followups) expire 15 minutes after the interaction
+INTERACTION_TOKEN_LIFETIME = timedelta(minutes=15)
+# leaves time to tell the user that their report was cancelled
+REPORT_DEADLINE_MARGIN = timedelta(seconds=30)
 
 
 intents = discord.Intents.default()
@@ -40,7 +74,11 @@ allowed_contexts = discord.app_commands.AppCommandContext(
     private_channel=True,
 )
 
-bot = DiscordBot(intents=intents)
+bot = DiscordBot(
+    intents=intents,
+    # we never read from discord.py's message cache
+    max_messages=settings.DISCORD_MAX_MESSAGES,
+)
 command_tree = discord.app_commands.CommandTree(
     bot,
     allowed_contexts=allowed_contexts,
@@ -55,6 +93,49 @@ def command_name(command_name: str) -> str:
     return command_name
 
 
+async def _iterate(items: Iterable[T]) -> AsyncIterator[T]:
+    for item in items:
+        yield item
+
+
+@asynccontextmanager
+async def _report(interaction: discord.Interaction) -> AsyncIterator[None]:
+    """\
+    Run a report's reads through the analytics pool, cancelling the report
+    (and its in-flight query) once the interaction's deadline has passed.
+    """
+    deadline = interaction.created_at + INTERACTION_TOKEN_LIFETIME
+    deadline -= REPORT_DEADLINE_MARGIN
+    try:
+        with database_routing.analytics():
+            async with asyncio.timeout(
+                (deadline - datetime.now(timezone.utc)).total_seconds()
+            ):
+                yield
+    # the former is our deadline, the latter the analytics statement timeout
+    except (TimeoutError, QueryCanceledError):
+        LOGGER.warning(
+            "Report was cancelled for taking too long",
+            exc_info=True,
+            extra={
+                "command": interaction.command.name if interaction.command else None
+            },
+        )
+        await interaction.followup.send(
+            "This report took too long, and was cancelled.",
+            ephemeral=True,
+        )
+
+
+@contextmanager
+def _track_discord_send() -> Iterator[None]:
+    with (
+        metrics.DISCORD_SEND_LATENCY_SECONDS.time(),
+        tracing.tracer.start_as_current_span("discord.send", kind=SpanKind.CLIENT),
+    ):
+        yield
+
+
 @bot.event
 async def on_ready():
     # NOTE: we can't use this as a lifecycle hook because
@@ -65,60 +146,50 @@ async def on_ready():
 
 @bot.event
 async def on_message(message: discord.Message):
-    data = await ai_conversations.send_message_to_thread(bot, message)
-    if isinstance(data, Error):
-        for msg in data.messages:
-            await message.channel.send(msg)
-        return
-
-    for msg in data.response_messages:
-        await message.channel.send(msg)
-
-
-async def _calculate_per_requester_costs(
-    thread_id: int | None = None, created_at_gte: datetime | None = None
+    with slowlog.record_request("mention"):
+        data = await ai_conversations.send_message_to_thread(bot, message)
+        if isinstance(data, Error):
+            if data.code != ErrorCode.SKIP:
+                metrics.ERRORS_TOTAL.labels(code=data.code.value).inc()
+            for msg in data.messages:
+                with _track_discord_send():
+                    await message.channel.send(msg)
+            return
+
+        for msg in data.response_messages:
+            with _track_discord_send():
+                await message.channel.send(msg)
+
+
+def _calculate_per_requester_costs(
+    token_usages: Sequence[
+        thread_messages.RequesterTokenUsage | usage_daily.RequesterTokenUsage
+    ],
 ) -> dict[int, float]:
-    messages = await thread_messages.fetch_many(
-        thread_id=thread_id,
-        created_at_gte=created_at_gte,
-    )
-    threads_cache: dict[int, threads.Thread] = {}
-    per_requester_per_model_input_tokens: dict[int, dict[gpt.AIModel, int]] = (
-        defaultdict(lambda: defaultdict(int))
+    costs = openai_pricing.price_table().cost_many(
+        models=[token_usage.model for token_usage in token_usages],
+        days=[token_usage.day for token_usage in token_usages],
+        input_tokens=[token_usage.input_tokens for token_usage in token_usages],
+        cached_input_tokens=[
+            token_usage.cached_input_tokens for token_usage in token_usages
+        ],
+        output_tokens=[token_usage.output_tokens for token_usage in token_usages],
     )
-    for message in messages:
-        if message.role != "user":
-            continue
-
-        thread_id = message.thread_id
-        thread = threads_cache.get(thread_id)
-        if thread is None:
-            thread = await threads.fetch_one(thread_id)
-            if thread is None:
-                LOGGER.warning(
-                    "Thread %s not found",
-                    thread_id,
-                    extra={"thread_id": thread_id},
-                )
-                continue
-            threads_cache[thread_id] = thread
-
-        user_id = message.discord_user_id
-        per_model_input_tokens = per_requester_per_model_input_tokens[user_id]
-        per_model_input_tokens[thread.model] += message.tokens_used
 
     per_requester_cost: dict[int, float] = defaultdict(float)
-    for user_id, per_model_tokens in per_requester_per_model_input_tokens.items():
-        for model, input_tokens in per_model_tokens.items():
-            requester_cost = per_requester_cost[user_id]
-            requester_cost += openai_pricing.tokens_to_dollars(
-                model, input_tokens, output_tokens=0
-            )
-            per_requester_cost[user_id] = requester_cost
+    for token_usage, cost in zip(token_usages, costs):
+        per_requester_cost[token_usage.discord_user_id] += cost
 
     return per_requester_cost
 
 
+def _render_requester_costs(per_requester_cost: dict[int, float]) -> list[str]:
+    # NOTE: mentions render without any lookups (discord resolves them).
+    return [
+        f"<@{user_id}>: ${cost:.5f}" for user_id, cost in per_requester_cost.items()
+    ]
+
+
 @command_tree.command(name=command_name("monthlycost"))
 async def monthlycost(interaction: discord.Interaction):
     if interaction.user.id not in ai_conversations.DISCORD_USER_ID_WHITELIST:
@@ -130,25 +201,29 @@ async def monthlycost(interaction: discord.Interaction):
 
     await interaction.response.defer()
 
-    per_requester_cost = await _calculate_per_requester_costs(
-        created_at_gte=datetime.now() - timedelta(days=30)
-    )
-    response_cost = sum(per_requester_cost.values())
+    async with _report(interaction):
+        # the window ends with today (so far), so it starts 29 days before
+        today = datetime.now(timezone.utc).date()
+        token_usages = await usage_daily.fetch_token_usage_per_requester(
+            day_gte=today - timedelta(days=MONTHLY_COST_DAYS - 1)
+        )
+        per_requester_cost = _calculate_per_requester_costs(token_usages)
+        response_cost = sum(per_requester_cost.values())
 
-    message_chunks = [
-        "**Monthly Requester Cost Breakdown**",
-        "**--------------------------------**",
-        "Input cost is attributed to the user who sent each model request.",
-        "",
-    ]
-    for user_id, cost in per_requester_cost.items():
-        user = await bot.fetch_user(user_id)
-        message_chunks.append(f"{user.mention}: ${cost:.5f}")
+        message_chunks = [
+            "**Monthly Requester Cost Breakdown**",
+            "**--------------------------------**",
+            f"Covers the last {MONTHLY_COST_DAYS} days (UTC), including today so far.",
+            "Input & output costs are attributed to the user who sent each model request.",
+            "",
+        ]
+        message_chunks.extend(_render_requester_costs(per_requester_cost))
 
-    message_chunks.append("")
-    message_chunks.append(f"**Total Cost: ${response_cost:.5f}**")
+        message_chunks.append("")
+        message_chunks.append(f"**Total Cost: ${response_cost:.5f}**")
 
-    await interaction.followup.send("\n".join(message_chunks))
+        with _track_discord_send():
+            await interaction.followup.send("\n".join(message_chunks))
 
 
 @command_tree.command(name=command_name("threadcost"))
@@ -169,25 +244,35 @@ async def threadcost(interaction: discord.Interaction):
 
     await interaction.response.defer()
 
-    per_requester_cost = await _calculate_per_requester_costs(
-        thread_id=interaction.channel.id
-    )
-    response_cost = sum(per_requester_cost.values())
+    async with _report(interaction):
+        thread = await threads.fetch_one(interaction.channel.id)
+        # NOTE: the daily rollups aren't kept per thread, but a single
+        # thread's messages are cheap enough to aggregate on the fly.
+        # Archived threads are read from their archive, and left archived.
+        if thread is not None and thread.archived_at is not None:
+            token_usages = (
+                await thread_retention.fetch_archived_token_usage_per_requester(thread)
+            )
+        else:
+            token_usages = await thread_messages.fetch_token_usage_per_requester(
+                thread_id=interaction.channel.id
+            )
+        per_requester_cost = _calculate_per_requester_costs(token_usages)
+        response_cost = sum(per_requester_cost.values())
 
-    message_chunks = [
-        "**Thread Requester Cost Breakdown**",
-        "**-------------------------------**",
-        "Input cost is attributed to the user who sent each model request.",
-        "",
-    ]
-    for user_id, cost in per_requester_cost.items():
-        user = await bot.fetch_user(user_id)
-        message_chunks.append(f"{user.mention}: ${cost:.5f}")
+        message_chunks = [
+            "**Thread Requester Cost Breakdown**",
+            "**-------------------------------**",
+            "Input & output costs are attributed to the user who sent each model request.",
+            "",
+        ]
+        message_chunks.extend(_render_requester_costs(per_requester_cost))
 
-    message_chunks.append("")
-    message_chunks.append(f"**Total Cost: ${response_cost:.5f}**")
+        message_chunks.append("")
+        message_chunks.append(f"**Total Cost: ${response_cost:.5f}**")
 
-    await interaction.followup.send("\n".join(message_chunks))
+        with _track_discord_send():
+            await interaction.followup.send("\n".join(message_chunks))
 
 
 @command_tree.command(name=command_name("model"))
@@ -301,86 +386,114 @@ async def summarize(
         )
         return
 
-    await interaction.response.defer()
+    with (
+        slowlog.record_request("summarize"),
+        tracing.tracer.start_as_current_span(
+            "summarize",
+            attributes={"gen_ai.request.model": gpt.DEFAULT_AI_MODEL.value},
+        ) as request_span,
+    ):
+        await interaction.response.defer()
 
-    limit = min(num_messages, MAX_CONTENT_LENGTH)
+        limit = min(num_messages, MAX_CONTENT_LENGTH)
 
-    start_message_id = None
-    if start_message is not None:
-        start_message_id = int(start_message)
+        start_message_id = None
+        if start_message is not None:
+            start_message_id = int(start_message)
 
-    end_message_id = None
-    if end_message is not None:
-        end_message_id = int(end_message)
-        tracking = False
-    else:
-        tracking = True
+        end_message_id = None
+        if end_message is not None:
+            end_message_id = int(end_message)
+            tracking = False
+        else:
+            tracking = True
 
-    messages: list[gpt.Message] = []
+        messages: list[gpt.Message] = []
 
-    async for message in interaction.channel.history(limit=limit):
-        content = message.clean_content
-        if not content:  # ignore empty messages (e.g. only images)
-            continue
+        with tracing.tracer.start_as_current_span(
+            "discord.history", kind=SpanKind.CLIENT
+        ):
+            async for message in interaction.channel.history(limit=limit):
+                content = message.clean_content
+                if not content:  # ignore empty messages (e.g. only images)
+                    continue
 
-        author_name = ai_conversations.get_author_name(message.author.id)
+                author_name = ai_conversations.get_author_name(message.author.id)
 
-        if tracking:
-            messages.append(
-                {
-                    "role": "user",
-                    "content": [
+                if tracking:
+                    messages.append(
                         {
-                            "type": "text",
-                            "text": f"{author_name}: {content}",
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "text",
+                                    "text": f"{author_name}: {content}",
+                                }
+                            ],
                         }
-                    ],
-                }
+                    )
+                elif end_message_id is not None:
+                    if message.id == end_message_id:
+                        tracking = True
+
+                if start_message_id is not None and message.id == start_message_id:
+                    break
+
+        messages = messages[::-1]  # reverse it
+
+        messages.append(
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "Could you summarize the above conversation?",
+                    }
+                ],
+            }
+        )
+
+        request_span.set_attribute("app.history_size", len(messages))
+
+        try:
+            with tracing.tracer.start_as_current_span(
+                "gpt.send",
+                attributes={
+                    "gen_ai.request.model": gpt.DEFAULT_AI_MODEL.value,
+                    "app.round": 1,
+                },
+            ):
+                gpt_response = await gpt.send(
+                    model=gpt.DEFAULT_AI_MODEL,
+                    messages=messages,
+                )
+        except Exception as exc:
+            # NOTE: this is *generally* bad practice to expose this information
+            # to end users, and should be removed if we are to deploy this app
+            # more widely. Right now it's okay because it's a private bot.
+            await interaction.followup.send(
+                f"Request to OpenAI failed with the following error:\n```\n{exc}```"
             )
-        elif end_message_id is not None:
-            if message.id == end_message_id:
-                tracking = True
-
-        if start_message_id is not None and message.id == start_message_id:
-            break
-
-    messages = messages[::-1]  # reverse it
-
-    messages.append(
-        {
-            "role": "user",
-            "content": [
-                {
-                    "type": "text",
-                    "text": "Could you summarize the above conversation?",
-                }
-            ],
-        }
-    )
+            return
 
-    try:
-        gpt_response = await gpt.send(
-            model=gpt.DEFAULT_AI_MODEL,
-            messages=messages,
-        )
-    except Exception as exc:
-        # NOTE: this is *generally* bad practice to expose this information
-        # to end users, and should be removed if we are to deploy this app
-        # more widely. Right now it's okay because it's a private bot.
-        await interaction.followup.send(
-            f"Request to OpenAI failed with the following error:\n```\n{exc}```"
-        )
-        return
+        gpt_response_content = gpt_response.response_content
+        assert gpt_response_content is not None
 
-    gpt_response_content = gpt_response.response_content
-    assert gpt_response_content is not None
+        request_span.set_attributes(
+            {
+                "gen_ai.usage.input_tokens": gpt_response.input_tokens,
+                "gen_ai.usage.output_tokens": gpt_response.output_tokens,
+            }
+        )
 
-    # tokens_spent = gpt_response.usage.total_tokens
+        chunks = discord_message_utils.split_message_into_chunks(
+            gpt_response_content, max_length=2000
+        )
+        request_span.set_attribute("app.chunks", len(chunks))
 
-    for chunk in discord_message_utils.split_message_into_chunks(
-        gpt_response_content, max_length=2000
-    ):
-        await interaction.followup.send(chunk)
+        for chunk in chunks:
+            with _track_discord_send():
+                await interaction.followup.send(chunk)
 
 
 @command_tree.command(name=command_name("ai"))
@@ -458,36 +571,66 @@ async def transcript(
 
     await interaction.response.defer()
 
-    thread = await threads.fetch_one(interaction.channel.id)
-    if thread is None:
-        await interaction.followup.send(
-            "This thread is not tracked by the bot.",
-            ephemeral=True,
-        )
-        return
+    async with _report(interaction):
+        thread = await threads.fetch_one(interaction.channel.id)
+        if thread is None:
+            await interaction.followup.send(
+                "This thread is not tracked by the bot.",
+                ephemeral=True,
+            )
+            return
 
-    if context_length is None:
-        current_thread_messages = await thread_messages.fetch_many(
-            thread_id=interaction.channel.id
-        )
-    else:
-        current_thread_messages = await thread_messages.fetch_many(
-            thread_id=interaction.channel.id,
-            page=1,
-            page_size=context_length,
-            sort_order="desc",
+        if thread.archived_at is not None:
+            # read from the archive, rather than rehydrating the thread
+            archived_messages = await thread_retention.fetch_archived_messages(
+                thread.thread_id
+            )
+            if context_length is not None:
+                archived_messages = archived_messages[
+                    max(len(archived_messages) - context_length, 0) :
+                ]
+            current_thread_messages = _iterate(archived_messages)
+        elif context_length is None:
+            current_thread_messages = thread_messages.iterate_many(
+                interaction.channel.id
+            )
+        else:
+            latest_thread_messages = await thread_messages.fetch_page(
+                thread_id=interaction.channel.id,
+                page_size=context_length,
+                sort_order="desc",
+            )
+            current_thread_messages = _iterate(latest_thread_messages.items[::-1])
+
+        transcript = await transcripts.write(current_thread_messages)
+        transcript_parts = await asyncio.to_thread(
+            transcripts.split,
+            transcript,
+            size_limit=(
+                interaction.guild.filesize_limit
+                if interaction.guild is not None
+                else DEFAULT_UPLOAD_SIZE_LIMIT
+            ),
         )
-        current_thread_messages = current_thread_messages[::-1]
 
-    transcript_content = "\n".join(
-        f"[{msg.created_at:%d/%m/%Y %I:%M:%S%p}] {msg.content}"
-        for msg in current_thread_messages
-    )
-    with io.BytesIO(transcript_content.encode()) as f:
-        await interaction.followup.send(
-            content=f"{interaction.user.mention}: here is your AI transcript for this thread.",
-            file=discord.File(f, filename="transcript.txt"),
+        content = (
+            f"{interaction.user.mention}: here is your AI transcript for this thread."
         )
+        try:
+            for i in range(0, len(transcript_parts), MAX_ATTACHMENTS_PER_MESSAGE):
+                with _track_discord_send():
+                    await interaction.followup.send(
+                        content=content if i == 0 else None,
+                        files=[
+                            discord.File(part.file, filename=part.filename)
+                            for part in transcript_parts[
+                                i : i + MAX_ATTACHMENTS_PER_MESSAGE
+                            ]
+                        ],
+                    )
+        finally:
+            for part in transcript_parts:
+                part.file.close()
 
 
 @command_tree.command(name=command_name("query"))
@@ -498,26 +641,186 @@ async def query(
 ):
     """Query a model without any context."""
 
+    with slowlog.record_request("query"):
+        await interaction.response.defer()
+
+        result = await ai_conversations.send_message_without_context(
+            bot,
+            interaction,
+            query,
+            model,
+        )
+
+        # I do not think interactions allow multiple messages.
+        messages_to_send: list[str] = []
+        if isinstance(result, Error):
+            if result.code != ErrorCode.SKIP:
+                metrics.ERRORS_TOTAL.labels(code=result.code.value).inc()
+            messages_to_send = result.messages
+        else:
+            messages_to_send = result.response_messages
+
+        # I have no idea whether they actually allow you to send multiple follow-ups.
+        for message_text in messages_to_send:
+            with _track_discord_send():
+                await interaction.followup.send(message_text)
+
+
+@command_tree.command(name=command_name("profile"))
+async def profile(
+    interaction: discord.Interaction,
+    seconds: int = 10,
+    top_n: int = 15,
+):
+    """Sample the event loop for a number of seconds."""
+    if interaction.user.id not in ai_conversations.DISCORD_ADMIN_USER_ID_WHITELIST:
+        await interaction.response.send_message(
+            "You are not allowed to use this command",
+            ephemeral=True,
+        )
+        return
+
     await interaction.response.defer()
 
-    result = await ai_conversations.send_message_without_context(
-        bot,
-        interaction,
-        query,
-        model,
-    )
+    result = await profiling.profile(seconds, top_n=min(top_n, MAX_PROFILE_TOP_N))
+    if result is None:
+        await interaction.followup.send(
+            "A profiling session is already running, please try again later.",
+            ephemeral=True,
+        )
+        return
+
+    message_chunks = [
+        f"**Profiled the event loop for {result.duration_seconds:.0f}s "
+        f"({result.loop_samples} stack samples)**",
+        "Top coroutines by (inclusive) wall time:",
+        "```",
+    ]
+    for qualname, wall_seconds in result.top_coroutines:
+        message_chunks.append(f"{wall_seconds:>8.2f}s  {qualname}")
+    message_chunks.append("```")
+
+    with _track_discord_send():
+        await interaction.followup.send(
+            content="\n".join(message_chunks),
+            files=[
+                discord.File(
+                    io.BytesIO(result.loop_stacks.encode()),
+                    filename="loop-stacks.collapsed",
+                ),
+                discord.File(
+                    io.BytesIO(result.task_stacks.encode()),
+                    filename="task-stacks.collapsed",
+                ),
+            ],
+        )
+
+
+@command_tree.command(name=command_name("memory"))
+async def memory_report(
+    interaction: discord.Interaction,
+    top_n: int = 15,
+):
+    """Report on the bot's memory usage."""
+    if interaction.user.id not in ai_conversations.DISCORD_ADMIN_USER_ID_WHITELIST:
+        await interaction.response.send_message(
+            "You are not allowed to use this command",
+            ephemeral=True,
+        )
+        return
 
-    # I do not think interactions allow multiple messages.
-    messages_to_send: list[str] = []
-    if isinstance(result, Error):
-        messages_to_send = result.messages
+    await interaction.response.defer()
+
+    report = memory.build_report(top_n=min(top_n, MAX_PROFILE_TOP_N))
+
+    report_lines = ["Cache sizes:"]
+    for cache_name, cache_size in report.cache_sizes.items():
+        report_lines.append(f"  {cache_name}: {cache_size}")
+
+    report_lines.extend(("", "Object counts by type:"))
+    for type_name, object_count in report.object_counts:
+        report_lines.append(f"  {object_count:>10}  {type_name}")
+
+    report_lines.extend(("", "Allocations since the last report:"))
+    if report.allocation_diff is None:
+        report_lines.append("  (tracemalloc started; run again to see a diff)")
     else:
-        messages_to_send = result.response_messages
+        report_lines.extend(f"  {line}" for line in report.allocation_diff)
+
+    with (
+        io.BytesIO("\n".join(report_lines).encode()) as f,
+        _track_discord_send(),
+    ):
+        await interaction.followup.send(
+            content=(
+                f"**Memory report** (tracemalloc is tracing "
+                f"{report.traced_memory_bytes / 1024 / 1024:.2f}MiB)"
+            ),
+            file=discord.File(f, filename="memory-report.txt"),
+        )
+
+
+@command_tree.command(name=command_name("slowlog"))
+async def slowlog_report(interaction: discord.Interaction):
+    """Show the slowest recent requests, broken down by stage."""
+    if interaction.user.id not in ai_conversations.DISCORD_ADMIN_USER_ID_WHITELIST:
+        await interaction.response.send_message(
+            "You are not allowed to use this command",
+            ephemeral=True,
+        )
+        return
+
+    records = slowlog.slow_requests.slowest()
+    if not records:
+        await interaction.response.send_message(
+            "No requests have been recorded yet.",
+            ephemeral=True,
+        )
+        return
 
-    # I have no idea whether they actually allow you to send multiple follow-ups.
-    for message_text in messages_to_send:
-        await interaction.followup.send(message_text)
+    await interaction.response.defer()
+
+    message_chunks = [
+        f"**Slowest {len(records)} requests in the last "
+        f"{slowlog.slow_requests.window.total_seconds() / 3600:.0f}h**",
+        "```",
+    ]
+    report_lines: list[str] = []
+    for record in records:
+        model = record.attributes.get("gen_ai.request.model", "-")
+        message_chunks.append(
+            f"{record.duration_seconds:>8.2f}s  {record.kind:<9}  "
+            f"{record.started_at:%d/%m %H:%M:%S}  {model}"
+        )
+
+        report_lines.append(
+            f"{record.started_at:%Y-%m-%d %H:%M:%S} {record.kind} "
+            f"took {record.duration_seconds:.3f}s"
+        )
+        for key, value in record.attributes.items():
+            report_lines.append(f"  {key}: {value}")
+        for stage in record.stages:
+            report_lines.append(
+                f"  +{stage.offset_seconds:>8.3f}s {stage.duration_seconds:>8.3f}s  "
+                f"{stage.name}"
+            )
+        report_lines.append("")
+    message_chunks.append("```")
+
+    with (
+        io.BytesIO("\n".join(report_lines).encode()) as f,
+        _track_discord_send(),
+    ):
+        await interaction.followup.send(
+            content="\n".join(message_chunks),
+            file=discord.File(f, filename="slowlog.txt"),
+        )
 
 
 if __name__ == "__main__":
-    bot.run(settings.DISCORD_TOKEN)
+    log_listener = logger.configure(level=settings.LOG_LEVEL)
+    try:
+        # NOTE: our own logging config replaces discord.py's default handler
+        bot.run(settings.DISCORD_TOKEN, log_handler=None)
+    finally:
+        log_listener.stop()
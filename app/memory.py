@@ -0,0 +1,76 @@
+import gc
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from app import metrics
+
+TRACEMALLOC_FRAMES = 1
+
+_cache_sizers: dict[str, Callable[[], int]] = {}
+_last_snapshot: tracemalloc.Snapshot | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class MemoryReport:
+    cache_sizes: dict[str, int]
+    object_counts: list[tuple[str, int]]
+    # None when tracemalloc was only just started, and there's nothing to diff
+    allocation_diff: list[str] | None
+    traced_memory_bytes: int
+
+
+def register_cache(name: str, sizer: Callable[[], int]) -> None:
+    _cache_sizers[name] = sizer
+    metrics.CACHE_ENTRIES.labels(cache=name).set_function(sizer)
+
+
+def cache_sizes() -> dict[str, int]:
+    return {name: sizer() for name, sizer in _cache_sizers.items()}
+
+
+def object_counts(top_n: int) -> list[tuple[str, int]]:
+    # NOTE: this walks the entire heap, so keep it off hot paths
+    type_counts = Counter(type(obj).__qualname__ for obj in gc.get_objects())
+    return type_counts.most_common(top_n)
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),)
+    )
+
+
+def _take_snapshot_diff(top_n: int) -> list[str] | None:
+    global _last_snapshot
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        _last_snapshot = _take_snapshot()
+        return None
+
+    snapshot = _take_snapshot()
+    diff: list[str] | None = None
+    if _last_snapshot is not None:
+        diff = [str(stat) for stat in snapshot.compare_to(_last_snapshot, "lineno")]
+        diff = diff[:top_n]
+
+    _last_snapshot = snapshot
+    return diff
+
+
+def build_report(top_n: int) -> MemoryReport:
+    """\
+    Report on the process' memory usage. Allocations are diffed
+    against the previous report's tracemalloc snapshot; the first
+    report starts tracing.
+    """
+    allocation_diff = _take_snapshot_diff(top_n)
+    traced_memory_bytes, _ = tracemalloc.get_traced_memory()
+    return MemoryReport(
+        cache_sizes=cache_sizes(),
+        object_counts=object_counts(top_n),
+        allocation_diff=allocation_diff,
+        traced_memory_bytes=traced_memory_bytes,
+    )
@@ -0,0 +1,199 @@
+import functools
+import tracemalloc
+from collections.abc import Awaitable
+from collections.abc import Callable
+from typing import ParamSpec
+from typing import TYPE_CHECKING
+from typing import TypeVar
+
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+
+if TYPE_CHECKING:
+    from app.adapters.database import Database
+    from app.database_routing import DatabaseRouter
+    from app.loop_monitor import LoopMonitor
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# LLM round trips regularly take tens of seconds, so the
+# default prometheus buckets (which top out at 10s) are too small.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+REQUEST_LATENCY_SECONDS = Histogram(
+    "ai_bot_request_latency_seconds",
+    "End-to-end latency of handling a conversation request.",
+    ["handler"],
+    buckets=LATENCY_BUCKETS,
+)
+GPT_REQUEST_LATENCY_SECONDS = Histogram(
+    "ai_bot_gpt_request_latency_seconds",
+    "Latency of a single upstream AI provider request.",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_LATENCY_SECONDS = Histogram(
+    "ai_bot_db_query_latency_seconds",
+    "Latency of repository functions, including (de)serialization.",
+    ["function"],
+)
+DB_STATEMENT_LATENCY_SECONDS = Histogram(
+    "ai_bot_db_statement_latency_seconds",
+    "Latency of individual database statements, excluding connection acquisition.",
+    ["database", "operation"],
+)
+DB_CONNECTION_ACQUIRE_SECONDS = Histogram(
+    "ai_bot_db_connection_acquire_seconds",
+    "Time spent waiting to acquire a connection from a database pool.",
+    ["database"],
+)
+DB_ROWS_RETURNED = Histogram(
+    "ai_bot_db_rows_returned",
+    "Rows returned by database statements.",
+    ["operation"],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000),
+)
+DISCORD_SEND_LATENCY_SECONDS = Histogram(
+    "ai_bot_discord_send_latency_seconds",
+    "Latency of sending a message to discord.",
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "ai_bot_event_loop_lag_seconds",
+    "Delay between when the event loop should have run a callback, and when it did.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+TOKENS_TOTAL = Counter(
+    "ai_bot_tokens_total",
+    "Tokens consumed by upstream AI provider requests.",
+    ["model", "direction"],
+)
+ERRORS_TOTAL = Counter(
+    "ai_bot_errors_total",
+    "Errors returned to users, by error code.",
+    ["code"],
+)
+TOOL_CALLS_TOTAL = Counter(
+    "ai_bot_tool_calls_total",
+    "Function (tool) calls requested by the AI models.",
+    ["function"],
+)
+CACHE_EVICTIONS_TOTAL = Counter(
+    "ai_bot_cache_evictions_total",
+    "Entries evicted from bot-owned caches for exceeding their size caps.",
+    ["cache"],
+)
+DB_ROUTED_READS_TOTAL = Counter(
+    "ai_bot_db_routed_reads_total",
+    "Reads routed to each database, by why they were routed there.",
+    ["database", "reason"],
+)
+DB_POOL_CONNECTIONS_OPENED_TOTAL = Counter(
+    "ai_bot_db_pool_connections_opened_total",
+    "Connections opened by the database pools.",
+    ["database"],
+)
+DB_POOL_CONNECTIONS_CLOSED_TOTAL = Counter(
+    "ai_bot_db_pool_connections_closed_total",
+    "Connections closed by the database pools, for any reason.",
+    ["database"],
+)
+DB_POOL_CONNECTIONS_RECYCLED_TOTAL = Counter(
+    "ai_bot_db_pool_connections_recycled_total",
+    "Connections closed for having outlived their maximum lifetime.",
+    ["database"],
+)
+EVENT_LOOP_BLOCKS_TOTAL = Counter(
+    "ai_bot_event_loop_blocks_total",
+    "Times the event loop was blocked for longer than the lag threshold.",
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "ai_bot_db_pool_connections",
+    "Connections held by the database pools.",
+    ["database", "state"],
+)
+DB_POOL_MAX_CONNECTIONS = Gauge(
+    "ai_bot_db_pool_max_connections",
+    "The most connections which may be acquired from each pool at once.",
+    ["database"],
+)
+DB_HEALTHY = Gauge(
+    "ai_bot_db_healthy",
+    "Whether each database passed its last health check.",
+    ["database"],
+)
+DB_REPLICA_LAG_SECONDS = Gauge(
+    "ai_bot_db_replica_lag_seconds",
+    "How far the read replica was behind the primary, at its last health check.",
+)
+IN_FLIGHT_REQUESTS = Gauge(
+    "ai_bot_in_flight_requests",
+    "Conversation requests currently being handled.",
+    ["handler"],
+)
+
+EVENT_LOOP_LAG_QUANTILE_SECONDS = Gauge(
+    "ai_bot_event_loop_lag_quantile_seconds",
+    "Event loop lag percentiles over the last minute.",
+    ["quantile"],
+)
+
+CACHE_ENTRIES = Gauge(
+    "ai_bot_cache_entries",
+    "Entries held by bot-owned caches.",
+    ["cache"],
+)
+TRACED_MEMORY_BYTES = Gauge(
+    "ai_bot_tracemalloc_traced_bytes",
+    "Memory traced by tracemalloc (zero until tracing is started).",
+)
+TRACED_MEMORY_BYTES.set_function(lambda: tracemalloc.get_traced_memory()[0])
+
+
+def track_database_pool(database: "Database") -> None:
+    DB_POOL_CONNECTIONS.labels(database=database.name, state="in_use").set_function(
+        lambda: database.pool_size() - database.pool_idle_size()
+    )
+    DB_POOL_CONNECTIONS.labels(database=database.name, state="idle").set_function(
+        database.pool_idle_size
+    )
+    DB_POOL_MAX_CONNECTIONS.labels(database=database.name).set_function(
+        database.pool_max_size
+    )
+
+
+def track_database_router(database_router: "DatabaseRouter") -> None:
+    DB_HEALTHY.labels(database=database_router.primary.name).set_function(
+        lambda: database_router.primary_healthy
+    )
+    DB_HEALTHY.labels(database=database_router.replica.name).set_function(
+        lambda: database_router.replica_healthy
+    )
+    DB_REPLICA_LAG_SECONDS.set_function(lambda: database_router.replica_lag)
+
+
+def track_loop_monitor(loop_monitor: "LoopMonitor") -> None:
+    for quantile in (0.5, 0.9, 0.99):
+        EVENT_LOOP_LAG_QUANTILE_SECONDS.labels(quantile=str(quantile)).set_function(
+            lambda quantile=quantile: loop_monitor.lag_quantile(quantile)
+        )
+
+
+def time_repository_function(
+    f: Callable[P, Awaitable[R]],
+) -> Callable[P, Awaitable[R]]:
+    """Record the latency of a repository function, labelled by its name."""
+    repository_name = f.__module__.rsplit(".", maxsplit=1)[-1]
+    histogram = DB_QUERY_LATENCY_SECONDS.labels(
+        function=f"{repository_name}.{f.__name__}"
+    )
+
+    @functools.wraps(f)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        with histogram.time():
+            return await f(*args, **kwargs)
+
+    return wrapper
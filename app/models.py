@@ -11,7 +11,7 @@ SHUTDOWN_TIMEOUT = 15
 
 class DiscordBot(discord.Client):
     async def start(self, *args: Any, **kwargs: Any) -> None:
-        await lifecycle.start()
+        await lifecycle.start(self)
         await super().start(*args, **kwargs)
 
     async def close(self, *args: Any, **kwargs: Any) -> None:
@@ -7,6 +7,7 @@ from typing import Annotated
 from typing import TypeAlias
 from typing import TypedDict
 
+from app import caches
 from app import settings
 from app import state
 from app._typing import UNSET
@@ -118,7 +119,10 @@ def get_full_openai_functions_schema() -> list[FunctionSchema]:
 
 
 # (coordinates don't change; might as well)
-location_cache: dict[str, tuple[float, float]] = {}
+location_cache: caches.LRUCache[str, tuple[float, float]] = caches.LRUCache(
+    "location",
+    maxsize=settings.LOCATION_CACHE_MAX_SIZE,
+)
 
 
 def celcius_to_fahrenheit(degrees_celcius: float) -> float:
@@ -3,77 +3,142 @@
 # without notice.
 # - https://openai.com/api/pricing/
 # - https://api-docs.deepseek.com/quick_start/pricing/
+import bisect
+import functools
+import json
+from collections.abc import Iterable
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+
 from app.adapters.openai.gpt import AIModel
 
+# NOTE: prices are versioned, so that past usage is priced at the
+# rates of the time. to change a price, add a new entry for the model.
+PRICES_PATH = Path(__file__).with_name("model_prices.json")
 
-def input_price_per_million_tokens(model: AIModel) -> float:
-    match model:
-        case AIModel.OPENAI_GPT_5_5:
-            return 5.00
-        case AIModel.OPENAI_GPT_5_4:
-            return 2.50
-        case AIModel.OPENAI_GPT_5_4_MINI:
-            return 0.75
-        case AIModel.OPENAI_GPT_5_4_NANO:
-            return 0.20
-        case AIModel.OPENAI_GPT_4_OMNI:
-            return 2.50
-        case AIModel.OPENAI_GPT_O3:
-            return 2.00
-        case AIModel.OPENAI_GPT_O3_PRO:
-            return 20.00
-        case AIModel.OPENAI_GPT_O4_MINI:
-            return 1.10
-        case AIModel.DEEPSEEK_CHAT:
-            return 0.27
-        case AIModel.DEEPSEEK_REASONER:
-            return 0.55
-        case AIModel.OPENAI_GPT_5_MINI:
-            return 0.25
-        case AIModel.OPENAI_GPT_5:
-            return 1.25
-        case _:
+
+@dataclass(frozen=True, slots=True)
+class ModelPrice:
+    model: AIModel
+    effective_from: date
+    # all in dollars per million tokens
+    input: float
+    cached_input: float
+    output: float
+
+
+class PriceTable:
+    def __init__(self, prices: Iterable[ModelPrice]) -> None:
+        self._prices: dict[AIModel, list[ModelPrice]] = {}
+        for price in sorted(prices, key=lambda price: price.effective_from):
+            self._prices.setdefault(price.model, []).append(price)
+
+        self._effective_froms: dict[AIModel, list[date]] = {
+            model: [price.effective_from for price in prices]
+            for model, prices in self._prices.items()
+        }
+
+    def models(self) -> set[AIModel]:
+        return set(self._prices)
+
+    def price_at(self, model: AIModel, day: date) -> ModelPrice:
+        prices = self._prices.get(model)
+        if prices is None:
             raise NotImplementedError(f"Unknown model: {model}")
 
+        # usage from before a model's first price is priced at that first price
+        version = bisect.bisect_right(self._effective_froms[model], day) - 1
+        return prices[max(version, 0)]
+
+    def cost_many(
+        self,
+        models: Sequence[AIModel],
+        days: Sequence[date],
+        input_tokens: Sequence[int],
+        cached_input_tokens: Sequence[int],
+        output_tokens: Sequence[int],
+    ) -> list[float]:
+        """\
+        Price columns of token counts, in dollars.
+
+        `input_tokens` includes `cached_input_tokens`, as providers report them.
+        """
+        # many rows share a (model, day), so only look each price up once
+        prices: dict[tuple[AIModel, date], ModelPrice] = {}
+        costs: list[float] = []
+        for model, day, input_count, cached_input_count, output_count in zip(
+            models, days, input_tokens, cached_input_tokens, output_tokens, strict=True
+        ):
+            price = prices.get((model, day))
+            if price is None:
+                price = prices[(model, day)] = self.price_at(model, day)
+
+            costs.append(
+                (
+                    (input_count - cached_input_count) * price.input
+                    + cached_input_count * price.cached_input
+                    + output_count * price.output
+                )
+                / 1_000_000
+            )
+        return costs
+
+
+def load_price_table(path: Path = PRICES_PATH) -> PriceTable:
+    with path.open() as f:
+        raw_prices = json.load(f)
+
+    price_table = PriceTable(
+        ModelPrice(
+            model=AIModel(raw_price["model"]),
+            effective_from=date.fromisoformat(raw_price["effective_from"]),
+            input=raw_price["input"],
+            cached_input=raw_price["cached_input"],
+            output=raw_price["output"],
+        )
+        for raw_price in raw_prices
+    )
+
+    unpriced_models = set(AIModel) - price_table.models()
+    if unpriced_models:
+        raise ValueError(f"Missing prices for models: {sorted(unpriced_models)}")
+
+    return price_table
+
+
+@functools.cache
+def price_table() -> PriceTable:
+    return load_price_table()
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def input_price_per_million_tokens(model: AIModel) -> float:
+    return price_table().price_at(model, _today()).input
+
 
 def output_price_per_million_tokens(model: AIModel) -> float:
-    match model:
-        case AIModel.OPENAI_GPT_5_5:
-            return 30.00
-        case AIModel.OPENAI_GPT_5_4:
-            return 15.00
-        case AIModel.OPENAI_GPT_5_4_MINI:
-            return 4.50
-        case AIModel.OPENAI_GPT_5_4_NANO:
-            return 1.25
-        case AIModel.OPENAI_GPT_4_OMNI:
-            return 10.00
-        case AIModel.OPENAI_GPT_O3:
-            return 8.00
-        case AIModel.OPENAI_GPT_O3_PRO:
-            return 80.00
-        case AIModel.OPENAI_GPT_O4_MINI:
-            return 4.40
-        case AIModel.DEEPSEEK_CHAT:
-            return 1.10
-        case AIModel.DEEPSEEK_REASONER:
-            return 2.19
-        case AIModel.OPENAI_GPT_5_MINI:
-            return 2.00
-        case AIModel.OPENAI_GPT_5:
-            return 10.00
-        case _:
-            raise NotImplementedError(f"Unknown model: {model}")
+    return price_table().price_at(model, _today()).output
 
 
 def tokens_to_dollars(
     model: AIModel,
     input_tokens: int,
     output_tokens: int,
+    cached_input_tokens: int = 0,
+    day: date | None = None,
 ) -> float:
-    per_million_input_price = input_price_per_million_tokens(model)
-    per_million_output_price = output_price_per_million_tokens(model)
-    return (
-        input_tokens * per_million_input_price
-        + output_tokens * per_million_output_price
-    ) / 1_000_000
+    (cost,) = price_table().cost_many(
+        [model],
+        [day if day is not None else _today()],
+        [input_tokens],
+        [cached_input_tokens],
+        [output_tokens],
+    )
+    return cost
@@ -0,0 +1,42 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Generic
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class Cursor:
+    """The (created_at, id) position of the last row of a page."""
+
+    created_at: datetime
+    id: int
+
+
+@dataclass(frozen=True)
+class Page(Generic[T]):
+    items: list[T]
+    # pass back as `after` to fetch the following page; None on the last page
+    next_cursor: str | None
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    raw_cursor = json.dumps([cursor.created_at.isoformat(), cursor.id])
+    return base64.urlsafe_b64encode(raw_cursor.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    try:
+        raw_cursor = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, id = json.loads(raw_cursor)
+        return Cursor(created_at=datetime.fromisoformat(created_at), id=int(id))
+    except (binascii.Error, TypeError, ValueError) as exc:
+        raise InvalidCursorError(f"Invalid pagination cursor: {token!r}") from exc
@@ -0,0 +1,102 @@
+import asyncio
+import contextlib
+import logging
+import statistics
+
+from app.adapters.database import AsyncpgDatabase
+from app.adapters.database import Database
+
+LOGGER = logging.getLogger(__name__)
+
+# the acquire wait percentile which is held to the target
+ACQUIRE_WAIT_QUANTILE = 0.9
+
+
+def _quantile(values: list[float], quantile: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+
+    cut_points = statistics.quantiles(values, n=100)
+    return cut_points[min(int(quantile * 100), 99) - 1]
+
+
+class PoolTuner:
+    """\
+    Resizes (adaptively sized) database pools within their bounds,
+    by how long acquiring a connection waited.
+
+    A pool grows by half once the 90th percentile acquire wait over the last
+    interval exceeds the target, and shrinks by one connection once no
+    acquire waited that long and it was left with idle connections. Pools
+    start at their minimum size.
+    """
+
+    def __init__(
+        self,
+        *,
+        databases: list[Database],
+        target_acquire_wait_ms: int,
+        interval_seconds: int,
+    ) -> None:
+        self.databases = databases
+        self.target_acquire_wait = target_acquire_wait_ms / 1000
+        self.interval_seconds = interval_seconds
+
+        self._tune_task: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        for database in self.databases:
+            assert isinstance(database, AsyncpgDatabase)
+            await database.resize(database.min_pool_size)
+
+        self._tune_task = asyncio.create_task(self._tune_forever())
+
+    async def stop(self) -> None:
+        if self._tune_task is not None:
+            self._tune_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._tune_task
+
+    async def tune(self) -> None:
+        for database in self.databases:
+            assert isinstance(database, AsyncpgDatabase)
+            await self._tune_size(database, database.take_acquire_waits())
+
+    async def _tune_size(
+        self,
+        database: AsyncpgDatabase,
+        acquire_waits: list[float],
+    ) -> None:
+        max_size = database.pool_max_size()
+        acquire_wait = _quantile(acquire_waits, ACQUIRE_WAIT_QUANTILE)
+
+        if acquire_wait > self.target_acquire_wait:
+            new_max_size = max_size + max(max_size // 2, 1)
+        elif (
+            all(wait <= self.target_acquire_wait for wait in acquire_waits)
+            and database.pool_idle_size() > 0
+        ):
+            new_max_size = max_size - 1
+        else:
+            return
+
+        await database.resize(new_max_size)
+        if database.pool_max_size() != max_size:
+            LOGGER.info(
+                "Resized database pool",
+                extra={
+                    "database": database.name,
+                    "previous_max_size": max_size,
+                    "max_size": database.pool_max_size(),
+                    "acquire_wait_ms": round(acquire_wait * 1000, 3),
+                },
+            )
+
+    async def _tune_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+
+            try:
+                await self.tune()
+            except Exception:
+                LOGGER.exception("Failed to tune database pools")
@@ -0,0 +1,160 @@
+import asyncio
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from types import FrameType
+
+# keep the profiler's own overhead bounded, regardless of what's requested
+MAX_PROFILE_SECONDS = 60
+THREAD_SAMPLE_INTERVAL = 0.01
+TASK_SAMPLE_INTERVAL = 0.05
+MAX_STACK_DEPTH = 64
+MAX_DISTINCT_STACKS = 10_000
+
+TRUNCATED_STACK = "[truncated]"
+
+_session_lock = asyncio.Lock()
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileResult:
+    duration_seconds: float
+    loop_samples: int
+    # brendan gregg's "collapsed" format, as consumed by flamegraph.pl & speedscope
+    loop_stacks: str
+    task_stacks: str
+    # (coroutine qualname, inclusive wall time in seconds)
+    top_coroutines: list[tuple[str, float]]
+
+
+def _short_path(filename: str) -> str:
+    for marker in ("site-packages/", "/srv/root/"):
+        _, found, remainder = filename.rpartition(marker)
+        if found:
+            return remainder
+    return filename
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({_short_path(code.co_filename)})"
+
+
+def collapse_frame_stack(frame: FrameType | None) -> str:
+    labels: list[str] = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def coroutine_chain(task: asyncio.Task) -> list[str]:
+    """Walk the chain of awaits from a task's coroutine to where it's suspended."""
+    labels: list[str] = []
+    coro = task.get_coro()
+    while coro is not None and len(labels) < MAX_STACK_DEPTH:
+        code = getattr(coro, "cr_code", None) or getattr(coro, "gi_code", None)
+        if code is None:
+            break
+        labels.append(code.co_qualname)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return labels
+
+
+def _count_stack(stacks: Counter[str], stack: str) -> None:
+    if stack not in stacks and len(stacks) >= MAX_DISTINCT_STACKS:
+        stack = TRUNCATED_STACK
+    stacks[stack] += 1
+
+
+def _sample_thread(
+    thread_id: int,
+    stop_event: threading.Event,
+    stacks: Counter[str],
+) -> None:
+    while not stop_event.wait(THREAD_SAMPLE_INTERVAL):
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            _count_stack(stacks, collapse_frame_stack(frame))
+
+
+async def _sample_tasks(
+    stop_event: asyncio.Event,
+    stacks: Counter[str],
+    inclusive_wall_time: Counter[str],
+) -> None:
+    loop = asyncio.get_running_loop()
+    sampler_task = asyncio.current_task()
+    last_sampled_at = loop.time()
+    while not stop_event.is_set():
+        # NOTE: attribute the real elapsed time, since a blocked
+        # loop will delay our samples past the sampling interval.
+        now = loop.time()
+        elapsed = now - last_sampled_at
+        last_sampled_at = now
+
+        for task in asyncio.all_tasks():
+            if task is sampler_task:
+                continue
+
+            chain = coroutine_chain(task)
+            if not chain:
+                continue
+
+            _count_stack(stacks, ";".join(chain))
+            for qualname in set(chain):
+                inclusive_wall_time[qualname] += elapsed
+
+        await asyncio.sleep(TASK_SAMPLE_INTERVAL)
+
+
+def _render_collapsed(stacks: Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+async def profile(duration_seconds: float, top_n: int = 15) -> ProfileResult | None:
+    """\
+    Sample the event loop thread's stacks, and the await chains of
+    all tasks, for the given duration.
+
+    Returns None if another profiling session is already running.
+    """
+    if _session_lock.locked():
+        return None
+
+    async with _session_lock:
+        duration_seconds = min(max(duration_seconds, 0), MAX_PROFILE_SECONDS)
+
+        loop_stacks: Counter[str] = Counter()
+        task_stacks: Counter[str] = Counter()
+        inclusive_wall_time: Counter[str] = Counter()
+
+        stop_thread_sampler = threading.Event()
+        thread_sampler = threading.Thread(
+            target=_sample_thread,
+            args=(threading.get_ident(), stop_thread_sampler, loop_stacks),
+            name="event-loop-profiler",
+            daemon=True,
+        )
+        stop_task_sampler = asyncio.Event()
+        task_sampler = asyncio.create_task(
+            _sample_tasks(stop_task_sampler, task_stacks, inclusive_wall_time)
+        )
+
+        thread_sampler.start()
+        try:
+            await asyncio.sleep(duration_seconds)
+        finally:
+            stop_thread_sampler.set()
+            stop_task_sampler.set()
+            await task_sampler
+            await asyncio.to_thread(thread_sampler.join)
+
+    return ProfileResult(
+        duration_seconds=duration_seconds,
+        loop_samples=loop_stacks.total(),
+        loop_stacks=_render_collapsed(loop_stacks),
+        task_stacks=_render_collapsed(task_stacks),
+        top_coroutines=inclusive_wall_time.most_common(top_n),
+    )
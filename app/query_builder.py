@@ -0,0 +1,62 @@
+# Build statements containing only the predicates & assignments which were given.
+#
+# Statement text is cached per combination, so that each combination is
+# always the same text, which asyncpg prepares (and postgres plans) once
+# per connection.
+import functools
+from collections.abc import Mapping
+from typing import Any
+
+STATEMENT_CACHE_SIZE = 1024
+
+
+def given(**values: Any) -> dict[str, Any]:
+    """Drop the values which weren't given, i.e. are None."""
+    return {name: value for name, value in values.items() if value is not None}
+
+
+def filters(
+    predicates: Mapping[str, str],
+    **values: Any,
+) -> tuple[tuple[str, ...], dict[str, Any]]:
+    """\
+    Pick the predicates (and their values) for the filters which were given,
+    i.e. aren't None, such that absent filters don't appear in the statement.
+    """
+    given_values = given(**values)
+    return tuple(predicates[name] for name in given_values), given_values
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def select(
+    table: str,
+    columns: str,
+    predicates: tuple[str, ...] = (),
+    order_by: str | None = None,
+    limit: bool = False,
+    offset: bool = False,
+) -> str:
+    query = f"SELECT {' '.join(columns.split())} FROM {table}"
+    if predicates:
+        query += f" WHERE {' AND '.join(predicates)}"
+    if order_by is not None:
+        query += f" ORDER BY {order_by}"
+    if limit:
+        query += " LIMIT :limit"
+    if offset:
+        query += " OFFSET :offset"
+    return query
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def update(
+    table: str,
+    assignments: tuple[str, ...],
+    predicates: tuple[str, ...],
+    returning: str | None = None,
+) -> str:
+    set_sql = ", ".join(f"{column} = :{column}" for column in assignments)
+    query = f"UPDATE {table} SET {set_sql} WHERE {' AND '.join(predicates)}"
+    if returning is not None:
+        query += f" RETURNING {' '.join(returning.split())}"
+    return query
@@ -0,0 +1,77 @@
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from app import metrics
+from app import state
+
+READ_PARAMS = """\
+    thread_id,
+    message_count,
+    messages,
+    created_at
+"""
+
+
+@dataclass(slots=True)
+class ThreadMessageArchive:
+    thread_id: int
+    message_count: int
+    # gzip-compressed jsonl of the thread's messages
+    messages: bytes
+    created_at: datetime
+
+
+def deserialize(rec: Mapping[str, Any]) -> ThreadMessageArchive:
+    return ThreadMessageArchive(
+        thread_id=rec["thread_id"],
+        message_count=rec["message_count"],
+        messages=rec["messages"],
+        created_at=rec["created_at"],
+    )
+
+
+@metrics.time_repository_function
+async def create(
+    thread_id: int,
+    message_count: int,
+    messages: bytes,
+) -> ThreadMessageArchive:
+    query = f"""\
+        INSERT INTO thread_message_archives (thread_id, message_count, messages)
+        VALUES (:thread_id, :message_count, :messages)
+        RETURNING {READ_PARAMS}
+    """
+    values: dict[str, Any] = {
+        "thread_id": thread_id,
+        "message_count": message_count,
+        "messages": messages,
+    }
+    rec = await state.write_database.fetch_one(query, values)
+    assert rec is not None
+    return deserialize(rec)
+
+
+@metrics.time_repository_function
+async def fetch_one(thread_id: int) -> ThreadMessageArchive | None:
+    query = f"""\
+        SELECT {READ_PARAMS}
+        FROM thread_message_archives
+        WHERE thread_id = :thread_id
+    """
+    values: dict[str, Any] = {"thread_id": thread_id}
+    rec = await state.database_router.reader(thread_id).fetch_one(query, values)
+    return deserialize(rec) if rec is not None else None
+
+
+@metrics.time_repository_function
+async def delete(thread_id: int) -> ThreadMessageArchive | None:
+    query = f"""\
+        DELETE FROM thread_message_archives
+        WHERE thread_id = :thread_id
+        RETURNING {READ_PARAMS}
+    """
+    values: dict[str, Any] = {"thread_id": thread_id}
+    rec = await state.write_database.fetch_one(query, values)
+    return deserialize(rec) if rec is not None else None
@@ -1,38 +1,77 @@
+from collections.abc import AsyncIterator
 from collections.abc import Mapping
+from collections.abc import Sequence
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import date
 from datetime import datetime
 from typing import Any
 from typing import Literal
 
-from pydantic import BaseModel
-
+from app import compression
+from app import metrics
+from app import pagination
+from app import query_builder
 from app import state
+from app.adapters.openai.gpt import AIModel
 
 READ_PARAMS = """\
     thread_message_id,
     thread_id,
     content,
+    compressed_content,
+    content_codec,
     discord_user_id,
     role,
     tokens_used,
     created_at
 """
 
+DEFAULT_PAGE_SIZE = 1000
+
 
-class ThreadMessage(BaseModel):
+# NOTE: rows are decoded into plain (non-validating) slotted dataclasses,
+# as postgres already guarantees their types; validating (large) result
+# sets row by row was most of the cpu time of transcripts & cost queries.
+@dataclass(slots=True)
+class ThreadMessage:
     thread_message_id: int
     thread_id: int
-    content: str
+    # large content is stored compressed, and only decompressed once read
+    stored_content: compression.StoredContent = field(repr=False)
     discord_user_id: int
     role: Literal["user", "assistant"]
     tokens_used: int
     created_at: datetime
+    _content: str | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def content(self) -> str:
+        if self._content is None:
+            self._content = self.stored_content.decode()
+        return self._content
+
+
+@dataclass(slots=True)
+class RequesterTokenUsage:
+    day: date
+    discord_user_id: int
+    model: AIModel
+    input_tokens: int
+    output_tokens: int
+    # cached tokens aren't tracked per message
+    cached_input_tokens: int = 0
 
 
 def deserialize(rec: Mapping[str, Any]) -> ThreadMessage:
     return ThreadMessage(
         thread_message_id=rec["thread_message_id"],
         thread_id=rec["thread_id"],
-        content=rec["content"],
+        stored_content=compression.StoredContent(
+            text=rec["content"],
+            data=rec["compressed_content"],
+            codec=rec["content_codec"],
+        ),
         discord_user_id=rec["discord_user_id"],
         role=rec["role"],
         tokens_used=rec["tokens_used"],
@@ -40,6 +79,7 @@ def deserialize(rec: Mapping[str, Any]) -> ThreadMessage:
     )
 
 
+@metrics.time_repository_function
 async def create(
     thread_id: int,
     content: str,
@@ -48,22 +88,65 @@ async def create(
     tokens_used: int,
 ) -> ThreadMessage:
     query = f"""\
-        INSERT INTO thread_messages (thread_id, content, discord_user_id, role, tokens_used)
-        VALUES (:thread_id, :content, :discord_user_id, :role, :tokens_used)
+        INSERT INTO thread_messages (thread_id, content, compressed_content, content_codec,
+                                     discord_user_id, role, tokens_used)
+        VALUES (:thread_id, :content, :compressed_content, :content_codec,
+                :discord_user_id, :role, :tokens_used)
         RETURNING {READ_PARAMS}
     """
+    stored_content = compression.compress(content)
     values: dict[str, Any] = {
         "thread_id": thread_id,
-        "content": content,
+        "content": stored_content.text,
+        "compressed_content": stored_content.data,
+        "content_codec": stored_content.codec,
         "discord_user_id": discord_user_id,
         "role": role,
         "tokens_used": tokens_used,
     }
     rec = await state.write_database.fetch_one(query, values)
+    state.database_router.record_write(thread_id)
     assert rec is not None
     return deserialize(rec)
 
 
+@metrics.time_repository_function
+async def create_many(messages: Sequence[ThreadMessage]) -> None:
+    """Insert messages as-is, including their ids & creation times."""
+    query = """\
+        INSERT INTO thread_messages (thread_message_id, thread_id, content,
+                                     compressed_content, content_codec,
+                                     discord_user_id, role, tokens_used, created_at)
+        VALUES (:thread_message_id, :thread_id, :content,
+                :compressed_content, :content_codec,
+                :discord_user_id, :role, :tokens_used, :created_at)
+    """
+    values: list[dict[str, Any]] = []
+    for message in messages:
+        stored_content = (
+            message.stored_content
+            if message.stored_content.codec is not None
+            else compression.compress(message.content)
+        )
+        values.append(
+            {
+                "thread_message_id": message.thread_message_id,
+                "thread_id": message.thread_id,
+                "content": stored_content.text,
+                "compressed_content": stored_content.data,
+                "content_codec": stored_content.codec,
+                "discord_user_id": message.discord_user_id,
+                "role": message.role,
+                "tokens_used": message.tokens_used,
+                "created_at": message.created_at,
+            }
+        )
+    await state.write_database.execute_many(query, values)
+    for thread_id in {message.thread_id for message in messages}:
+        state.database_router.record_write(thread_id)
+
+
+@metrics.time_repository_function
 async def fetch_one(thread_message_id: int) -> ThreadMessage | None:
     query = f"""\
         SELECT {READ_PARAMS}
@@ -71,10 +154,19 @@ async def fetch_one(thread_message_id: int) -> ThreadMessage | None:
         WHERE thread_message_id = :thread_message_id
     """
     values: dict[str, Any] = {"thread_message_id": thread_message_id}
-    rec = await state.read_database.fetch_one(query, values)
+    rec = await state.database_router.reader().fetch_one(query, values)
     return deserialize(rec) if rec is not None else None
 
 
+FETCH_MANY_PREDICATES = {
+    "thread_id": "thread_id = :thread_id",
+    "discord_user_id": "discord_user_id = :discord_user_id",
+    "role": "role = :role",
+    "created_at_gte": "created_at >= :created_at_gte",
+}
+
+
+@metrics.time_repository_function
 async def fetch_many(
     thread_id: int | None = None,
     discord_user_id: int | None = None,
@@ -84,26 +176,196 @@ async def fetch_many(
     page_size: int | None = None,
     sort_order: Literal["asc", "desc"] = "asc",
 ) -> list[ThreadMessage]:
-    query = f"""\
-        SELECT {READ_PARAMS}
-        FROM thread_messages
-        WHERE thread_id = COALESCE(:thread_id, thread_id)
-        AND discord_user_id = COALESCE(:discord_user_id, discord_user_id)
-        AND role = COALESCE(:role, role)
-    """
-    values: dict[str, Any] = {
-        "thread_id": thread_id,
-        "discord_user_id": discord_user_id,
-        "role": role,
-    }
-    if created_at_gte is not None:
-        query += " AND created_at >= :created_at_gte"
-        values["created_at_gte"] = created_at_gte
+    predicates, values = query_builder.filters(
+        FETCH_MANY_PREDICATES,
+        thread_id=thread_id,
+        discord_user_id=discord_user_id,
+        role=role,
+        created_at_gte=created_at_gte,
+    )
     order_sql = "DESC" if sort_order == "desc" else "ASC"
-    query += f" ORDER BY created_at {order_sql}, thread_message_id {order_sql}"
+    paginate = page is not None and page_size is not None
+    query = query_builder.select(
+        "thread_messages",
+        READ_PARAMS,
+        predicates,
+        order_by=f"created_at {order_sql}, thread_message_id {order_sql}",
+        limit=paginate,
+        offset=paginate,
+    )
     if page is not None and page_size is not None:
-        query += " LIMIT :page_size OFFSET :offset"
-        values["page_size"] = page_size
+        values["limit"] = page_size
         values["offset"] = (page - 1) * page_size
-    recs = await state.read_database.fetch_all(query, values)
+    recs = await state.database_router.reader(thread_id).fetch_all(query, values)
     return [deserialize(rec) for rec in recs]
+
+
+@metrics.time_repository_function
+async def fetch_page(
+    thread_id: int | None = None,
+    discord_user_id: int | None = None,
+    role: Literal["user", "assistant"] | None = None,
+    created_at_gte: datetime | None = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    after: str | None = None,
+    sort_order: Literal["asc", "desc"] = "asc",
+) -> pagination.Page[ThreadMessage]:
+    """\
+    Fetch a page of messages, seeking past the `after` cursor
+    on (created_at, thread_message_id), rather than using OFFSET.
+    """
+    predicates, values = query_builder.filters(
+        FETCH_MANY_PREDICATES,
+        thread_id=thread_id,
+        discord_user_id=discord_user_id,
+        role=role,
+        created_at_gte=created_at_gte,
+    )
+    order_sql = "DESC" if sort_order == "desc" else "ASC"
+    if after is not None:
+        cursor = pagination.decode_cursor(after)
+        comparison_sql = "<" if sort_order == "desc" else ">"
+        predicates += (
+            f"(created_at, thread_message_id) {comparison_sql}"
+            " (:after_created_at, :after_thread_message_id)",
+        )
+        values["after_created_at"] = cursor.created_at
+        values["after_thread_message_id"] = cursor.id
+    query = query_builder.select(
+        "thread_messages",
+        READ_PARAMS,
+        predicates,
+        order_by=f"created_at {order_sql}, thread_message_id {order_sql}",
+        limit=True,
+    )
+    # fetch one extra row, to know whether there's a following page
+    values["limit"] = page_size + 1
+    recs = await state.database_router.reader(thread_id).fetch_all(query, values)
+
+    items = [deserialize(rec) for rec in recs[:page_size]]
+    next_cursor = (
+        pagination.encode_cursor(
+            pagination.Cursor(
+                created_at=items[-1].created_at,
+                id=items[-1].thread_message_id,
+            )
+        )
+        if len(recs) > page_size
+        else None
+    )
+    return pagination.Page(items=items, next_cursor=next_cursor)
+
+
+async def iterate_many(
+    thread_id: int,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> AsyncIterator[ThreadMessage]:
+    """Stream a thread's messages in order, a page at a time."""
+    after: str | None = None
+    while True:
+        page = await fetch_page(thread_id=thread_id, page_size=page_size, after=after)
+        for message in page.items:
+            yield message
+
+        if page.next_cursor is None:
+            return
+        after = page.next_cursor
+
+
+@metrics.time_repository_function
+async def delete_many(thread_id: int, thread_message_id_lte: int) -> None:
+    query = """\
+        DELETE FROM thread_messages
+        WHERE thread_id = :thread_id
+        AND thread_message_id <= :thread_message_id_lte
+    """
+    values: dict[str, Any] = {
+        "thread_id": thread_id,
+        "thread_message_id_lte": thread_message_id_lte,
+    }
+    await state.write_database.execute(query, values)
+    state.database_router.record_write(thread_id)
+
+
+@metrics.time_repository_function
+async def create_partitions(months_ahead: int) -> None:
+    """Create the monthly partitions from this month, to `months_ahead` ahead."""
+    query = """\
+        SELECT create_thread_messages_partitions(
+            NOW(),
+            NOW() + make_interval(months => :months_ahead)
+        )
+    """
+    values: dict[str, Any] = {"months_ahead": months_ahead}
+    await state.write_database.execute(query, values)
+
+
+@metrics.time_repository_function
+async def create_partitions_covering(from_at: datetime, to_at: datetime) -> None:
+    """Create any missing monthly partitions covering [from_at, to_at]."""
+    query = "SELECT create_thread_messages_partitions(:from_at, :to_at)"
+    values: dict[str, Any] = {"from_at": from_at, "to_at": to_at}
+    await state.write_database.execute(query, values)
+
+
+TOKEN_USAGE_PREDICATES = {
+    "thread_id": "thread_messages.thread_id = :thread_id",
+}
+
+
+@metrics.time_repository_function
+async def fetch_token_usage_per_requester(
+    thread_id: int | None = None,
+) -> list[RequesterTokenUsage]:
+    """\
+    Sum the tokens used per (utc day, requester, model).
+
+    Assistant messages are attributed to the author of the
+    message which prompted them, i.e. the one before it. Only whole
+    threads are filtered, so that every reply's prompt is in the window.
+    """
+    predicates, values = query_builder.filters(
+        TOKEN_USAGE_PREDICATES,
+        thread_id=thread_id,
+    )
+    where_sql = f"WHERE {' AND '.join(predicates)}" if predicates else ""
+    query = f"""\
+        WITH attributed_messages AS (
+            SELECT
+                (thread_messages.created_at AT TIME ZONE 'UTC')::date AS day,
+                thread_messages.role,
+                thread_messages.tokens_used,
+                threads.model,
+                CASE
+                    WHEN thread_messages.role = 'user'
+                    THEN thread_messages.discord_user_id
+                    ELSE LAG(thread_messages.discord_user_id) OVER (
+                        PARTITION BY thread_messages.thread_id
+                        ORDER BY thread_messages.created_at, thread_messages.thread_message_id
+                    )
+                END AS requester_user_id
+            FROM thread_messages
+            INNER JOIN threads ON threads.thread_id = thread_messages.thread_id
+            {where_sql}
+        )
+        SELECT
+            day,
+            requester_user_id,
+            model,
+            COALESCE(SUM(tokens_used) FILTER (WHERE role = 'user'), 0) AS input_tokens,
+            COALESCE(SUM(tokens_used) FILTER (WHERE role = 'assistant'), 0) AS output_tokens
+        FROM attributed_messages
+        WHERE requester_user_id IS NOT NULL
+        GROUP BY day, requester_user_id, model
+    """
+    recs = await state.database_router.reader(thread_id).fetch_all(query, values)
+    return [
+        RequesterTokenUsage(
+            day=rec["day"],
+            discord_user_id=rec["requester_user_id"],
+            model=AIModel(rec["model"]),
+            input_tokens=rec["input_tokens"],
+            output_tokens=rec["output_tokens"],
+        )
+        for rec in recs
+    ]
@@ -1,9 +1,11 @@
 from collections.abc import Mapping
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
-from pydantic import BaseModel
-
+from app import metrics
+from app import pagination
+from app import query_builder
 from app import state
 from app.adapters.openai.gpt import AIModel
 
@@ -12,16 +14,22 @@ READ_PARAMS = """\
     initiator_user_id,
     model,
     context_length,
-    created_at
+    created_at,
+    archived_at
 """
 
+DEFAULT_PAGE_SIZE = 1000
+
 
-class Thread(BaseModel):
+@dataclass(slots=True)
+class Thread:
     thread_id: int
     initiator_user_id: int
     model: AIModel
     context_length: int
     created_at: datetime
+    # set while the thread's messages are archived
+    archived_at: datetime | None = None
 
 
 def deserialize(rec: Mapping[str, Any]) -> Thread:
@@ -31,9 +39,11 @@ def deserialize(rec: Mapping[str, Any]) -> Thread:
         model=AIModel(rec["model"]),
         context_length=rec["context_length"],
         created_at=rec["created_at"],
+        archived_at=rec["archived_at"],
     )
 
 
+@metrics.time_repository_function
 async def create(
     thread_id: int,
     initiator_user_id: int,
@@ -52,10 +62,12 @@ async def create(
         "context_length": context_length,
     }
     rec = await state.write_database.fetch_one(query, values)
+    state.database_router.record_write(thread_id)
     assert rec is not None
     return deserialize(rec)
 
 
+@metrics.time_repository_function
 async def fetch_one(thread_id: int) -> Thread | None:
     query = f"""\
         SELECT {READ_PARAMS}
@@ -63,10 +75,18 @@ async def fetch_one(thread_id: int) -> Thread | None:
         WHERE thread_id = :thread_id
     """
     values: dict[str, Any] = {"thread_id": thread_id}
-    rec = await state.read_database.fetch_one(query, values)
+    rec = await state.database_router.reader(thread_id).fetch_one(query, values)
     return deserialize(rec) if rec is not None else None
 
 
+FETCH_MANY_PREDICATES = {
+    "initiator_user_id": "initiator_user_id = :initiator_user_id",
+    "model": "model = :model",
+    "context_length": "context_length = :context_length",
+}
+
+
+@metrics.time_repository_function
 async def fetch_many(
     initiator_user_id: int | None = None,
     model: AIModel | None = None,
@@ -74,45 +94,171 @@ async def fetch_many(
     page: int | None = None,
     page_size: int | None = None,
 ) -> list[Thread]:
-    query = f"""\
-        SELECT {READ_PARAMS}
-        FROM threads
-        WHERE initiator_user_id = COALESCE(:initiator_user_id, initiator_user_id)
-        AND model = COALESCE(:model, model)
-        AND context_length = COALESCE(:context_length, context_length)
-    """
-    values: dict[str, Any] = {
-        "initiator_user_id": initiator_user_id,
-        "model": model.value if model else None,
-        "context_length": context_length,
-    }
+    predicates, values = query_builder.filters(
+        FETCH_MANY_PREDICATES,
+        initiator_user_id=initiator_user_id,
+        model=model.value if model else None,
+        context_length=context_length,
+    )
+    paginate = page is not None and page_size is not None
+    query = query_builder.select(
+        "threads",
+        READ_PARAMS,
+        predicates,
+        order_by="created_at ASC, thread_id ASC",
+        limit=paginate,
+        offset=paginate,
+    )
     if page is not None and page_size is not None:
-        query += "LIMIT :page_size OFFSET :offset"
-        values["page_size"] = page_size
+        values["limit"] = page_size
         values["offset"] = (page - 1) * page_size
-    recs = await state.read_database.fetch_all(query, values)
+    recs = await state.database_router.reader().fetch_all(query, values)
     return [deserialize(rec) for rec in recs]
 
 
+@metrics.time_repository_function
+async def fetch_page(
+    initiator_user_id: int | None = None,
+    model: AIModel | None = None,
+    context_length: int | None = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    after: str | None = None,
+) -> pagination.Page[Thread]:
+    """\
+    Fetch a page of threads, seeking past the `after` cursor
+    on (created_at, thread_id), rather than using OFFSET.
+    """
+    predicates, values = query_builder.filters(
+        FETCH_MANY_PREDICATES,
+        initiator_user_id=initiator_user_id,
+        model=model.value if model else None,
+        context_length=context_length,
+    )
+    if after is not None:
+        cursor = pagination.decode_cursor(after)
+        predicates += (
+            "(created_at, thread_id) > (:after_created_at, :after_thread_id)",
+        )
+        values["after_created_at"] = cursor.created_at
+        values["after_thread_id"] = cursor.id
+    query = query_builder.select(
+        "threads",
+        READ_PARAMS,
+        predicates,
+        order_by="created_at ASC, thread_id ASC",
+        limit=True,
+    )
+    # fetch one extra row, to know whether there's a following page
+    values["limit"] = page_size + 1
+    recs = await state.database_router.reader().fetch_all(query, values)
+
+    items = [deserialize(rec) for rec in recs[:page_size]]
+    next_cursor = (
+        pagination.encode_cursor(
+            pagination.Cursor(created_at=items[-1].created_at, id=items[-1].thread_id)
+        )
+        if len(recs) > page_size
+        else None
+    )
+    return pagination.Page(items=items, next_cursor=next_cursor)
+
+
+@metrics.time_repository_function
 async def partial_update(
     thread_id: int,
     initiator_user_id: int | None = None,
     model: AIModel | None = None,
     context_length: int | None = None,
 ) -> Thread | None:
+    values = query_builder.given(
+        initiator_user_id=initiator_user_id,
+        model=model.value if model else None,
+        context_length=context_length,
+    )
+    assignments = tuple(values)
+    values["thread_id"] = thread_id
+    if not assignments:
+        # nothing to update, but keep returning the (current) thread
+        query = query_builder.select(
+            "threads",
+            READ_PARAMS,
+            ("thread_id = :thread_id",),
+        )
+    else:
+        query = query_builder.update(
+            "threads",
+            assignments,
+            ("thread_id = :thread_id",),
+            returning=READ_PARAMS,
+        )
+    rec = await state.write_database.fetch_one(query, values)
+    state.database_router.record_write(thread_id)
+    return deserialize(rec) if rec is not None else None
+
+
+IDLE_THREAD_PREDICATES = (
+    "archived_at IS NULL",
+    "created_at < :idle_before",
+    "NOT EXISTS ("
+    "SELECT 1 FROM thread_messages"
+    " WHERE thread_messages.thread_id = threads.thread_id"
+    " AND thread_messages.created_at >= :idle_before"
+    ")",
+)
+
+
+@metrics.time_repository_function
+async def fetch_idle_thread_ids(
+    idle_before: datetime,
+    limit: int,
+    after_thread_id: int | None = None,
+) -> list[int]:
+    """Fetch unarchived threads without any messages since `idle_before`."""
+    predicates = IDLE_THREAD_PREDICATES
+    values: dict[str, Any] = {"idle_before": idle_before, "limit": limit}
+    if after_thread_id is not None:
+        predicates += ("thread_id > :after_thread_id",)
+        values["after_thread_id"] = after_thread_id
+    query = query_builder.select(
+        "threads",
+        "thread_id",
+        predicates,
+        order_by="thread_id ASC",
+        limit=True,
+    )
+    recs = await state.database_router.reader().fetch_all(query, values)
+    return [rec["thread_id"] for rec in recs]
+
+
+@metrics.time_repository_function
+async def mark_archived(thread_id: int, idle_before: datetime) -> Thread | None:
+    """Mark a thread as archived, if it's (still) idle since `idle_before`."""
     query = f"""\
         UPDATE threads
-        SET initiator_user_id = COALESCE(:initiator_user_id, initiator_user_id),
-            model = COALESCE(:model, model),
-            context_length = COALESCE(:context_length, context_length)
+        SET archived_at = NOW()
         WHERE thread_id = :thread_id
+        AND archived_at IS NULL
+        AND NOT EXISTS (
+            SELECT 1
+            FROM thread_messages
+            WHERE thread_messages.thread_id = threads.thread_id
+            AND thread_messages.created_at >= :idle_before
+        )
         RETURNING {READ_PARAMS}
     """
-    values: dict[str, Any] = {
-        "thread_id": thread_id,
-        "initiator_user_id": initiator_user_id,
-        "model": model.value if model else None,
-        "context_length": context_length,
-    }
+    values: dict[str, Any] = {"thread_id": thread_id, "idle_before": idle_before}
     rec = await state.write_database.fetch_one(query, values)
+    state.database_router.record_write(thread_id)
     return deserialize(rec) if rec is not None else None
+
+
+@metrics.time_repository_function
+async def mark_unarchived(thread_id: int) -> None:
+    query = """\
+        UPDATE threads
+        SET archived_at = NULL
+        WHERE thread_id = :thread_id
+    """
+    values: dict[str, Any] = {"thread_id": thread_id}
+    await state.write_database.execute(query, values)
+    state.database_router.record_write(thread_id)
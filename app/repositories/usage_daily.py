@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from datetime import date
+from datetime import datetime
+from datetime import time
+from datetime import timezone
+from typing import Any
+
+from app import metrics
+from app import state
+from app.adapters.openai.gpt import AIModel
+
+
+@dataclass(slots=True)
+class RequesterTokenUsage:
+    day: date
+    discord_user_id: int
+    model: AIModel
+    input_tokens: int
+    cached_input_tokens: int
+    output_tokens: int
+
+
+def _utc_midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+@metrics.time_repository_function
+async def increment(
+    discord_user_id: int,
+    model: AIModel,
+    input_tokens: int,
+    cached_input_tokens: int,
+    output_tokens: int,
+) -> None:
+    query = """\
+        INSERT INTO usage_daily (day, discord_user_id, model, input_tokens, cached_input_tokens, output_tokens)
+        VALUES ((NOW() AT TIME ZONE 'UTC')::date, :discord_user_id, :model, :input_tokens, :cached_input_tokens, :output_tokens)
+        ON CONFLICT (day, discord_user_id, model) DO UPDATE SET
+            input_tokens = usage_daily.input_tokens + EXCLUDED.input_tokens,
+            cached_input_tokens = usage_daily.cached_input_tokens + EXCLUDED.cached_input_tokens,
+            output_tokens = usage_daily.output_tokens + EXCLUDED.output_tokens
+    """
+    values: dict[str, Any] = {
+        "discord_user_id": discord_user_id,
+        "model": model.value,
+        "input_tokens": input_tokens,
+        "cached_input_tokens": cached_input_tokens,
+        "output_tokens": output_tokens,
+    }
+    await state.write_database.execute(query, values)
+
+
+@metrics.time_repository_function
+async def fetch_token_usage_per_requester(
+    day_gte: date,
+) -> list[RequesterTokenUsage]:
+    query = """\
+        SELECT day, discord_user_id, model, input_tokens, cached_input_tokens, output_tokens
+        FROM usage_daily
+        WHERE day >= :day_gte
+    """
+    values: dict[str, Any] = {"day_gte": day_gte}
+    recs = await state.database_router.reader().fetch_all(query, values)
+    return [
+        RequesterTokenUsage(
+            day=rec["day"],
+            discord_user_id=rec["discord_user_id"],
+            model=AIModel(rec["model"]),
+            input_tokens=rec["input_tokens"],
+            cached_input_tokens=rec["cached_input_tokens"],
+            output_tokens=rec["output_tokens"],
+        )
+        for rec in recs
+    ]
+
+
+@metrics.time_repository_function
+async def fetch_latest_day(day_lt: date) -> date | None:
+    query = """\
+        SELECT MAX(day)
+        FROM usage_daily
+        WHERE day < :day_lt
+    """
+    values: dict[str, Any] = {"day_lt": day_lt}
+    return await state.database_router.reader().fetch_val(query, values)
+
+
+@metrics.time_repository_function
+async def backfill(day_gte: date | None, day_lt: date) -> None:
+    """\
+    Recompute the rollups for (utc) days in [day_gte, day_lt) from thread_messages.
+
+    Replies are attributed to the prompt before them over the whole thread,
+    before restricting to the days, so a reply just after midnight still
+    counts towards its requester when the prompt was sent the day before.
+
+    Cached input tokens aren't stored per message, so they're left as-is.
+    Archived threads' messages aren't counted, so only recompute days
+    more recent than the thread retention period.
+    """
+    query = """\
+        INSERT INTO usage_daily (day, discord_user_id, model, input_tokens, output_tokens)
+        SELECT
+            day,
+            requester_user_id,
+            model,
+            COALESCE(SUM(tokens_used) FILTER (WHERE role = 'user'), 0),
+            COALESCE(SUM(tokens_used) FILTER (WHERE role = 'assistant'), 0)
+        FROM (
+            SELECT
+                thread_messages.created_at,
+                (thread_messages.created_at AT TIME ZONE 'UTC')::date AS day,
+                thread_messages.role,
+                thread_messages.tokens_used,
+                threads.model,
+                CASE
+                    WHEN thread_messages.role = 'user'
+                    THEN thread_messages.discord_user_id
+                    ELSE LAG(thread_messages.discord_user_id) OVER (
+                        PARTITION BY thread_messages.thread_id
+                        ORDER BY thread_messages.created_at, thread_messages.thread_message_id
+                    )
+                END AS requester_user_id
+            FROM thread_messages
+            INNER JOIN threads ON threads.thread_id = thread_messages.thread_id
+            WHERE thread_messages.created_at < :created_at_lt
+            {thread_id_filter}
+        ) AS attributed_messages
+        WHERE requester_user_id IS NOT NULL
+        {created_at_gte_filter}
+        GROUP BY day, requester_user_id, model
+        ON CONFLICT (day, discord_user_id, model) DO UPDATE SET
+            input_tokens = EXCLUDED.input_tokens,
+            output_tokens = EXCLUDED.output_tokens
+    """
+    values: dict[str, Any] = {"created_at_lt": _utc_midnight(day_lt)}
+    thread_id_filter = ""
+    created_at_gte_filter = ""
+    if day_gte is not None:
+        # the threads with messages on the days, with all their earlier messages
+        thread_id_filter = """\
+            AND thread_messages.thread_id IN (
+                SELECT thread_id
+                FROM thread_messages
+                WHERE created_at >= :created_at_gte
+                AND created_at < :created_at_lt
+            )
+        """
+        created_at_gte_filter = "AND created_at >= :created_at_gte"
+        values["created_at_gte"] = _utc_midnight(day_gte)
+    await state.write_database.execute(
+        query.format(
+            thread_id_filter=thread_id_filter,
+            created_at_gte_filter=created_at_gte_filter,
+        ),
+        values,
+    )
@@ -0,0 +1,118 @@
+from collections.abc import Mapping
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from app import metrics
+from app import state
+from app.adapters.openai.gpt import AIModel
+from app.adapters.openai.gpt import AIProvider
+
+READ_PARAMS = """\
+    usage_ledger_id,
+    thread_id,
+    discord_user_id,
+    model,
+    provider,
+    round,
+    input_tokens,
+    cached_input_tokens,
+    output_tokens,
+    reasoning_tokens,
+    latency_ms,
+    created_at
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class RoundUsage:
+    """The usage of a single upstream request, within a turn."""
+
+    round: int
+    input_tokens: int
+    cached_input_tokens: int
+    output_tokens: int
+    reasoning_tokens: int
+    latency_ms: int
+
+
+@dataclass(slots=True)
+class UsageLedgerEntry:
+    usage_ledger_id: int
+    thread_id: int
+    discord_user_id: int
+    model: AIModel
+    provider: AIProvider
+    round: int
+    input_tokens: int
+    cached_input_tokens: int
+    output_tokens: int
+    reasoning_tokens: int
+    latency_ms: int
+    created_at: datetime
+
+
+def deserialize(rec: Mapping[str, Any]) -> UsageLedgerEntry:
+    return UsageLedgerEntry(
+        usage_ledger_id=rec["usage_ledger_id"],
+        thread_id=rec["thread_id"],
+        discord_user_id=rec["discord_user_id"],
+        model=AIModel(rec["model"]),
+        provider=AIProvider(rec["provider"]),
+        round=rec["round"],
+        input_tokens=rec["input_tokens"],
+        cached_input_tokens=rec["cached_input_tokens"],
+        output_tokens=rec["output_tokens"],
+        reasoning_tokens=rec["reasoning_tokens"],
+        latency_ms=rec["latency_ms"],
+        created_at=rec["created_at"],
+    )
+
+
+@metrics.time_repository_function
+async def create_many(
+    thread_id: int,
+    discord_user_id: int,
+    model: AIModel,
+    provider: AIProvider,
+    round_usages: Sequence[RoundUsage],
+) -> None:
+    query = """\
+        INSERT INTO usage_ledger (thread_id, discord_user_id, model, provider, round,
+                                  input_tokens, cached_input_tokens, output_tokens,
+                                  reasoning_tokens, latency_ms)
+        VALUES (:thread_id, :discord_user_id, :model, :provider, :round,
+                :input_tokens, :cached_input_tokens, :output_tokens,
+                :reasoning_tokens, :latency_ms)
+    """
+    values: list[dict[str, Any]] = [
+        {
+            "thread_id": thread_id,
+            "discord_user_id": discord_user_id,
+            "model": model.value,
+            "provider": provider.value,
+            "round": round_usage.round,
+            "input_tokens": round_usage.input_tokens,
+            "cached_input_tokens": round_usage.cached_input_tokens,
+            "output_tokens": round_usage.output_tokens,
+            "reasoning_tokens": round_usage.reasoning_tokens,
+            "latency_ms": round_usage.latency_ms,
+        }
+        for round_usage in round_usages
+    ]
+    await state.write_database.execute_many(query, values)
+    state.database_router.record_write(thread_id)
+
+
+@metrics.time_repository_function
+async def fetch_many(thread_id: int) -> list[UsageLedgerEntry]:
+    query = f"""\
+        SELECT {READ_PARAMS}
+        FROM usage_ledger
+        WHERE thread_id = :thread_id
+        ORDER BY created_at ASC, usage_ledger_id ASC
+    """
+    values: dict[str, Any] = {"thread_id": thread_id}
+    recs = await state.database_router.reader(thread_id).fetch_all(query, values)
+    return [deserialize(rec) for rec in recs]
@@ -12,6 +12,8 @@ load_dotenv()
 
 APP_ENV = os.environ["APP_ENV"]
 APP_COMPONENT = os.environ["APP_COMPONENT"]
+APP_HOST = os.environ["APP_HOST"]
+APP_PORT = int(os.environ["APP_PORT"])
 
 DISCORD_TOKEN = os.environ["DISCORD_TOKEN"]
 OPENAI_API_KEY = os.environ["OPENAI_API_KEY"]
@@ -41,5 +43,47 @@ INITIALLY_AVAILABLE_WRITE_DB = os.environ["INITIALLY_AVAILABLE_WRITE_DB"]
 # TODO: per-database settings?
 DB_POOL_MIN_SIZE = int(os.environ["DB_POOL_MIN_SIZE"])
 DB_POOL_MAX_SIZE = int(os.environ["DB_POOL_MAX_SIZE"])
+DB_POOL_ACQUIRE_TIMEOUT_SECONDS = int(os.environ["DB_POOL_ACQUIRE_TIMEOUT_SECONDS"])
+# resize pools within their bounds, by how long acquires waited
+DB_POOL_ADAPTIVE = read_bool(os.environ["DB_POOL_ADAPTIVE"])
+DB_POOL_TARGET_ACQUIRE_WAIT_MS = int(os.environ["DB_POOL_TARGET_ACQUIRE_WAIT_MS"])
+DB_POOL_TUNE_INTERVAL_SECONDS = int(os.environ["DB_POOL_TUNE_INTERVAL_SECONDS"])
+# 0 to keep connections for as long as they're used
+DB_POOL_MAX_CONNECTION_LIFETIME_SECONDS = int(
+    os.environ["DB_POOL_MAX_CONNECTION_LIFETIME_SECONDS"]
+)
+
+# the `databases` adapter acquires & releases connections itself
+if (DB_POOL_ADAPTIVE or DB_POOL_MAX_CONNECTION_LIFETIME_SECONDS) and not (
+    READ_DB_SCHEME == WRITE_DB_SCHEME == "asyncpg"
+):
+    raise ValueError(
+        "DB_POOL_ADAPTIVE & DB_POOL_MAX_CONNECTION_LIFETIME_SECONDS "
+        "need the asyncpg adapter (READ_DB_SCHEME=WRITE_DB_SCHEME=asyncpg)"
+    )
+
+DB_SLOW_QUERY_THRESHOLD_MS = int(os.environ["DB_SLOW_QUERY_THRESHOLD_MS"])
+DB_EXPLAIN_SLOW_QUERIES = read_bool(os.environ["DB_EXPLAIN_SLOW_QUERIES"])
+
+DB_HEALTH_CHECK_INTERVAL_SECONDS = int(os.environ["DB_HEALTH_CHECK_INTERVAL_SECONDS"])
+DB_REPLICA_MAX_LAG_MS = int(os.environ["DB_REPLICA_MAX_LAG_MS"])
+DB_READ_YOUR_WRITES_SECONDS = int(os.environ["DB_READ_YOUR_WRITES_SECONDS"])
+
+# a separate pool (on the read database) for reports
+ANALYTICS_DB_POOL_MIN_SIZE = int(os.environ["ANALYTICS_DB_POOL_MIN_SIZE"])
+ANALYTICS_DB_POOL_MAX_SIZE = int(os.environ["ANALYTICS_DB_POOL_MAX_SIZE"])
+ANALYTICS_DB_STATEMENT_TIMEOUT_MS = int(os.environ["ANALYTICS_DB_STATEMENT_TIMEOUT_MS"])
 
 SERVICE_READINESS_TIMEOUT = int(os.environ["SERVICE_READINESS_TIMEOUT"])
+
+DISCORD_MAX_MESSAGES = int(os.environ["DISCORD_MAX_MESSAGES"])
+LOCATION_CACHE_MAX_SIZE = int(os.environ["LOCATION_CACHE_MAX_SIZE"])
+
+LOOP_LAG_THRESHOLD_MS = int(os.environ["LOOP_LAG_THRESHOLD_MS"])
+
+THREAD_RETENTION_IDLE_DAYS = int(os.environ["THREAD_RETENTION_IDLE_DAYS"])
+
+LOG_LEVEL = os.environ["LOG_LEVEL"]
+
+TRACING_EXPORTER = os.environ["TRACING_EXPORTER"]  # none, console or file
+TRACING_EXPORT_PATH = os.environ["TRACING_EXPORT_PATH"]
@@ -0,0 +1,180 @@
+import heapq
+import itertools
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace import Span
+from opentelemetry.sdk.trace import SpanProcessor
+
+SLOWLOG_SIZE = 20
+SLOWLOG_WINDOW = timedelta(hours=24)
+
+# span attributes worth keeping on a request's record
+RECORDED_ATTRIBUTES = (
+    "discord.thread_id",
+    "gen_ai.request.model",
+    "gen_ai.usage.input_tokens",
+    "gen_ai.usage.output_tokens",
+    "app.rounds",
+    "app.history_size",
+    "app.chunks",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Stage:
+    name: str
+    offset_seconds: float
+    duration_seconds: float
+
+
+@dataclass(frozen=True, slots=True)
+class RequestRecord:
+    kind: str
+    started_at: datetime
+    duration_seconds: float
+    stages: list[Stage]
+    attributes: dict[str, Any]
+
+
+@dataclass(slots=True)
+class _ActiveRequest:
+    kind: str
+    started_at: datetime
+    started_at_ns: int
+    spans: list[ReadableSpan] = field(default_factory=list)
+
+
+_active_request: ContextVar[_ActiveRequest | None] = ContextVar(
+    "slowlog_active_request",
+    default=None,
+)
+
+
+def _stage_name(span: ReadableSpan) -> str:
+    attributes = span.attributes or {}
+    if "app.round" in attributes:
+        return f"{span.name} (round {attributes['app.round']})"
+    if "app.ai_function" in attributes:
+        return f"{span.name} ({attributes['app.ai_function']})"
+    return span.name
+
+
+def _build_record(
+    request: _ActiveRequest,
+    duration_seconds: float,
+) -> RequestRecord:
+    stages: list[Stage] = []
+    attributes: dict[str, Any] = {}
+    for span in sorted(request.spans, key=lambda span: span.start_time or 0):
+        assert span.start_time is not None and span.end_time is not None
+        stages.append(
+            Stage(
+                name=_stage_name(span),
+                offset_seconds=(span.start_time - request.started_at_ns) / 1e9,
+                duration_seconds=(span.end_time - span.start_time) / 1e9,
+            )
+        )
+
+    # spans end innermost-first, so outer spans' totals take precedence
+    for span in request.spans:
+        span_attributes = span.attributes or {}
+        for key in RECORDED_ATTRIBUTES:
+            if key in span_attributes:
+                attributes[key] = span_attributes[key]
+
+    return RequestRecord(
+        kind=request.kind,
+        started_at=request.started_at,
+        duration_seconds=duration_seconds,
+        stages=stages,
+        attributes=attributes,
+    )
+
+
+class SlowRequestLog:
+    """Keeps the slowest `size` requests seen within the last `window`."""
+
+    def __init__(self, size: int, window: timedelta) -> None:
+        self.size = size
+        self.window = window
+        self._heap: list[tuple[float, int, RequestRecord]] = []
+        self._counter = itertools.count()
+
+    def _expire(self) -> None:
+        cutoff = datetime.now() - self.window
+        if any(record.started_at < cutoff for _, _, record in self._heap):
+            self._heap = [
+                entry for entry in self._heap if entry[2].started_at >= cutoff
+            ]
+            heapq.heapify(self._heap)
+
+    def is_slow(self, duration_seconds: float) -> bool:
+        self._expire()
+        return len(self._heap) < self.size or duration_seconds > self._heap[0][0]
+
+    def add(self, record: RequestRecord) -> None:
+        self._expire()
+        entry = (record.duration_seconds, next(self._counter), record)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        elif record.duration_seconds > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def slowest(self) -> list[RequestRecord]:
+        self._expire()
+        return [record for _, _, record in sorted(self._heap, reverse=True)]
+
+
+slow_requests = SlowRequestLog(size=SLOWLOG_SIZE, window=SLOWLOG_WINDOW)
+
+
+@contextmanager
+def record_request(kind: str) -> Iterator[None]:
+    """\
+    Record a request's spans, keeping them only if it's among the slowest.
+
+    Requests which produce no spans (e.g. messages we ignore) are dropped.
+    """
+    request = _ActiveRequest(
+        kind=kind,
+        started_at=datetime.now(),
+        started_at_ns=time.time_ns(),
+    )
+    token = _active_request.set(request)
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_seconds = time.perf_counter() - started_at
+        _active_request.reset(token)
+
+        if request.spans and slow_requests.is_slow(duration_seconds):
+            slow_requests.add(_build_record(request, duration_seconds))
+
+
+class SpanRecorder(SpanProcessor):
+    """Attaches finished spans to the request being recorded, if any."""
+
+    def on_start(self, span: Span, parent_context: Context | None = None) -> None:
+        return None
+
+    def on_end(self, span: ReadableSpan) -> None:
+        request = _active_request.get()
+        if request is not None:
+            request.spans.append(span)
+
+    def shutdown(self) -> None:
+        return None
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
@@ -1,8 +1,28 @@
+import asyncio
+
+from aiohttp.web import AppRunner
 from httpx import AsyncClient
+from opentelemetry.sdk.trace import TracerProvider
 
 from app.adapters.database import Database
+from app.database_routing import DatabaseRouter
+from app.loop_monitor import LoopMonitor
+from app.pool_tuning import PoolTuner
 
 read_database: Database
 write_database: Database
+analytics_database: Database
+database_router: DatabaseRouter
+pool_tuner: PoolTuner | None
 
 http_client: AsyncClient
+
+http_server: AppRunner
+
+loop_monitor: LoopMonitor
+
+tracer_provider: TracerProvider
+
+usage_rollups_task: asyncio.Task[None]
+partition_maintenance_task: asyncio.Task[None]
+thread_retention_task: asyncio.Task[None]
@@ -0,0 +1,65 @@
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+from app import slowlog
+
+SERVICE_NAME = "ai-discord-bot"
+
+# NOTE: this is a proxy until `configure` installs a tracer provider,
+# so it's safe to use at import time throughout the app.
+tracer = trace.get_tracer(SERVICE_NAME)
+
+
+def _format_span(span: ReadableSpan) -> str:
+    # one span per line, so exports can be read back as jsonl
+    return span.to_json(indent=None) + "\n"
+
+
+class _FileSpanExporter(ConsoleSpanExporter):
+    """Export spans to a file, which is closed when tracing shuts down."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(out=open(path, "a"), formatter=_format_span)
+
+    def shutdown(self) -> None:
+        self.out.close()
+
+
+def configure(
+    *,
+    app_env: str,
+    exporter: str,
+    export_path: str,
+) -> TracerProvider:
+    provider = TracerProvider(
+        resource=Resource.create(
+            {
+                "service.name": SERVICE_NAME,
+                "deployment.environment": app_env,
+            }
+        )
+    )
+    # NOTE: this is cheap enough to always run, as spans
+    # are only kept for requests which turn out to be slow.
+    provider.add_span_processor(slowlog.SpanRecorder())
+
+    match exporter:
+        case "none":
+            pass
+        case "console":
+            provider.add_span_processor(
+                BatchSpanProcessor(ConsoleSpanExporter(formatter=_format_span))
+            )
+        case "file":
+            provider.add_span_processor(
+                BatchSpanProcessor(_FileSpanExporter(export_path))
+            )
+        case _:
+            raise ValueError(f"Unknown tracing exporter: {exporter}")
+
+    trace.set_tracer_provider(provider)
+    return provider
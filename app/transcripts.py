@@ -0,0 +1,82 @@
+import gzip
+import tempfile
+from collections.abc import AsyncIterable
+from dataclasses import dataclass
+from typing import IO
+
+from app.repositories.thread_messages import ThreadMessage
+
+# transcripts are kept in memory up to this size, and spill to disk beyond it
+SPOOL_MAX_SIZE = 1024 * 1024
+GZIP_THRESHOLD_BYTES = 1024 * 1024
+# leave room for gzip's buffered (not yet flushed) output when splitting
+SPLIT_SIZE_MARGIN_BYTES = 64 * 1024
+
+
+@dataclass
+class TranscriptPart:
+    filename: str
+    file: IO[bytes]
+
+
+def format_message(message: ThreadMessage) -> bytes:
+    return f"[{message.created_at:%d/%m/%Y %I:%M:%S%p}] {message.content}\n".encode()
+
+
+async def write(messages: AsyncIterable[ThreadMessage]) -> IO[bytes]:
+    """Write a transcript incrementally into a (spooled) temporary file."""
+    transcript = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    async for message in messages:
+        transcript.write(format_message(message))
+    transcript.seek(0)
+    return transcript
+
+
+def _file_size(file: IO[bytes]) -> int:
+    size = file.seek(0, 2)
+    file.seek(0)
+    return size
+
+
+def split(transcript: IO[bytes], *, size_limit: int) -> list[TranscriptPart]:
+    """\
+    Split a transcript into parts which each fit within `size_limit`,
+    gzip-compressing them if the transcript is large.
+
+    Parts are split on line boundaries, so each can be read on its own.
+    This does blocking i/o & compression, so should be run in a thread.
+    """
+    transcript_size = _file_size(transcript)
+    if transcript_size <= min(GZIP_THRESHOLD_BYTES, size_limit):
+        return [TranscriptPart(filename="transcript.txt", file=transcript)]
+
+    part_files: list[IO[bytes]] = []
+    part_file: IO[bytes] | None = None
+    part_writer: gzip.GzipFile | None = None
+    for line in transcript:
+        if part_file is None or part_file.tell() + len(line) > (
+            size_limit - SPLIT_SIZE_MARGIN_BYTES
+        ):
+            if part_writer is not None:
+                part_writer.close()
+            part_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            part_files.append(part_file)
+            part_writer = gzip.GzipFile(fileobj=part_file, mode="wb")
+
+        assert part_writer is not None
+        part_writer.write(line)
+
+    if part_writer is not None:
+        part_writer.close()
+    transcript.close()
+
+    for part_file in part_files:
+        part_file.seek(0)
+
+    if len(part_files) == 1:
+        return [TranscriptPart(filename="transcript.txt.gz", file=part_files[0])]
+
+    return [
+        TranscriptPart(filename=f"transcript.part{i}.txt.gz", file=part_file)
+        for i, part_file in enumerate(part_files, start=1)
+    ]
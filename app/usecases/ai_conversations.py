@@ -1,14 +1,20 @@
 import json
-import traceback
+import logging
+import time
 from hashlib import sha256
 from typing import Any
 from typing import NamedTuple
 
 import discord
+from opentelemetry.trace import StatusCode
 from pydantic import BaseModel
 
 from app import discord_message_utils
+from app import logger
+from app import metrics
 from app import openai_functions
+from app import state
+from app import tracing
 from app.adapters.openai import gpt
 from app.adapters.openai.gpt import MessageContent
 from app.errors import Error
@@ -16,7 +22,11 @@ from app.errors import ErrorCode
 from app.models import DiscordBot
 from app.repositories import thread_messages
 from app.repositories import threads
+from app.repositories import usage_daily
+from app.repositories import usage_ledger
+from app.usecases import thread_retention
 
+LOGGER = logging.getLogger(__name__)
 
 DISCORD_USER_ID_WHITELIST: set[int] = {
     # Akatsuki
@@ -38,6 +48,12 @@ DISCORD_USER_ID_WHITELIST: set[int] = {
     332722012877357066,  # fkzoink
 }
 
+# users allowed to run operational (e.g. profiling) commands
+DISCORD_ADMIN_USER_ID_WHITELIST: set[int] = {
+    285190493703503872,  # cmyui
+    263413454709194753,  # realistik
+}
+
 
 def _get_author_id(discord_user_id: int) -> str:
     return sha256(str(discord_user_id).encode()).hexdigest()[:8]
@@ -51,70 +67,133 @@ class _GptRequestResponse(NamedTuple):
     response_content: str
     input_tokens: int
     output_tokens: int
+    cached_input_tokens: int = 0
+    round_usages: tuple[usage_ledger.RoundUsage, ...] = ()
 
 
 MAX_FUNCTION_CALL_ROUNDS = 5
 
 
+async def _call_ai_function(function_call: gpt.FunctionCall) -> MessageContent:
+    with tracing.tracer.start_as_current_span(
+        "ai_function",
+        attributes={"app.ai_function": function_call.name},
+    ):
+        metrics.TOOL_CALLS_TOTAL.labels(function=function_call.name).inc()
+        function_kwargs = json.loads(function_call.arguments)
+
+        ai_function = openai_functions.ai_functions[function_call.name]
+        return await ai_function["callback"](**function_kwargs)
+
+
 async def _make_gpt_request(
     message_history: list[gpt.Message], model: gpt.AIModel
 ) -> _GptRequestResponse | Error:
     functions = openai_functions.get_full_openai_functions_schema()
     response_context_items: list[dict[str, Any]] = []
     input_tokens = 0
+    cached_input_tokens = 0
     output_tokens = 0
+    round_usages: list[usage_ledger.RoundUsage] = []
+
+    with tracing.tracer.start_as_current_span(
+        "make_gpt_request",
+        attributes={"gen_ai.request.model": model.value},
+    ) as request_span:
+        for round_number in range(1, MAX_FUNCTION_CALL_ROUNDS + 1):
+            with tracing.tracer.start_as_current_span(
+                "gpt.send",
+                attributes={
+                    "gen_ai.request.model": model.value,
+                    "app.round": round_number,
+                },
+            ) as round_span:
+                started_at = time.perf_counter()
+                try:
+                    gpt_response = await gpt.send(
+                        model=model,
+                        messages=message_history,
+                        functions=functions,
+                        response_context_items=response_context_items,
+                    )
+                except Exception as exc:
+                    round_span.record_exception(exc)
+                    round_span.set_status(StatusCode.ERROR)
+                    LOGGER.exception(
+                        "AI provider request failed",
+                        extra={"model": model.value, "round": round_number},
+                    )
+                    # NOTE: this is *generally* bad practice to expose this information
+                    # to end users, and should be removed if we are to deploy this app
+                    # more widely. Right now it's okay because it's a private bot.
+                    return Error(
+                        code=ErrorCode.UNEXPECTED_ERROR,
+                        messages=[
+                            f"Request to OpenAI failed with the following error:\n```\n{exc}```"
+                        ],
+                    )
+
+                round_span.set_attributes(
+                    {
+                        "gen_ai.usage.input_tokens": gpt_response.input_tokens,
+                        "gen_ai.usage.output_tokens": gpt_response.output_tokens,
+                    }
+                )
 
-    for _ in range(MAX_FUNCTION_CALL_ROUNDS):
-        try:
-            gpt_response = await gpt.send(
-                model=model,
-                messages=message_history,
-                functions=functions,
-                response_context_items=response_context_items,
+            round_usages.append(
+                usage_ledger.RoundUsage(
+                    round=round_number,
+                    input_tokens=gpt_response.input_tokens,
+                    cached_input_tokens=gpt_response.cached_input_tokens,
+                    output_tokens=gpt_response.output_tokens,
+                    reasoning_tokens=gpt_response.reasoning_tokens,
+                    latency_ms=round((time.perf_counter() - started_at) * 1000),
+                )
             )
-        except Exception as exc:
-            traceback.print_exc()
-            # NOTE: this is *generally* bad practice to expose this information
-            # to end users, and should be removed if we are to deploy this app
-            # more widely. Right now it's okay because it's a private bot.
-            return Error(
-                code=ErrorCode.UNEXPECTED_ERROR,
-                messages=[
-                    f"Request to OpenAI failed with the following error:\n```\n{exc}```"
-                ],
+            input_tokens += gpt_response.input_tokens
+            cached_input_tokens += gpt_response.cached_input_tokens
+            output_tokens += gpt_response.output_tokens
+            metrics.TOKENS_TOTAL.labels(model=model.value, direction="input").inc(
+                gpt_response.input_tokens
             )
-
-        input_tokens += gpt_response.input_tokens
-        output_tokens += gpt_response.output_tokens
-
-        if not gpt_response.function_calls:
-            assert gpt_response.response_content is not None
-            return _GptRequestResponse(
-                gpt_response.response_content,
-                input_tokens,
-                output_tokens,
+            metrics.TOKENS_TOTAL.labels(model=model.value, direction="output").inc(
+                gpt_response.output_tokens
+            )
+            request_span.set_attributes(
+                {
+                    "app.rounds": round_number,
+                    "gen_ai.usage.input_tokens": input_tokens,
+                    "gen_ai.usage.output_tokens": output_tokens,
+                }
             )
 
-        response_context_items.extend(gpt_response.response_items)
-        for function_call in gpt_response.function_calls:
-            function_kwargs = json.loads(function_call.arguments)
-
-            ai_function = openai_functions.ai_functions[function_call.name]
-            function_response = await ai_function["callback"](**function_kwargs)
-
-            if function_call.call_id is None:
-                message_history.append(
-                    {
-                        "role": "function",
-                        "name": function_call.name,
-                        "content": [function_response],
-                    }
-                )
-            else:
-                response_context_items.append(
-                    gpt.function_call_output_item(function_call, function_response)
+            if not gpt_response.function_calls:
+                assert gpt_response.response_content is not None
+                return _GptRequestResponse(
+                    gpt_response.response_content,
+                    input_tokens,
+                    output_tokens,
+                    cached_input_tokens,
+                    tuple(round_usages),
                 )
 
+            response_context_items.extend(gpt_response.response_items)
+            for function_call in gpt_response.function_calls:
+                function_response = await _call_ai_function(function_call)
+
+                if function_call.call_id is None:
+                    message_history.append(
+                        {
+                            "role": "function",
+                            "name": function_call.name,
+                            "content": [function_response],
+                        }
+                    )
+                else:
+                    response_context_items.append(
+                        gpt.function_call_output_item(function_call, function_response)
+                    )
+
     raise NotImplementedError(
         f"OpenAI function calling exceeded {MAX_FUNCTION_CALL_ROUNDS} rounds"
     )
@@ -183,78 +262,124 @@ async def send_message_to_thread(
             messages=["User is not authorized to use this bot"],
         )
 
-    tracked_thread = await threads.fetch_one(message.channel.id)
-    if tracked_thread is None:
-        return Error(
-            code=ErrorCode.NOT_FOUND,
-            messages=["Thread not found"],
-        )
+    with (
+        metrics.IN_FLIGHT_REQUESTS.labels(handler="thread").track_inprogress(),
+        metrics.REQUEST_LATENCY_SECONDS.labels(handler="thread").time(),
+        tracing.tracer.start_as_current_span(
+            "send_message_to_thread",
+            attributes={"discord.thread_id": message.channel.id},
+        ) as request_span,
+        logger.bind(thread_id=message.channel.id),
+    ):
+        with tracing.tracer.start_as_current_span("fetch_thread"):
+            tracked_thread = await threads.fetch_one(message.channel.id)
+        if tracked_thread is None:
+            return Error(
+                code=ErrorCode.NOT_FOUND,
+                messages=["Thread not found"],
+            )
+        await thread_retention.ensure_hydrated(tracked_thread)
 
-    prompt = message.clean_content
-    if prompt.startswith(f"{bot.user.mention} "):
-        prompt = prompt.removeprefix(f"{bot.user.mention} ")
+        request_span.set_attribute("gen_ai.request.model", tracked_thread.model.value)
 
-    author_name = get_author_name(message.author.id)
-    prompt = f"{author_name}: {prompt}"
+        prompt = message.clean_content
+        if prompt.startswith(f"{bot.user.mention} "):
+            prompt = prompt.removeprefix(f"{bot.user.mention} ")
 
-    async with message.channel.typing():
-        thread_history = await thread_messages.fetch_many(thread_id=message.channel.id)
+        author_name = get_author_name(message.author.id)
+        prompt = f"{author_name}: {prompt}"
 
-        message_history: list[gpt.Message] = [
-            {
-                "role": m.role,
-                "content": [{"type": "text", "text": m.content}],
-            }
-            for m in thread_history[-tracked_thread.context_length :]
-        ]
-
-        prompt, new_message_content = _message_content_from_prompt(
-            prompt,
-            attachment_urls=[attachment.url for attachment in message.attachments],
-        )
-
-        message_history.append(
-            {
-                "role": "user",
-                "content": new_message_content,
-            }
-        )
+        async with message.channel.typing():
+            # only fetch the messages which fit in the context window
+            with tracing.tracer.start_as_current_span("fetch_history"):
+                thread_history = await thread_messages.fetch_page(
+                    thread_id=message.channel.id,
+                    page_size=tracked_thread.context_length,
+                    sort_order="desc",
+                )
 
-        gpt_response = await _make_gpt_request(
-            message_history,
-            tracked_thread.model,
-        )
-        if isinstance(gpt_response, Error):
-            return gpt_response
+            message_history: list[gpt.Message] = [
+                {
+                    "role": m.role,
+                    "content": [{"type": "text", "text": m.content}],
+                }
+                for m in reversed(thread_history.items)
+            ]
+
+            prompt, new_message_content = _message_content_from_prompt(
+                prompt,
+                attachment_urls=[attachment.url for attachment in message.attachments],
+            )
 
-        # Handle code blocks which may exceed the previous message.
-        response_messages: list[str] = (
-            discord_message_utils.smart_split_message_into_chunks(
-                gpt_response.response_content,
-                max_length=2000,
+            message_history.append(
+                {
+                    "role": "user",
+                    "content": new_message_content,
+                }
             )
-        )
+            request_span.set_attribute("app.history_size", len(message_history))
 
-        await thread_messages.create(
-            message.channel.id,
-            prompt,
-            discord_user_id=message.author.id,
-            role="user",
-            tokens_used=gpt_response.input_tokens,
-        )
+            gpt_response = await _make_gpt_request(
+                message_history,
+                tracked_thread.model,
+            )
+            if isinstance(gpt_response, Error):
+                return gpt_response
+
+            request_span.set_attributes(
+                {
+                    "gen_ai.usage.input_tokens": gpt_response.input_tokens,
+                    "gen_ai.usage.output_tokens": gpt_response.output_tokens,
+                }
+            )
 
-        await thread_messages.create(
-            message.channel.id,
-            gpt_response.response_content,
-            discord_user_id=bot.user.id,
-            role="assistant",
-            tokens_used=gpt_response.output_tokens,
+            # Handle code blocks which may exceed the previous message.
+            response_messages: list[str] = (
+                discord_message_utils.smart_split_message_into_chunks(
+                    gpt_response.response_content,
+                    max_length=2000,
+                )
+            )
+            request_span.set_attribute("app.chunks", len(response_messages))
+
+            with tracing.tracer.start_as_current_span("persist_messages"):
+                async with state.write_database.transaction():
+                    await thread_messages.create(
+                        message.channel.id,
+                        prompt,
+                        discord_user_id=message.author.id,
+                        role="user",
+                        tokens_used=gpt_response.input_tokens,
+                    )
+
+                    await thread_messages.create(
+                        message.channel.id,
+                        gpt_response.response_content,
+                        discord_user_id=bot.user.id,
+                        role="assistant",
+                        tokens_used=gpt_response.output_tokens,
+                    )
+
+                    await usage_ledger.create_many(
+                        message.channel.id,
+                        discord_user_id=message.author.id,
+                        model=tracked_thread.model,
+                        provider=gpt.provider_for_model(tracked_thread.model),
+                        round_usages=gpt_response.round_usages,
+                    )
+
+                    await usage_daily.increment(
+                        discord_user_id=message.author.id,
+                        model=tracked_thread.model,
+                        input_tokens=gpt_response.input_tokens,
+                        cached_input_tokens=gpt_response.cached_input_tokens,
+                        output_tokens=gpt_response.output_tokens,
+                    )
+
+        return SendAndReceiveResponse(
+            response_messages=response_messages,
         )
 
-    return SendAndReceiveResponse(
-        response_messages=response_messages,
-    )
-
 
 async def send_message_without_context(
     bot: DiscordBot,
@@ -277,56 +402,94 @@ async def send_message_without_context(
             messages=["User is not authorised to use this bot"],
         )
 
-    # author_name = get_author_name(interaction.user.name)
-    # prompt = f"{author_name}: {message_content}"
+    with (
+        metrics.IN_FLIGHT_REQUESTS.labels(handler="query").track_inprogress(),
+        metrics.REQUEST_LATENCY_SECONDS.labels(handler="query").time(),
+        tracing.tracer.start_as_current_span(
+            "send_message_without_context",
+            attributes={
+                "discord.interaction_id": interaction.id,
+                "gen_ai.request.model": model.value,
+            },
+        ) as request_span,
+        logger.bind(thread_id=interaction.id),
+    ):
+        # author_name = get_author_name(interaction.user.name)
+        # prompt = f"{author_name}: {message_content}"
+
+        # Since there is no context nor multi-user convos, we can just send the message as is
+        prompt = message_content
+
+        user_messages: list[MessageContent] = [
+            {
+                "type": "text",
+                "text": prompt,
+            }
+        ]
+        message_context: list[gpt.Message] = [
+            {
+                "role": "user",
+                "content": user_messages,
+            }
+        ]
 
-    # Since there is no context nor multi-user convos, we can just send the message as is
-    prompt = message_content
+        gpt_response = await _make_gpt_request(message_context, model)
+        if isinstance(gpt_response, Error):
+            return gpt_response
 
-    user_messages: list[MessageContent] = [
-        {
-            "type": "text",
-            "text": prompt,
-        }
-    ]
-    message_context: list[gpt.Message] = [
-        {
-            "role": "user",
-            "content": user_messages,
-        }
-    ]
+        request_span.set_attributes(
+            {
+                "gen_ai.usage.input_tokens": gpt_response.input_tokens,
+                "gen_ai.usage.output_tokens": gpt_response.output_tokens,
+            }
+        )
 
-    gpt_response = await _make_gpt_request(message_context, model)
-    if isinstance(gpt_response, Error):
-        return gpt_response
+        with tracing.tracer.start_as_current_span("persist_messages"):
+            async with state.write_database.transaction():
+                await threads.create(
+                    interaction.id,
+                    initiator_user_id=interaction.user.id,
+                    model=model,
+                    context_length=0,
+                )
 
-    await threads.create(
-        interaction.id,
-        initiator_user_id=interaction.user.id,
-        model=model,
-        context_length=0,
-    )
+                await thread_messages.create(
+                    interaction.id,
+                    prompt,
+                    discord_user_id=interaction.user.id,
+                    role="user",
+                    tokens_used=gpt_response.input_tokens,
+                )
 
-    await thread_messages.create(
-        interaction.id,
-        prompt,
-        discord_user_id=interaction.user.id,
-        role="user",
-        tokens_used=gpt_response.input_tokens,
-    )
+                await thread_messages.create(
+                    interaction.id,
+                    gpt_response.response_content,
+                    discord_user_id=bot.user.id,
+                    role="assistant",
+                    tokens_used=gpt_response.output_tokens,
+                )
 
-    await thread_messages.create(
-        interaction.id,
-        gpt_response.response_content,
-        discord_user_id=bot.user.id,
-        role="assistant",
-        tokens_used=gpt_response.output_tokens,
-    )
+                await usage_ledger.create_many(
+                    interaction.id,
+                    discord_user_id=interaction.user.id,
+                    model=model,
+                    provider=gpt.provider_for_model(model),
+                    round_usages=gpt_response.round_usages,
+                )
 
-    response_messages: list[str] = (
-        discord_message_utils.smart_split_message_into_chunks(
-            gpt_response.response_content,
-            max_length=2000,
+                await usage_daily.increment(
+                    discord_user_id=interaction.user.id,
+                    model=model,
+                    input_tokens=gpt_response.input_tokens,
+                    cached_input_tokens=gpt_response.cached_input_tokens,
+                    output_tokens=gpt_response.output_tokens,
+                )
+
+        response_messages: list[str] = (
+            discord_message_utils.smart_split_message_into_chunks(
+                gpt_response.response_content,
+                max_length=2000,
+            )
         )
-    )
-    return SendAndReceiveResponse(response_messages=response_messages)
+        request_span.set_attribute("app.chunks", len(response_messages))
+        return SendAndReceiveResponse(response_messages=response_messages)
@@ -0,0 +1,23 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from app.repositories import thread_messages
+
+LOGGER = logging.getLogger(__name__)
+
+# inserts fail for months without a partition, so keep a buffer of them
+PARTITION_MONTHS_AHEAD = 3
+MAINTENANCE_INTERVAL = timedelta(days=1)
+
+
+async def run_partition_maintenance() -> None:
+    while True:
+        try:
+            await thread_messages.create_partitions(
+                months_ahead=PARTITION_MONTHS_AHEAD,
+            )
+        except Exception:
+            LOGGER.exception("Failed to create thread message partitions")
+
+        await asyncio.sleep(MAINTENANCE_INTERVAL.total_seconds())
@@ -0,0 +1,230 @@
+import asyncio
+import gzip
+import json
+import logging
+from collections.abc import Sequence
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Literal
+
+from pydantic import BaseModel
+
+from app import compression
+from app import settings
+from app import state
+from app.repositories import thread_message_archives
+from app.repositories import thread_messages
+from app.repositories import threads
+from app.repositories.thread_messages import RequesterTokenUsage
+from app.repositories.thread_messages import ThreadMessage
+from app.repositories.threads import Thread
+
+LOGGER = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = 100
+RETENTION_INTERVAL = timedelta(days=1)
+
+
+class ArchivedMessage(BaseModel):
+    """A message, as (de)serialized into a thread's archive."""
+
+    thread_message_id: int
+    thread_id: int
+    content: str
+    discord_user_id: int
+    role: Literal["user", "assistant"]
+    tokens_used: int
+    created_at: datetime
+
+
+def encode_messages(messages: Sequence[ThreadMessage]) -> bytes:
+    return gzip.compress(
+        b"".join(
+            json.dumps(
+                {
+                    "thread_message_id": message.thread_message_id,
+                    "thread_id": message.thread_id,
+                    "content": message.content,
+                    "discord_user_id": message.discord_user_id,
+                    "role": message.role,
+                    "tokens_used": message.tokens_used,
+                    "created_at": message.created_at.isoformat(),
+                }
+            ).encode()
+            + b"\n"
+            for message in messages
+        )
+    )
+
+
+def decode_messages(data: bytes) -> list[ThreadMessage]:
+    # archives are serialized data, so they're validated on the way back in
+    messages = []
+    for line in gzip.decompress(data).splitlines():
+        archived_message = ArchivedMessage.model_validate_json(line)
+        messages.append(
+            ThreadMessage(
+                thread_message_id=archived_message.thread_message_id,
+                thread_id=archived_message.thread_id,
+                stored_content=compression.StoredContent(text=archived_message.content),
+                discord_user_id=archived_message.discord_user_id,
+                role=archived_message.role,
+                tokens_used=archived_message.tokens_used,
+                created_at=archived_message.created_at,
+            )
+        )
+    return messages
+
+
+async def archive_thread(thread_id: int, idle_before: datetime) -> bool:
+    """\
+    Move an idle thread's messages into the archive.
+
+    Returns whether the thread was archived; it's skipped
+    if it was resumed (or archived) in the meantime.
+    """
+    async with state.write_database.transaction():
+        thread = await threads.mark_archived(thread_id, idle_before)
+        if thread is None:
+            return False
+
+        messages = [
+            message async for message in thread_messages.iterate_many(thread_id)
+        ]
+        await thread_message_archives.create(
+            thread_id,
+            message_count=len(messages),
+            messages=encode_messages(messages),
+        )
+        if messages:
+            # only delete what was archived, should a message land meanwhile
+            await thread_messages.delete_many(
+                thread_id,
+                thread_message_id_lte=max(m.thread_message_id for m in messages),
+            )
+
+    return True
+
+
+async def rehydrate_thread(thread_id: int) -> None:
+    """Move an archived thread's messages back into the thread_messages table."""
+    async with state.write_database.transaction():
+        archive = await thread_message_archives.delete(thread_id)
+        if archive is not None:
+            messages = decode_messages(archive.messages)
+            if messages:
+                await thread_messages.create_partitions_covering(
+                    from_at=min(m.created_at for m in messages),
+                    to_at=max(m.created_at for m in messages),
+                )
+                await thread_messages.create_many(messages)
+
+        await threads.mark_unarchived(thread_id)
+
+    LOGGER.info(
+        "Rehydrated archived thread",
+        extra={
+            "thread_id": thread_id,
+            "message_count": archive.message_count if archive is not None else 0,
+        },
+    )
+
+
+async def ensure_hydrated(thread: Thread) -> None:
+    """Transparently rehydrate a thread's messages, if it was archived."""
+    if thread.archived_at is not None:
+        await rehydrate_thread(thread.thread_id)
+
+
+async def fetch_archived_messages(thread_id: int) -> list[ThreadMessage]:
+    """Read an archived thread's messages, leaving them archived."""
+    archive = await thread_message_archives.fetch_one(thread_id)
+    if archive is None:
+        return []
+
+    return decode_messages(archive.messages)
+
+
+async def fetch_archived_token_usage_per_requester(
+    thread: Thread,
+) -> list[RequesterTokenUsage]:
+    """\
+    Sum an archived thread's tokens used per (utc day, requester), attributing
+    them as `thread_messages.fetch_token_usage_per_requester` does.
+    """
+    messages = await fetch_archived_messages(thread.thread_id)
+    messages.sort(key=lambda m: (m.created_at, m.thread_message_id))
+
+    token_usages: dict[tuple[date, int], RequesterTokenUsage] = {}
+    previous_user_id: int | None = None
+    for message in messages:
+        if message.role == "user":
+            requester_user_id: int | None = message.discord_user_id
+        else:
+            requester_user_id = previous_user_id
+        previous_user_id = message.discord_user_id
+
+        if requester_user_id is None:
+            continue
+
+        day = message.created_at.astimezone(timezone.utc).date()
+        token_usage = token_usages.setdefault(
+            (day, requester_user_id),
+            RequesterTokenUsage(
+                day=day,
+                discord_user_id=requester_user_id,
+                model=thread.model,
+                input_tokens=0,
+                output_tokens=0,
+            ),
+        )
+        if message.role == "user":
+            token_usage.input_tokens += message.tokens_used
+        else:
+            token_usage.output_tokens += message.tokens_used
+
+    return list(token_usages.values())
+
+
+async def archive_idle_threads(idle_for: timedelta) -> int:
+    """\
+    Archive the messages of all threads idle for longer than `idle_for`.
+
+    NOTE: the usage rollups are kept as-is; they're only ever recomputed
+    for recent days, and idle threads have no recent messages.
+    """
+    idle_before = datetime.now(timezone.utc) - idle_for
+    archived_threads = 0
+    after_thread_id: int | None = None
+    while True:
+        thread_ids = await threads.fetch_idle_thread_ids(
+            idle_before,
+            limit=ARCHIVE_BATCH_SIZE,
+            after_thread_id=after_thread_id,
+        )
+        if not thread_ids:
+            break
+
+        for thread_id in thread_ids:
+            if await archive_thread(thread_id, idle_before):
+                archived_threads += 1
+        after_thread_id = thread_ids[-1]
+
+    return archived_threads
+
+
+async def run_retention() -> None:
+    idle_for = timedelta(days=settings.THREAD_RETENTION_IDLE_DAYS)
+    while True:
+        try:
+            archived_threads = await archive_idle_threads(idle_for)
+            LOGGER.info(
+                "Archived idle threads",
+                extra={"archived_threads": archived_threads},
+            )
+        except Exception:
+            LOGGER.exception("Failed to archive idle threads")
+
+        await asyncio.sleep(RETENTION_INTERVAL.total_seconds())
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from app.repositories import usage_daily
+
+LOGGER = logging.getLogger(__name__)
+
+# give turns which straddle midnight a moment to land before finalizing a day
+FINALIZE_DELAY = timedelta(minutes=5)
+
+
+async def backfill_completed_days() -> None:
+    """\
+    Recompute the usage rollups for completed (utc) days, starting from
+    the last day we have a rollup for, in case it was left partially filled.
+
+    Days can be partially filled by downtime, or by the first deploy of
+    the rollups; today's rollups are only maintained incrementally.
+    """
+    today = datetime.now(timezone.utc).date()
+    latest_day = await usage_daily.fetch_latest_day(day_lt=today)
+    await usage_daily.backfill(day_gte=latest_day, day_lt=today)
+    LOGGER.info(
+        "Backfilled usage rollups",
+        extra={"day_gte": latest_day, "day_lt": today},
+    )
+
+
+async def run_backfills() -> None:
+    while True:
+        try:
+            await backfill_completed_days()
+        except Exception:
+            LOGGER.exception("Failed to backfill usage rollups")
+
+        now = datetime.now(timezone.utc)
+        next_run_at = (
+            datetime.combine(now.date(), datetime.min.time(), tzinfo=timezone.utc)
+            + timedelta(days=1)
+            + FINALIZE_DELAY
+        )
+        await asyncio.sleep((next_run_at - now).total_seconds())
@@ -0,0 +1,11 @@
+-- NOTE: we store tokens rather than dollars, so that
+--       rollups stay correct as model pricing changes.
+CREATE TABLE usage_daily (
+    day DATE NOT NULL, -- utc
+    discord_user_id BIGINT NOT NULL,
+    model TEXT NOT NULL,
+    input_tokens BIGINT NOT NULL DEFAULT 0,
+    cached_input_tokens BIGINT NOT NULL DEFAULT 0,
+    output_tokens BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, discord_user_id, model)
+);
@@ -0,0 +1 @@
+DROP TABLE usage_ledger;
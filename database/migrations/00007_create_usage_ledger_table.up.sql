@@ -0,0 +1,18 @@
+-- one row per upstream ai provider request
+CREATE TABLE usage_ledger (
+    usage_ledger_id BIGSERIAL NOT NULL PRIMARY KEY,
+    thread_id BIGINT NOT NULL,
+    discord_user_id BIGINT NOT NULL, -- the requester
+    model TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    round INT NOT NULL, -- function calls take multiple rounds per turn
+    input_tokens INT NOT NULL,
+    cached_input_tokens INT NOT NULL,
+    output_tokens INT NOT NULL,
+    reasoning_tokens INT NOT NULL,
+    latency_ms INT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX ON usage_ledger (thread_id);
+CREATE INDEX ON usage_ledger (discord_user_id, created_at);
+CREATE INDEX ON usage_ledger (created_at);
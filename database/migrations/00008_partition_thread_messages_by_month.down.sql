@@ -0,0 +1,25 @@
+ALTER TABLE thread_messages RENAME TO thread_messages_partitioned;
+ALTER TABLE thread_messages_partitioned
+    RENAME CONSTRAINT thread_messages_pkey TO thread_messages_partitioned_pkey;
+
+CREATE TABLE thread_messages (
+    thread_message_id BIGINT NOT NULL DEFAULT nextval('thread_messages_thread_message_id_seq') PRIMARY KEY,
+    thread_id BIGINT NOT NULL,
+    content TEXT NOT NULL,
+    role TEXT NOT NULL,
+    tokens_used INT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    discord_user_id BIGINT
+);
+
+ALTER SEQUENCE thread_messages_thread_message_id_seq
+    OWNED BY thread_messages.thread_message_id;
+
+INSERT INTO thread_messages (thread_message_id, thread_id, content, role,
+                             tokens_used, created_at, discord_user_id)
+SELECT thread_message_id, thread_id, content, role,
+       tokens_used, created_at, discord_user_id
+FROM thread_messages_partitioned;
+
+DROP TABLE thread_messages_partitioned;
+DROP FUNCTION create_thread_messages_partitions;
@@ -0,0 +1,55 @@
+-- partition thread messages by month, so that time-bounded queries
+-- prune partitions, and old months can be detached cheaply.
+-- NOTE: the primary key of a partitioned table must include the partition key.
+ALTER TABLE thread_messages RENAME TO thread_messages_unpartitioned;
+ALTER TABLE thread_messages_unpartitioned
+    RENAME CONSTRAINT thread_messages_pkey TO thread_messages_unpartitioned_pkey;
+
+CREATE TABLE thread_messages (
+    thread_message_id BIGINT NOT NULL DEFAULT nextval('thread_messages_thread_message_id_seq'),
+    thread_id BIGINT NOT NULL,
+    content TEXT NOT NULL,
+    role TEXT NOT NULL,
+    tokens_used INT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    discord_user_id BIGINT,
+    PRIMARY KEY (thread_message_id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- keep the id sequence when the old table is dropped
+ALTER SEQUENCE thread_messages_thread_message_id_seq
+    OWNED BY thread_messages.thread_message_id;
+
+-- creates the (utc) monthly partitions covering [from_at, to_at], if missing.
+-- NOTE: there's deliberately no default partition, as rows landing in it
+--       would block creating their month's partition later; the bot
+--       instead keeps a few months of partitions created ahead of time.
+CREATE FUNCTION create_thread_messages_partitions(from_at TIMESTAMPTZ, to_at TIMESTAMPTZ)
+RETURNS VOID AS $$
+DECLARE
+    month_start TIMESTAMP := date_trunc('month', from_at AT TIME ZONE 'UTC');
+BEGIN
+    WHILE month_start <= to_at AT TIME ZONE 'UTC' LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF thread_messages FOR VALUES FROM (%L) TO (%L)',
+            'thread_messages_' || to_char(month_start, 'YYYY_MM'),
+            month_start AT TIME ZONE 'UTC',
+            (month_start + INTERVAL '1 month') AT TIME ZONE 'UTC'
+        );
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_thread_messages_partitions(
+    COALESCE((SELECT MIN(created_at) FROM thread_messages_unpartitioned), NOW()),
+    NOW() + INTERVAL '3 months'
+);
+
+INSERT INTO thread_messages (thread_message_id, thread_id, content, role,
+                             tokens_used, created_at, discord_user_id)
+SELECT thread_message_id, thread_id, content, role,
+       tokens_used, created_at, discord_user_id
+FROM thread_messages_unpartitioned;
+
+DROP TABLE thread_messages_unpartitioned;
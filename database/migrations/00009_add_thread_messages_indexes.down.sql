@@ -0,0 +1,3 @@
+DROP INDEX thread_messages_discord_user_id_created_at_idx;
+DROP INDEX thread_messages_created_at_brin_idx;
+DROP INDEX thread_messages_thread_id_created_at_idx;
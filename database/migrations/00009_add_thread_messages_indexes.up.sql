@@ -0,0 +1,11 @@
+-- a thread's (latest) messages, and keyset pagination within a thread
+CREATE INDEX thread_messages_thread_id_created_at_idx
+    ON thread_messages (thread_id, created_at, thread_message_id);
+-- time-range scans (e.g. cost reports); rows are inserted in created_at
+-- order, so a brin index is tiny compared to a btree
+CREATE INDEX thread_messages_created_at_brin_idx
+    ON thread_messages USING BRIN (created_at);
+-- a requester's messages; assistant messages are attributed by thread
+CREATE INDEX thread_messages_discord_user_id_created_at_idx
+    ON thread_messages (discord_user_id, created_at)
+    WHERE role = 'user';
@@ -0,0 +1,2 @@
+DROP TABLE thread_message_archives;
+ALTER TABLE threads DROP COLUMN archived_at;
@@ -0,0 +1,10 @@
+-- messages of idle threads are moved out of the (hot) thread_messages
+-- table, and back again if the thread is resumed.
+ALTER TABLE threads ADD COLUMN archived_at TIMESTAMPTZ;
+
+CREATE TABLE thread_message_archives (
+    thread_id BIGINT NOT NULL PRIMARY KEY,
+    message_count INT NOT NULL,
+    messages BYTEA NOT NULL, -- gzip-compressed jsonl
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,12 @@
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM thread_messages WHERE compressed_content IS NOT NULL) THEN
+        RAISE EXCEPTION 'Run `python -m scripts.content_compression decompress` first';
+    END IF;
+END
+$$;
+
+ALTER TABLE thread_messages DROP CONSTRAINT thread_messages_content_check;
+ALTER TABLE thread_messages DROP COLUMN content_codec;
+ALTER TABLE thread_messages DROP COLUMN compressed_content;
+ALTER TABLE thread_messages ALTER COLUMN content SET NOT NULL;
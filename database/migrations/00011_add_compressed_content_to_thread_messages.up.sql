@@ -0,0 +1,10 @@
+-- large content is stored zstd-compressed, with the codec (and dictionary
+-- version) it was compressed with; see app/compression.py.
+-- existing rows are compressed by `python -m scripts.content_compression recompress`.
+ALTER TABLE thread_messages ALTER COLUMN content DROP NOT NULL;
+ALTER TABLE thread_messages ADD COLUMN compressed_content BYTEA;
+ALTER TABLE thread_messages ADD COLUMN content_codec TEXT;
+ALTER TABLE thread_messages ADD CONSTRAINT thread_messages_content_check CHECK (
+    (content IS NULL) = (compressed_content IS NOT NULL)
+    AND (compressed_content IS NULL) = (content_codec IS NULL)
+);
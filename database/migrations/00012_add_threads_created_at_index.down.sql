@@ -0,0 +1 @@
+DROP INDEX threads_created_at_thread_id_idx;
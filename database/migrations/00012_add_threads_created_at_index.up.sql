@@ -0,0 +1,3 @@
+-- keyset pagination of threads (fetch_page & exports) on (created_at, thread_id)
+CREATE INDEX threads_created_at_thread_id_idx
+    ON threads (created_at, thread_id);
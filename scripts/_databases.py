@@ -0,0 +1,39 @@
+# Database connections for one-off scripts, which only need a single connection.
+from app import settings
+from app.adapters import database
+
+
+def read_database() -> database.Database:
+    return database.create(
+        database.dsn(
+            scheme=settings.READ_DB_SCHEME,
+            user=settings.READ_DB_USER,
+            password=settings.READ_DB_PASS,
+            host=settings.READ_DB_HOST,
+            port=settings.READ_DB_PORT,
+            database=settings.READ_DB_NAME,
+        ),
+        db_ssl=settings.READ_DB_USE_SSL,
+        min_pool_size=1,
+        max_pool_size=1,
+        name="read",
+        slow_query_threshold_ms=settings.DB_SLOW_QUERY_THRESHOLD_MS,
+    )
+
+
+def write_database() -> database.Database:
+    return database.create(
+        database.dsn(
+            scheme=settings.WRITE_DB_SCHEME,
+            user=settings.WRITE_DB_USER,
+            password=settings.WRITE_DB_PASS,
+            host=settings.WRITE_DB_HOST,
+            port=settings.WRITE_DB_PORT,
+            database=settings.WRITE_DB_NAME,
+        ),
+        db_ssl=settings.WRITE_DB_USE_SSL,
+        min_pool_size=1,
+        max_pool_size=1,
+        name="write",
+        slow_query_threshold_ms=settings.DB_SLOW_QUERY_THRESHOLD_MS,
+    )
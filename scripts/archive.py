@@ -0,0 +1,532 @@
+# Bulk export & import of conversation data (threads, thread messages, and
+# the archived messages of idle threads).
+#
+#     python -m scripts.archive export <directory> [--format jsonl|parquet]
+#         [--created-at-gte YYYY-MM-DD] [--created-at-lt YYYY-MM-DD]
+#         [--thread-id ID ...]
+#     python -m scripts.archive import <directory>
+#
+# Exports are paginated by keyset on (created_at, id) and imports use COPY,
+# so both run in constant memory, regardless of the size of the tables.
+#
+# Archived threads are exported as they're stored; their `archived_at` and
+# (compressed) message archive, such that they stay archived once imported.
+#
+# Exporting to parquet requires the (optional) `pyarrow` package.
+import argparse
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import time
+from collections.abc import AsyncIterator
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import date
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+from typing import Any
+from typing import Literal
+from typing import Protocol
+
+from app import compression
+from app import logger
+from app import settings
+from scripts import _databases
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 10_000
+DEFAULT_BATCH_SIZE = 10_000
+PROGRESS_EVERY_ROWS = 100_000
+
+ArchiveFormat = Literal["jsonl", "parquet"]
+ColumnType = Literal["int", "str", "datetime", "bytes"]
+
+
+@dataclass(frozen=True)
+class ArchiveTable:
+    name: str
+    # tie-breaker for rows sharing a created_at, when paginating
+    key: str
+    columns: tuple[tuple[str, ColumnType], ...]
+    # whether `content` may be stored compressed, see app/compression.py
+    compressed_content: bool = False
+    # whether the created_at filters apply to the row's thread, not the row
+    filtered_by_thread: bool = False
+
+    @property
+    def column_names(self) -> list[str]:
+        return [name for name, _ in self.columns]
+
+
+THREADS = ArchiveTable(
+    name="threads",
+    key="thread_id",
+    columns=(
+        ("thread_id", "int"),
+        ("initiator_user_id", "int"),
+        ("model", "str"),
+        ("context_length", "int"),
+        ("created_at", "datetime"),
+        ("archived_at", "datetime"),
+    ),
+)
+THREAD_MESSAGES = ArchiveTable(
+    name="thread_messages",
+    key="thread_message_id",
+    columns=(
+        ("thread_message_id", "int"),
+        ("thread_id", "int"),
+        ("content", "str"),
+        ("discord_user_id", "int"),
+        ("role", "str"),
+        ("tokens_used", "int"),
+        ("created_at", "datetime"),
+    ),
+    compressed_content=True,
+)
+THREAD_MESSAGE_ARCHIVES = ArchiveTable(
+    name="thread_message_archives",
+    key="thread_id",
+    columns=(
+        ("thread_id", "int"),
+        ("message_count", "int"),
+        ("messages", "bytes"),
+        ("created_at", "datetime"),
+    ),
+    # archives are created long after their thread
+    filtered_by_thread=True,
+)
+TABLES = (THREADS, THREAD_MESSAGES, THREAD_MESSAGE_ARCHIVES)
+
+COMPRESSED_CONTENT_COLUMNS = ["compressed_content", "content_codec"]
+
+
+@dataclass(frozen=True)
+class ExportFilters:
+    created_at_gte: datetime | None = None
+    created_at_lt: datetime | None = None
+    thread_ids: list[int] | None = None
+
+
+class _ArchiveDatabase(Protocol):
+    async def fetch_all(
+        self,
+        query: str,
+        values: dict | None = None,
+    ) -> list[dict[str, Any]]: ...
+
+    async def execute(self, query: str, values: dict | None = None) -> Any: ...
+
+    async def copy_records_to_table(
+        self,
+        table: str,
+        records: list[tuple[Any, ...]],
+        columns: list[str],
+    ) -> None: ...
+
+    def transaction(self) -> Any: ...
+
+
+class _Progress:
+    def __init__(self, operation: str, table: str) -> None:
+        self.operation = operation
+        self.table = table
+        self.rows = 0
+        self.started_at = time.perf_counter()
+        self._next_report_at = PROGRESS_EVERY_ROWS
+
+    def add(self, rows: int) -> None:
+        self.rows += rows
+        if self.rows >= self._next_report_at:
+            self._next_report_at += PROGRESS_EVERY_ROWS
+            self.report(f"{self.operation.capitalize()} in progress")
+
+    def report(self, message: str) -> None:
+        elapsed = time.perf_counter() - self.started_at
+        LOGGER.info(
+            message,
+            extra={
+                "table": self.table,
+                "rows": self.rows,
+                "elapsed_seconds": round(elapsed, 3),
+                "rows_per_second": round(self.rows / elapsed) if elapsed else None,
+            },
+        )
+
+
+def archive_path(directory: Path, table: ArchiveTable, format: ArchiveFormat) -> Path:
+    suffix = ".jsonl.gz" if format == "jsonl" else ".parquet"
+    return directory / f"{table.name}{suffix}"
+
+
+# export
+
+
+async def iterate_pages(
+    db: _ArchiveDatabase,
+    table: ArchiveTable,
+    filters: ExportFilters,
+    page_size: int,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """\
+    Page through a table in (created_at, key) order, seeking past the
+    last row of each page rather than using an (ever-growing) OFFSET.
+    """
+    created_at_conditions: list[str] = []
+    values: dict[str, Any] = {"page_size": page_size}
+    if filters.created_at_gte is not None:
+        created_at_conditions.append("created_at >= :created_at_gte")
+        values["created_at_gte"] = filters.created_at_gte
+    if filters.created_at_lt is not None:
+        created_at_conditions.append("created_at < :created_at_lt")
+        values["created_at_lt"] = filters.created_at_lt
+
+    conditions: list[str] = []
+    if created_at_conditions and table.filtered_by_thread:
+        conditions.append(
+            "thread_id IN (SELECT thread_id FROM threads"
+            f" WHERE {' AND '.join(created_at_conditions)})"
+        )
+    else:
+        conditions += created_at_conditions
+    if filters.thread_ids is not None:
+        conditions.append("thread_id = ANY(:thread_ids)")
+        values["thread_ids"] = filters.thread_ids
+
+    columns = table.column_names
+    if table.compressed_content:
+        columns += COMPRESSED_CONTENT_COLUMNS
+
+    def build_query(conditions: list[str]) -> str:
+        where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"""\
+            SELECT {', '.join(columns)}
+            FROM {table.name}
+            {where_sql}
+            ORDER BY created_at ASC, {table.key} ASC
+            LIMIT :page_size
+        """
+
+    first_page_query = build_query(conditions)
+    next_page_query = build_query(
+        [f"(created_at, {table.key}) > (:after_created_at, :after_key)", *conditions]
+    )
+
+    recs = await db.fetch_all(first_page_query, values)
+    while recs:
+        yield recs
+        if len(recs) < page_size:
+            return
+
+        values["after_created_at"] = recs[-1]["created_at"]
+        values["after_key"] = recs[-1][table.key]
+        recs = await db.fetch_all(next_page_query, values)
+
+
+def _decompress_content(rec: dict[str, Any]) -> dict[str, Any]:
+    """Archives always hold plain content, independent of our codecs."""
+    stored_content = compression.StoredContent(
+        text=rec["content"],
+        data=rec["compressed_content"],
+        codec=rec["content_codec"],
+    )
+    return {
+        **{
+            name: value
+            for name, value in rec.items()
+            if name not in COMPRESSED_CONTENT_COLUMNS
+        },
+        "content": stored_content.decode(),
+    }
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    raise TypeError(f"Unserializable value: {value!r}")
+
+
+class _JsonlWriter:
+    def __init__(self, path: Path, table: ArchiveTable) -> None:
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+
+    def write(self, recs: list[dict[str, Any]]) -> None:
+        for rec in recs:
+            self._file.write(json.dumps(rec, default=_json_default) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _parquet_schema(table: ArchiveTable) -> "pyarrow.Schema":
+    column_types = {
+        "int": pyarrow.int64(),
+        "str": pyarrow.string(),
+        "datetime": pyarrow.timestamp("us", tz="UTC"),
+        "bytes": pyarrow.binary(),
+    }
+    return pyarrow.schema(
+        [(name, column_types[column_type]) for name, column_type in table.columns]
+    )
+
+
+class _ParquetWriter:
+    def __init__(self, path: Path, table: ArchiveTable) -> None:
+        self._schema = _parquet_schema(table)
+        self._writer = pyarrow.parquet.ParquetWriter(
+            path, self._schema, compression="zstd"
+        )
+
+    def write(self, recs: list[dict[str, Any]]) -> None:
+        # each page becomes a row group, so memory is bounded by the page size
+        self._writer.write_table(pyarrow.Table.from_pylist(recs, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+async def export(
+    db: _ArchiveDatabase,
+    directory: Path,
+    format: ArchiveFormat = "jsonl",
+    filters: ExportFilters = ExportFilters(),
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> dict[str, int]:
+    """Export each table into its own file, returning the rows written per table."""
+    if format == "parquet" and pyarrow is None:
+        raise RuntimeError("Exporting to parquet requires the `pyarrow` package")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    writer_cls = _JsonlWriter if format == "jsonl" else _ParquetWriter
+
+    exported_rows: dict[str, int] = {}
+    for table in TABLES:
+        progress = _Progress("export", table.name)
+        writer = writer_cls(archive_path(directory, table, format), table)
+        try:
+            async for recs in iterate_pages(db, table, filters, page_size):
+                if table.compressed_content:
+                    recs = [_decompress_content(rec) for rec in recs]
+                writer.write(recs)
+                progress.add(len(recs))
+        finally:
+            writer.close()
+
+        progress.report("Export complete")
+        exported_rows[table.name] = progress.rows
+
+    return exported_rows
+
+
+# import
+
+
+def _read_jsonl(
+    path: Path,
+    table: ArchiveTable,
+    batch_size: int,
+) -> Iterator[list[tuple[Any, ...]]]:
+    datetime_columns = {
+        name for name, column_type in table.columns if column_type == "datetime"
+    }
+    bytes_columns = {
+        name for name, column_type in table.columns if column_type == "bytes"
+    }
+    batch: list[tuple[Any, ...]] = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            for name in datetime_columns:
+                if rec[name] is not None:
+                    rec[name] = datetime.fromisoformat(rec[name])
+            for name in bytes_columns:
+                rec[name] = base64.b64decode(rec[name])
+            batch.append(tuple(rec[name] for name in table.column_names))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if batch:
+        yield batch
+
+
+def _read_parquet(
+    path: Path,
+    table: ArchiveTable,
+    batch_size: int,
+) -> Iterator[list[tuple[Any, ...]]]:
+    parquet_file = pyarrow.parquet.ParquetFile(path)
+    for record_batch in parquet_file.iter_batches(
+        batch_size=batch_size,
+        columns=table.column_names,
+    ):
+        columns = [column.to_pylist() for column in record_batch.columns]
+        yield list(zip(*columns))
+
+
+def _compress_content(
+    table: ArchiveTable,
+    batch: list[tuple[Any, ...]],
+) -> list[tuple[Any, ...]]:
+    content_index = table.column_names.index("content")
+    records: list[tuple[Any, ...]] = []
+    for rec in batch:
+        stored_content = compression.compress(rec[content_index])
+        records.append(
+            (
+                *rec[:content_index],
+                stored_content.text,
+                *rec[content_index + 1 :],
+                stored_content.data,
+                stored_content.codec,
+            )
+        )
+    return records
+
+
+async def _create_partitions(
+    db: _ArchiveDatabase,
+    batch: list[tuple[Any, ...]],
+) -> None:
+    """Create the monthly partitions a batch of thread messages will land in."""
+    created_at_index = THREAD_MESSAGES.column_names.index("created_at")
+    created_ats = [rec[created_at_index] for rec in batch]
+    await db.execute(
+        "SELECT create_thread_messages_partitions(:from_at, :to_at)",
+        {"from_at": min(created_ats), "to_at": max(created_ats)},
+    )
+
+
+def _find_archive(directory: Path, table: ArchiveTable) -> tuple[Path, ArchiveFormat]:
+    for format in ("jsonl", "parquet"):
+        path = archive_path(directory, table, format)
+        if path.exists():
+            return path, format
+
+    raise FileNotFoundError(f"No archive found for {table.name} in {directory}")
+
+
+async def import_(
+    db: _ArchiveDatabase,
+    directory: Path,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict[str, int]:
+    """\
+    Bulk load each table's archive, returning the rows loaded per table.
+
+    This is intended for loading into a fresh database; rows which
+    already exist will fail the table's import (which is atomic).
+    """
+    imported_rows: dict[str, int] = {}
+    for table in TABLES:
+        path, format = _find_archive(directory, table)
+        if format == "parquet" and pyarrow is None:
+            raise RuntimeError("Importing parquet requires the `pyarrow` package")
+
+        read = _read_jsonl if format == "jsonl" else _read_parquet
+        columns = table.column_names
+        if table.compressed_content:
+            columns += COMPRESSED_CONTENT_COLUMNS
+        progress = _Progress("import", table.name)
+        async with db.transaction():
+            for batch in read(path, table, batch_size):
+                if table is THREAD_MESSAGES:
+                    await _create_partitions(db, batch)
+                records = (
+                    _compress_content(table, batch)
+                    if table.compressed_content
+                    else batch
+                )
+                await db.copy_records_to_table(table.name, records, columns)
+                progress.add(len(batch))
+
+        progress.report("Import complete")
+        imported_rows[table.name] = progress.rows
+
+    # COPY bypasses the sequence, so move it past the imported ids
+    await db.execute(
+        """\
+        SELECT setval(
+            pg_get_serial_sequence('thread_messages', 'thread_message_id'),
+            GREATEST((SELECT MAX(thread_message_id) FROM thread_messages), 1)
+        )
+        """
+    )
+    return imported_rows
+
+
+# entrypoint
+
+
+def _utc_date(value: str) -> datetime:
+    return datetime.combine(
+        date.fromisoformat(value), datetime.min.time(), timezone.utc
+    )
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Bulk export & import of conversation data."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="export from the read db")
+    export_parser.add_argument("directory", type=Path)
+    export_parser.add_argument(
+        "--format", choices=["jsonl", "parquet"], default="jsonl"
+    )
+    export_parser.add_argument("--created-at-gte", type=_utc_date)
+    export_parser.add_argument("--created-at-lt", type=_utc_date)
+    export_parser.add_argument("--thread-id", type=int, action="append")
+    export_parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+
+    import_parser = subparsers.add_parser("import", help="import into the write db")
+    import_parser.add_argument("directory", type=Path)
+    import_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    return parser.parse_args()
+
+
+async def main() -> int:
+    args = _parse_args()
+
+    if args.command == "export":
+        db = _databases.read_database()
+        async with db:
+            await export(
+                db,
+                args.directory,
+                format=args.format,
+                filters=ExportFilters(
+                    created_at_gte=args.created_at_gte,
+                    created_at_lt=args.created_at_lt,
+                    thread_ids=args.thread_id,
+                ),
+                page_size=args.page_size,
+            )
+    else:
+        db = _databases.write_database()
+        async with db:
+            await import_(db, args.directory, batch_size=args.batch_size)
+
+    return 0
+
+
+if __name__ == "__main__":
+    log_listener = logger.configure(level=settings.LOG_LEVEL)
+    try:
+        raise SystemExit(asyncio.run(main()))
+    finally:
+        log_listener.stop()
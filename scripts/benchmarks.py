@@ -0,0 +1,276 @@
+# Benchmarks of the database read path.
+#
+#     python -m scripts.benchmarks deserialize [--rows N]
+#     python -m scripts.benchmarks adapters [--rows N] [--queries N]
+#
+# `deserialize` decodes N synthetic rows through each repository's
+# `deserialize`, compared with the validating pydantic models rows were
+# previously decoded into, and with the per-row dict copy which the
+# `databases` adapter makes of each record.
+#
+# `adapters` compares the `databases` & native asyncpg adapters against
+# the read database, fetching (& decoding) N generated rows at once, and
+# running many small queries one after another.
+import argparse
+import asyncio
+import time
+from collections.abc import Callable
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Any
+from typing import Literal
+
+from pydantic import BaseModel
+
+from app import compression
+from app import settings
+from app.adapters import database
+from app.adapters.openai.gpt import AIModel
+from app.repositories import thread_messages
+from app.repositories import threads
+
+DEFAULT_ROWS = 100_000
+DEFAULT_QUERIES = 10_000
+
+# thread message shaped rows, without depending on any data
+GENERATE_THREAD_MESSAGES_QUERY = """\
+    SELECT
+        i AS thread_message_id,
+        i / 100 AS thread_id,
+        'message ' || i AS content,
+        NULL::bytea AS compressed_content,
+        NULL::text AS content_codec,
+        1000 + i % 10 AS discord_user_id,
+        CASE WHEN i % 2 = 0 THEN 'user' ELSE 'assistant' END AS role,
+        i % 500 AS tokens_used,
+        NOW() + make_interval(secs => i) AS created_at
+    FROM generate_series(1, :rows) AS i
+"""
+POINT_QUERY = "SELECT CAST(:thread_id AS BIGINT) AS thread_id"
+
+
+class _ValidatingThreadMessage(BaseModel):
+    thread_message_id: int
+    thread_id: int
+    content: str
+    discord_user_id: int
+    role: Literal["user", "assistant"]
+    tokens_used: int
+    created_at: datetime
+
+
+class _ValidatingThread(BaseModel):
+    thread_id: int
+    initiator_user_id: int
+    model: AIModel
+    context_length: int
+    created_at: datetime
+    archived_at: datetime | None = None
+
+
+def _thread_message_recs(rows: int) -> list[dict[str, Any]]:
+    created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "thread_message_id": i,
+            "thread_id": i // 100,
+            "content": f"message {i}",
+            "compressed_content": None,
+            "content_codec": None,
+            "discord_user_id": 1000 + i % 10,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "tokens_used": i % 500,
+            "created_at": created_at + timedelta(seconds=i),
+        }
+        for i in range(rows)
+    ]
+
+
+def _thread_recs(rows: int) -> list[dict[str, Any]]:
+    created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "thread_id": i,
+            "initiator_user_id": 1000 + i % 10,
+            "model": AIModel.OPENAI_GPT_4_OMNI.value,
+            "context_length": 10,
+            "created_at": created_at + timedelta(seconds=i),
+            "archived_at": None,
+        }
+        for i in range(rows)
+    ]
+
+
+def _validate_thread_message(rec: Mapping[str, Any]) -> _ValidatingThreadMessage:
+    return _ValidatingThreadMessage(
+        thread_message_id=rec["thread_message_id"],
+        thread_id=rec["thread_id"],
+        content=compression.StoredContent(
+            text=rec["content"],
+            data=rec["compressed_content"],
+            codec=rec["content_codec"],
+        ).decode(),
+        discord_user_id=rec["discord_user_id"],
+        role=rec["role"],
+        tokens_used=rec["tokens_used"],
+        created_at=rec["created_at"],
+    )
+
+
+def _validate_thread(rec: Mapping[str, Any]) -> _ValidatingThread:
+    return _ValidatingThread(
+        thread_id=rec["thread_id"],
+        initiator_user_id=rec["initiator_user_id"],
+        model=AIModel(rec["model"]),
+        context_length=rec["context_length"],
+        created_at=rec["created_at"],
+        archived_at=rec["archived_at"],
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class BenchmarkResult:
+    name: str
+    # rows decoded, or queries run
+    operations: int
+    seconds: float
+
+
+def _benchmark(
+    name: str,
+    recs: list[dict[str, Any]],
+    decode: Callable[[dict[str, Any]], Any],
+) -> BenchmarkResult:
+    started_at = time.perf_counter()
+    for rec in recs:
+        decode(rec)
+    return BenchmarkResult(
+        name=name,
+        operations=len(recs),
+        seconds=time.perf_counter() - started_at,
+    )
+
+
+def benchmark_deserialize(rows: int) -> list[BenchmarkResult]:
+    thread_message_recs = _thread_message_recs(rows)
+    thread_recs = _thread_recs(rows)
+    return [
+        _benchmark("fetch_all dict copy", thread_message_recs, dict),
+        _benchmark(
+            "thread_messages pydantic",
+            thread_message_recs,
+            _validate_thread_message,
+        ),
+        _benchmark(
+            "thread_messages dataclass",
+            thread_message_recs,
+            thread_messages.deserialize,
+        ),
+        _benchmark("threads pydantic", thread_recs, _validate_thread),
+        _benchmark("threads dataclass", thread_recs, threads.deserialize),
+    ]
+
+
+def _read_database(scheme: str) -> database.Database:
+    return database.create(
+        database.dsn(
+            scheme=scheme,
+            user=settings.READ_DB_USER,
+            password=settings.READ_DB_PASS,
+            host=settings.READ_DB_HOST,
+            port=settings.READ_DB_PORT,
+            database=settings.READ_DB_NAME,
+        ),
+        db_ssl=settings.READ_DB_USE_SSL,
+        min_pool_size=1,
+        max_pool_size=1,
+        name="read",
+        slow_query_threshold_ms=settings.DB_SLOW_QUERY_THRESHOLD_MS,
+    )
+
+
+async def _benchmark_adapter(
+    name: str,
+    db: database.Database,
+    rows: int,
+    queries: int,
+) -> list[BenchmarkResult]:
+    # warm up the connection (and statement cache)
+    await db.fetch_all(GENERATE_THREAD_MESSAGES_QUERY, {"rows": 1})
+    await db.fetch_one(POINT_QUERY, {"thread_id": 0})
+
+    started_at = time.perf_counter()
+    recs = await db.fetch_all(GENERATE_THREAD_MESSAGES_QUERY, {"rows": rows})
+    for rec in recs:
+        thread_messages.deserialize(rec)
+    fetch_all_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    for thread_id in range(queries):
+        await db.fetch_one(POINT_QUERY, {"thread_id": thread_id})
+    fetch_one_seconds = time.perf_counter() - started_at
+
+    return [
+        BenchmarkResult(f"{name} fetch_all", rows, fetch_all_seconds),
+        BenchmarkResult(f"{name} fetch_one", queries, fetch_one_seconds),
+    ]
+
+
+async def benchmark_adapters(rows: int, queries: int) -> list[BenchmarkResult]:
+    results: list[BenchmarkResult] = []
+    for name, scheme in (
+        ("databases", "postgresql"),
+        ("asyncpg", database.ASYNCPG_SCHEME),
+    ):
+        async with _read_database(scheme) as db:
+            results.extend(await _benchmark_adapter(name, db, rows, queries))
+    return results
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    lines = [f"{'benchmark':<28}{'ops':>10}{'total':>14}{'per op':>14}"]
+    for result in results:
+        lines.append(
+            f"{result.name:<28}"
+            f"{result.operations:>10}"
+            f"{result.seconds * 1000:>11.1f} ms"
+            f"{result.seconds / max(result.operations, 1) * 1_000_000:>11.2f} us"
+        )
+    return "\n".join(lines)
+
+
+# entrypoint
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmarks of the database read path."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparser = subparsers.add_parser("deserialize")
+    subparser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+
+    subparser = subparsers.add_parser("adapters")
+    subparser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    subparser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+
+    return parser.parse_args()
+
+
+async def main() -> int:
+    args = _parse_args()
+
+    if args.command == "deserialize":
+        print(format_results(benchmark_deserialize(args.rows)))
+    else:
+        print(format_results(await benchmark_adapters(args.rows, args.queries)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
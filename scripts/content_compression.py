@@ -0,0 +1,326 @@
+# Maintenance of compressed message content, see app/compression.py.
+#
+#     python -m scripts.content_compression train [--sample-size N]
+#     python -m scripts.content_compression recompress [--batch-size N]
+#     python -m scripts.content_compression decompress [--batch-size N]
+#     python -m scripts.content_compression benchmark [--sample-size N]
+#
+# `train` samples recent messages into a new dictionary version, which new
+# writes use once deployed. `recompress` then (re)compresses existing rows
+# with it in batches, and `decompress` reverts all rows to plain text.
+# `benchmark` compares the storage saved against the cpu spent, per codec.
+import argparse
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timezone
+from typing import Any
+
+import zstandard
+
+from app import compression
+from app import logger
+from app import settings
+from app.adapters import database
+from scripts import _databases
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_SIZE = 10_000
+DEFAULT_BATCH_SIZE = 1000
+
+# paginated by primary key, which each partition has an index for
+REWRITE_QUERY = """\
+    SELECT thread_message_id, created_at, content, compressed_content, content_codec
+    FROM thread_messages
+    WHERE (thread_message_id, created_at) > (:after_thread_message_id, :after_created_at)
+    AND {predicate}
+    ORDER BY thread_message_id ASC, created_at ASC
+    LIMIT :limit
+"""
+RECOMPRESS_PREDICATE = """\
+    ((content_codec IS NULL AND octet_length(content) >= :threshold_bytes)
+     OR content_codec <> :codec)
+"""
+DECOMPRESS_PREDICATE = "content_codec IS NOT NULL"
+
+
+def _stored_content(rec: dict[str, Any]) -> compression.StoredContent:
+    return compression.StoredContent(
+        text=rec["content"],
+        data=rec["compressed_content"],
+        codec=rec["content_codec"],
+    )
+
+
+async def fetch_sample(db: database.Database, sample_size: int) -> list[str]:
+    recs = await db.fetch_all(
+        """\
+        SELECT content, compressed_content, content_codec
+        FROM thread_messages
+        WHERE created_at >= NOW() - INTERVAL '30 days'
+        LIMIT :limit
+        """,
+        {"limit": sample_size},
+    )
+    return [_stored_content(rec).decode() for rec in recs]
+
+
+# train
+
+
+def train(contents: list[str]) -> int:
+    """Train & save the next dictionary version, returning its version."""
+    versions = compression.dictionaries()
+    version = max(versions, default=0) + 1
+
+    compression.DICTIONARIES_PATH.mkdir(exist_ok=True)
+    dictionary_path = compression.DICTIONARIES_PATH / f"v{version}.zdict"
+    dictionary_path.write_bytes(
+        compression.train_dictionary([content.encode() for content in contents])
+    )
+    return version
+
+
+# recompress & decompress
+
+
+async def rewrite_content(
+    db: database.Database,
+    predicate: str,
+    values: dict[str, Any],
+    rewrite: Callable[[compression.StoredContent], compression.StoredContent],
+    batch_size: int,
+) -> None:
+    """Rewrite the stored content of matching rows, a batch at a time."""
+    query = REWRITE_QUERY.format(predicate=predicate)
+    values = {
+        **values,
+        "after_thread_message_id": 0,
+        "after_created_at": datetime.min.replace(tzinfo=timezone.utc),
+        "limit": batch_size,
+    }
+    rows = updated_rows = bytes_before = bytes_after = 0
+    started_at = time.perf_counter()
+    while recs := await db.fetch_all(query, values):
+        updates: list[dict[str, Any]] = []
+        for rec in recs:
+            stored_content = _stored_content(rec)
+            rewritten_content = rewrite(stored_content)
+            if rewritten_content == stored_content:
+                continue
+
+            bytes_before += _stored_size(stored_content)
+            bytes_after += _stored_size(rewritten_content)
+            updates.append(
+                {
+                    "thread_message_id": rec["thread_message_id"],
+                    "created_at": rec["created_at"],
+                    "content": rewritten_content.text,
+                    "compressed_content": rewritten_content.data,
+                    "content_codec": rewritten_content.codec,
+                }
+            )
+
+        if updates:
+            await db.execute_many(
+                """\
+                UPDATE thread_messages
+                SET content = :content,
+                    compressed_content = :compressed_content,
+                    content_codec = :content_codec
+                WHERE thread_message_id = :thread_message_id
+                AND created_at = :created_at
+                """,
+                updates,
+            )
+
+        rows += len(recs)
+        updated_rows += len(updates)
+        values["after_thread_message_id"] = recs[-1]["thread_message_id"]
+        values["after_created_at"] = recs[-1]["created_at"]
+
+        elapsed = time.perf_counter() - started_at
+        LOGGER.info(
+            "Rewrote stored content",
+            extra={
+                "rows": rows,
+                "updated_rows": updated_rows,
+                "bytes_before": bytes_before,
+                "bytes_after": bytes_after,
+                "rows_per_second": round(rows / elapsed) if elapsed else None,
+            },
+        )
+
+
+def _stored_size(stored_content: compression.StoredContent) -> int:
+    if stored_content.text is not None:
+        return len(stored_content.text.encode())
+    assert stored_content.data is not None
+    return len(stored_content.data)
+
+
+# benchmark
+
+
+@dataclass(frozen=True, slots=True)
+class BenchmarkResult:
+    codec: str
+    raw_bytes: int
+    stored_bytes: int
+    compress_seconds: float
+    decompress_seconds: float
+
+
+def _benchmark_codec(
+    codec: str,
+    raw_contents: list[bytes],
+    compressor: zstandard.ZstdCompressor,
+    decompressor: zstandard.ZstdDecompressor,
+) -> BenchmarkResult:
+    # mirrors compression.compress, which only compresses large content
+    compressed_contents: list[bytes] = []
+    stored_bytes = 0
+    started_at = time.perf_counter()
+    for raw_content in raw_contents:
+        if len(raw_content) < compression.COMPRESSION_THRESHOLD_BYTES:
+            stored_bytes += len(raw_content)
+            continue
+
+        compressed_content = compressor.compress(raw_content)
+        if len(compressed_content) < len(raw_content):
+            compressed_contents.append(compressed_content)
+            stored_bytes += len(compressed_content)
+        else:
+            stored_bytes += len(raw_content)
+    compress_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    for compressed_content in compressed_contents:
+        decompressor.decompress(compressed_content)
+    decompress_seconds = time.perf_counter() - started_at
+
+    return BenchmarkResult(
+        codec=codec,
+        raw_bytes=sum(len(raw_content) for raw_content in raw_contents),
+        stored_bytes=stored_bytes,
+        compress_seconds=compress_seconds,
+        decompress_seconds=decompress_seconds,
+    )
+
+
+def benchmark(contents: list[str]) -> list[BenchmarkResult]:
+    raw_contents = [content.encode() for content in contents]
+    results = [
+        _benchmark_codec(
+            compression.ZSTD_CODEC,
+            raw_contents,
+            zstandard.ZstdCompressor(level=compression.COMPRESSION_LEVEL),
+            zstandard.ZstdDecompressor(),
+        )
+    ]
+    for version, dictionary in sorted(compression.dictionaries().items()):
+        results.append(
+            _benchmark_codec(
+                compression.dictionary_codec(version),
+                raw_contents,
+                zstandard.ZstdCompressor(
+                    level=compression.COMPRESSION_LEVEL,
+                    dict_data=dictionary,
+                ),
+                zstandard.ZstdDecompressor(dict_data=dictionary),
+            )
+        )
+    return results
+
+
+def format_benchmark(results: list[BenchmarkResult], messages: int) -> str:
+    messages = max(messages, 1)
+    lines = [
+        f"{'codec':<16}{'stored':>12}{'saved':>8}{'compress':>16}{'decompress':>16}",
+    ]
+    for result in results:
+        saved = 1 - result.stored_bytes / result.raw_bytes if result.raw_bytes else 0
+        lines.append(
+            f"{result.codec:<16}"
+            f"{result.stored_bytes / 1024 / 1024:>8.2f} MiB"
+            f"{saved:>8.1%}"
+            f"{result.compress_seconds / messages * 1_000_000:>10.1f} us/msg"
+            f"{result.decompress_seconds / messages * 1_000_000:>10.1f} us/msg"
+        )
+    return "\n".join(lines)
+
+
+# entrypoint
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Maintenance of compressed message content, see app/compression.py."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command in ("train", "benchmark"):
+        subparser = subparsers.add_parser(command)
+        subparser.add_argument("--sample-size", type=int, default=DEFAULT_SAMPLE_SIZE)
+
+    for command in ("recompress", "decompress"):
+        subparser = subparsers.add_parser(command)
+        subparser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    return parser.parse_args()
+
+
+async def main() -> int:
+    args = _parse_args()
+
+    if args.command in ("train", "benchmark"):
+        async with _databases.read_database() as db:
+            contents = await fetch_sample(db, args.sample_size)
+
+        if args.command == "train":
+            version = train(contents)
+            LOGGER.info(
+                "Trained content dictionary",
+                extra={"version": version, "samples": len(contents)},
+            )
+        else:
+            print(format_benchmark(benchmark(contents), messages=len(contents)))
+
+    elif args.command == "recompress":
+        async with _databases.write_database() as db:
+            await rewrite_content(
+                db,
+                RECOMPRESS_PREDICATE,
+                {
+                    "threshold_bytes": compression.COMPRESSION_THRESHOLD_BYTES,
+                    "codec": compression.current_codec(),
+                },
+                lambda stored_content: compression.compress(stored_content.decode()),
+                batch_size=args.batch_size,
+            )
+
+    else:
+        async with _databases.write_database() as db:
+            await rewrite_content(
+                db,
+                DECOMPRESS_PREDICATE,
+                {},
+                lambda stored_content: compression.StoredContent(
+                    text=stored_content.decode()
+                ),
+                batch_size=args.batch_size,
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    log_listener = logger.configure(level=settings.LOG_LEVEL)
+    try:
+        raise SystemExit(asyncio.run(main()))
+    finally:
+        log_listener.stop()
@@ -16,7 +16,10 @@ if [[ "$APP_COMPONENT" == "tests" ]]; then
     FULL_DB_NAME="${WRITE_DB_NAME}_test"
 fi
 
-DB_DSN="${WRITE_DB_SCHEME}://${WRITE_DB_USER}:${WRITE_DB_PASS}@${WRITE_DB_HOST}:${WRITE_DB_PORT}/${FULL_DB_NAME}?x-migrations-table=${SEEDS_SCHEMA_TABLE}"
+# the app-only `asyncpg` scheme (see app/adapters/database.py) is plain postgres
+DB_SCHEME="${WRITE_DB_SCHEME/#asyncpg/postgresql}"
+
+DB_DSN="${DB_SCHEME}://${WRITE_DB_USER}:${WRITE_DB_PASS}@${WRITE_DB_HOST}:${WRITE_DB_PORT}/${FULL_DB_NAME}?x-migrations-table=${SEEDS_SCHEMA_TABLE}"
 if [[ $WRITE_DB_USE_SSL == "true" ]]; then
     DB_DSN="${DB_DSN}&sslmode=require"
 else
@@ -1,11 +1,20 @@
 import re
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from types import SimpleNamespace
 from typing import Any
 
 import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
 
 from app import openai_functions
+from app import tracing
 from app.adapters.openai import gpt
+from app.repositories import usage_ledger
 from app.usecases import ai_conversations
 
 
@@ -110,11 +119,15 @@ async def test_make_gpt_request_continues_responses_function_call(
         gpt.AIModel.OPENAI_GPT_5_4,
     )
 
-    assert result == ai_conversations._GptRequestResponse(
-        response_content="Tokyo is 22C.",
-        input_tokens=22,
-        output_tokens=6,
-    )
+    assert isinstance(result, ai_conversations._GptRequestResponse)
+    assert result.response_content == "Tokyo is 22C."
+    assert result.input_tokens == 22
+    assert result.output_tokens == 6
+    # each round is recorded separately in the usage ledger
+    assert [
+        (round_usage.round, round_usage.input_tokens, round_usage.output_tokens)
+        for round_usage in result.round_usages
+    ] == [(1, 10, 2), (2, 12, 4)]
     assert captured_context_items[0] == []
     assert captured_context_items[1] == [
         {
@@ -131,12 +144,28 @@ async def test_make_gpt_request_continues_responses_function_call(
     ]
 
 
+class _FakeWriteDatabase:
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        yield
+
+
 @pytest.mark.asyncio
 async def test_send_message_without_context_tracks_query_requester_cost(
     monkeypatch,
 ):
     created_threads: list[tuple[int, int, gpt.AIModel, int]] = []
     created_messages: list[dict[str, Any]] = []
+    usage_increments: list[dict[str, Any]] = []
+    ledger_entries: list[dict[str, Any]] = []
+    round_usage = usage_ledger.RoundUsage(
+        round=1,
+        input_tokens=31,
+        cached_input_tokens=16,
+        output_tokens=7,
+        reasoning_tokens=3,
+        latency_ms=850,
+    )
 
     async def fake_make_gpt_request(
         message_history: list[gpt.Message],
@@ -153,6 +182,8 @@ async def test_send_message_without_context_tracks_query_requester_cost(
             response_content="nothing notable",
             input_tokens=31,
             output_tokens=7,
+            cached_input_tokens=16,
+            round_usages=(round_usage,),
         )
 
     async def fake_threads_create(
@@ -180,6 +211,12 @@ async def test_send_message_without_context_tracks_query_requester_cost(
             }
         )
 
+    async def fake_usage_daily_increment(**kwargs: Any) -> None:
+        usage_increments.append(kwargs)
+
+    async def fake_usage_ledger_create_many(thread_id: int, **kwargs: Any) -> None:
+        ledger_entries.append({"thread_id": thread_id, **kwargs})
+
     monkeypatch.setattr(ai_conversations, "_make_gpt_request", fake_make_gpt_request)
     monkeypatch.setattr(ai_conversations.threads, "create", fake_threads_create)
     monkeypatch.setattr(
@@ -187,6 +224,22 @@ async def test_send_message_without_context_tracks_query_requester_cost(
         "create",
         fake_thread_messages_create,
     )
+    monkeypatch.setattr(
+        ai_conversations.usage_daily,
+        "increment",
+        fake_usage_daily_increment,
+    )
+    monkeypatch.setattr(
+        ai_conversations.usage_ledger,
+        "create_many",
+        fake_usage_ledger_create_many,
+    )
+    monkeypatch.setattr(
+        ai_conversations.state,
+        "write_database",
+        _FakeWriteDatabase(),
+        raising=False,
+    )
 
     bot = SimpleNamespace(user=SimpleNamespace(id=999))
     interaction = SimpleNamespace(
@@ -228,3 +281,56 @@ async def test_send_message_without_context_tracks_query_requester_cost(
             "tokens_used": 7,
         },
     ]
+    assert ledger_entries == [
+        {
+            "thread_id": 12345,
+            "discord_user_id": 285190493703503872,
+            "model": gpt.AIModel.OPENAI_GPT_5_4,
+            "provider": gpt.AIProvider.OPENAI,
+            "round_usages": (round_usage,),
+        }
+    ]
+    assert usage_increments == [
+        {
+            "discord_user_id": 285190493703503872,
+            "model": gpt.AIModel.OPENAI_GPT_5_4,
+            "input_tokens": 31,
+            "cached_input_tokens": 16,
+            "output_tokens": 7,
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_make_gpt_request_records_span_per_round(monkeypatch):
+    span_exporter = InMemorySpanExporter()
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(span_exporter))
+    monkeypatch.setattr(tracing, "tracer", tracer_provider.get_tracer(__name__))
+
+    async def fake_send(**kwargs: Any) -> gpt.AIResponse:
+        return gpt.AIResponse(
+            response_content="hi",
+            function_calls=[],
+            input_tokens=10,
+            output_tokens=3,
+            response_items=[],
+        )
+
+    monkeypatch.setattr(gpt, "send", fake_send)
+
+    await ai_conversations._make_gpt_request(
+        [{"role": "user", "content": [{"type": "text", "text": "hello"}]}],
+        gpt.AIModel.OPENAI_GPT_5_4,
+    )
+
+    spans = {span.name: span for span in span_exporter.get_finished_spans()}
+    round_span = spans["gpt.send"]
+    assert round_span.parent is not None
+    assert round_span.parent.span_id == spans["make_gpt_request"].context.span_id
+    assert round_span.attributes == {
+        "gen_ai.request.model": "gpt-5.4",
+        "app.round": 1,
+        "gen_ai.usage.input_tokens": 10,
+        "gen_ai.usage.output_tokens": 3,
+    }
@@ -0,0 +1,186 @@
+import gzip
+import json
+import re
+from contextlib import asynccontextmanager
+from datetime import datetime
+from datetime import timezone
+from typing import Any
+
+import pytest
+
+from app import compression
+from scripts import archive
+
+
+def _thread_message(thread_message_id: int) -> dict[str, Any]:
+    content = f"message {thread_message_id}"
+    if thread_message_id == 3:
+        content *= 100
+    stored_content = compression.compress(content)
+    return {
+        "thread_message_id": thread_message_id,
+        "thread_id": 1,
+        "content": stored_content.text,
+        "discord_user_id": None if thread_message_id % 2 else 2,
+        "role": "user",
+        "tokens_used": 3,
+        # pairs of messages share a created_at, so keyset ties must be broken
+        "created_at": datetime(
+            2026, 1, 1, 0, thread_message_id // 2, tzinfo=timezone.utc
+        ),
+        "compressed_content": stored_content.data,
+        "content_codec": stored_content.codec,
+    }
+
+
+class _FakeArchiveDatabase:
+    def __init__(self, tables: dict[str, list[dict[str, Any]]]) -> None:
+        self.tables = tables
+        self.queries: list[str] = []
+        self.copied: dict[str, list[tuple[Any, ...]]] = {}
+
+    async def fetch_all(
+        self,
+        query: str,
+        values: dict[str, Any],
+    ) -> list[dict[str, Any]]:
+        query = " ".join(query.split())
+        self.queries.append(query)
+        # the first FROM is the table's, rather than a subquery's
+        table_name = re.search(r"FROM (\w+)", query)[1]  # type: ignore[index]
+        table = next(t for t in archive.TABLES if t.name == table_name)
+        recs = sorted(
+            self.tables[table.name],
+            key=lambda rec: (rec["created_at"], rec[table.key]),
+        )
+        if "after_key" in values:
+            recs = [
+                rec
+                for rec in recs
+                if (rec["created_at"], rec[table.key])
+                > (values["after_created_at"], values["after_key"])
+            ]
+        return recs[: values["page_size"]]
+
+    async def execute(self, query: str, values: dict | None = None) -> None:
+        self.queries.append(" ".join(query.split()))
+
+    async def copy_records_to_table(
+        self,
+        table: str,
+        records: list[tuple[Any, ...]],
+        columns: list[str],
+    ) -> None:
+        self.copied.setdefault(table, []).extend(records)
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_export_pages_by_keyset_and_round_trips_through_import(tmp_path):
+    messages = [_thread_message(i) for i in range(1, 8)]
+    source = _FakeArchiveDatabase(
+        {"threads": [], "thread_messages": messages, "thread_message_archives": []}
+    )
+
+    exported_rows = await archive.export(
+        source,
+        tmp_path,
+        filters=archive.ExportFilters(thread_ids=[1]),
+        page_size=3,
+    )
+
+    assert exported_rows == {
+        "threads": 0,
+        "thread_messages": 7,
+        "thread_message_archives": 0,
+    }
+    message_queries = [q for q in source.queries if "FROM thread_messages" in q]
+    assert len(message_queries) == 3
+    assert "OFFSET" not in message_queries[-1]
+    assert (
+        "WHERE (created_at, thread_message_id) > (:after_created_at, :after_key) "
+        "AND thread_id = ANY(:thread_ids) "
+        "ORDER BY created_at ASC, thread_message_id ASC LIMIT :page_size"
+    ) in message_queries[-1]
+
+    # archives hold plain content, which is (re)compressed on import
+    with gzip.open(tmp_path / "thread_messages.jsonl.gz", "rt") as f:
+        assert json.loads(f.readlines()[2])["content"] == "message 3" * 100
+
+    destination = _FakeArchiveDatabase({})
+    imported_rows = await archive.import_(destination, tmp_path, batch_size=2)
+
+    assert imported_rows == {
+        "threads": 0,
+        "thread_messages": 7,
+        "thread_message_archives": 0,
+    }
+    assert destination.copied["thread_messages"] == [
+        tuple(message.values()) for message in messages
+    ]
+    # partitions are created ahead of each batch of messages
+    assert (
+        destination.queries.count(
+            "SELECT create_thread_messages_partitions(:from_at, :to_at)"
+        )
+        == 4
+    )
+    assert "setval" in destination.queries[-1]
+
+
+@pytest.mark.asyncio
+async def test_archived_threads_round_trip_with_their_message_archives(tmp_path):
+    created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    archived_at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    thread = {
+        "thread_id": 1,
+        "initiator_user_id": 2,
+        "model": "gpt-4o",
+        "context_length": 10,
+        "created_at": created_at,
+        "archived_at": archived_at,
+    }
+    thread_message_archive = {
+        "thread_id": 1,
+        "message_count": 2,
+        "messages": gzip.compress(b'{"thread_message_id": 1}\n' * 2),
+        "created_at": archived_at,
+    }
+    source = _FakeArchiveDatabase(
+        {
+            "threads": [thread],
+            "thread_messages": [],
+            "thread_message_archives": [thread_message_archive],
+        }
+    )
+
+    exported_rows = await archive.export(
+        source,
+        tmp_path,
+        filters=archive.ExportFilters(created_at_gte=created_at),
+    )
+
+    assert exported_rows == {
+        "threads": 1,
+        "thread_messages": 0,
+        "thread_message_archives": 1,
+    }
+    # archives are picked by when their thread was created
+    [archives_query] = [
+        q for q in source.queries if "FROM thread_message_archives" in q
+    ]
+    assert (
+        "WHERE thread_id IN (SELECT thread_id FROM threads"
+        " WHERE created_at >= :created_at_gte)"
+    ) in archives_query
+
+    destination = _FakeArchiveDatabase({})
+    await archive.import_(destination, tmp_path)
+
+    assert destination.copied["threads"] == [tuple(thread.values())]
+    assert destination.copied["thread_message_archives"] == [
+        tuple(thread_message_archive.values())
+    ]
@@ -0,0 +1,63 @@
+import random
+from collections.abc import Iterator
+
+import pytest
+
+from app import compression
+from scripts import content_compression
+
+
+def _clear_caches() -> None:
+    compression.dictionaries.cache_clear()
+    compression._compressor.cache_clear()
+    compression._decompressor.cache_clear()
+
+
+@pytest.fixture
+def dictionaries_path(tmp_path, monkeypatch) -> Iterator[None]:
+    monkeypatch.setattr(compression, "DICTIONARIES_PATH", tmp_path)
+    _clear_caches()
+    yield
+    _clear_caches()
+
+
+def _chat_messages(count: int) -> list[str]:
+    rng = random.Random(0)
+    words = "the model thread python async query token cost reply code".split()
+    return [
+        "assistant: Sure! Here's how you could do that:\n```python\n"
+        + "\n".join(
+            f"def {rng.choice(words)}_{i}():\n    return {rng.randint(0, 10**6)}"
+            for i in range(20)
+        )
+        + "\n```\nLet me know if you have any other questions!"
+        for _ in range(count)
+    ]
+
+
+def test_only_large_content_is_compressed(dictionaries_path):
+    small = compression.compress("hi")
+    assert small == compression.StoredContent(text="hi")
+
+    content = _chat_messages(1)[0]
+    large = compression.compress(content)
+    assert large.text is None
+    assert large.codec == compression.ZSTD_CODEC
+    assert large.decode() == content
+
+
+def test_trained_dictionaries_compress_better_and_stay_readable(dictionaries_path):
+    contents = _chat_messages(2000)
+    compressed_without_dictionary = compression.compress(contents[0])
+
+    version = content_compression.train(contents)
+    _clear_caches()
+
+    compressed = compression.compress(contents[0])
+    assert compressed.codec == compression.dictionary_codec(version)
+    assert compressed.decode() == contents[0]
+    # rows written before the dictionary existed are still readable
+    assert compressed_without_dictionary.decode() == contents[0]
+
+    zstd_result, dictionary_result = content_compression.benchmark(contents)
+    assert dictionary_result.stored_bytes < zstd_result.stored_bytes
@@ -1,11 +1,26 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
+from datetime import date
 from datetime import datetime
+from datetime import timezone
+from types import MappingProxyType
 from typing import Any
 
 import pytest
 
+from app import pagination
 from app import state
 from app.adapters import database
+from app.adapters.openai import gpt
 from app.repositories import thread_messages
+from app.repositories import threads
+from app.repositories import usage_daily
 
 
 class _FakePool:
@@ -33,10 +48,369 @@ async def test_database_connect_and_disconnect_call_pool_once():
     assert pool.disconnect_calls == 1
 
 
-class _FakeReadDatabase:
+def test_fingerprint_groups_queries_by_shape():
+    assert (
+        database.fingerprint(
+            """\
+        SELECT thread_id
+        FROM thread_messages
+        WHERE thread_id = :thread_id AND role IN ('user', 'assistant')
+        LIMIT 50
+    """
+        )
+        == (
+            "SELECT thread_id FROM thread_messages "
+            "WHERE thread_id = ? AND role IN (...) LIMIT ?"
+        )
+    )
+
+
+def test_positional_converts_named_parameters_once_per_name():
+    assert database.positional(
+        "SELECT * FROM t WHERE a = :a AND b::text = :b"
+        " AND c > :a AND d = ':not_a_parameter'"
+    ) == (
+        "SELECT * FROM t WHERE a = $1 AND b::text = $2"
+        " AND c > $1 AND d = ':not_a_parameter'",
+        ("a", "b"),
+    )
+
+
+def test_create_selects_adapter_by_scheme():
+    kwargs: dict[str, Any] = {
+        "db_ssl": False,
+        "min_pool_size": 1,
+        "max_pool_size": 1,
+        "name": "read",
+        "slow_query_threshold_ms": 250,
+    }
+
+    assert isinstance(
+        database.create("asyncpg://u:p@localhost:5432/db", **kwargs),
+        database.AsyncpgDatabase,
+    )
+    assert not isinstance(
+        database.create("postgresql://u:p@localhost:5432/db", **kwargs),
+        database.AsyncpgDatabase,
+    )
+
+
+def test_statement_timeout_is_set_per_connection():
+    db = database.create(
+        "postgresql://u:p@localhost:5432/db",
+        db_ssl=False,
+        min_pool_size=1,
+        max_pool_size=2,
+        name="analytics",
+        slow_query_threshold_ms=250,
+        statement_timeout_ms=30000,
+    )
+
+    connection_kwargs = db.pool._backend._get_connection_kwargs()  # type: ignore[attr-defined]
+    assert connection_kwargs["server_settings"] == {"statement_timeout": "30000"}
+
+
+class _FakeAsyncpgTransaction:
+    def __init__(self, statuses: list[str]) -> None:
+        self.statuses = statuses
+
+    async def start(self) -> None:
+        self.statuses.append("start")
+
+    async def commit(self) -> None:
+        self.statuses.append("commit")
+
+    async def rollback(self) -> None:
+        self.statuses.append("rollback")
+
+
+class _FakeAsyncpgConnection:
+    def __init__(self) -> None:
+        self.statuses: list[str] = []
+        self.queries: list[tuple[str, tuple[Any, ...]]] = []
+
+    def get_server_pid(self) -> int:
+        return id(self)
+
+    def transaction(self) -> _FakeAsyncpgTransaction:
+        return _FakeAsyncpgTransaction(self.statuses)
+
+    async def fetchval(self, query: str, *args: Any) -> None:
+        self.queries.append((query, args))
+
+    async def fetchrow(self, query: str, *args: Any) -> Mapping[str, Any]:
+        self.queries.append((query, args))
+        # like asyncpg's records, a mapping which isn't a dict
+        return MappingProxyType({"thread_id": 1})
+
+    async def fetch(self, query: str, *args: Any) -> list[Mapping[str, Any]]:
+        self.queries.append((query, args))
+        return [MappingProxyType({"thread_id": 1}), MappingProxyType({"thread_id": 2})]
+
+
+class _FakeAsyncpgPool:
+    def __init__(self) -> None:
+        self.connections: list[_FakeAsyncpgConnection] = []
+
+    @asynccontextmanager
+    async def acquire(
+        self,
+        timeout: float | None = None,
+    ) -> AsyncIterator[_FakeAsyncpgConnection]:
+        self.connections.append(_FakeAsyncpgConnection())
+        yield self.connections[-1]
+
+
+@pytest.mark.asyncio
+async def test_asyncpg_transactions_hold_one_connection_per_task():
+    db = database.create(
+        "asyncpg://u:p@localhost:5432/db",
+        db_ssl=False,
+        min_pool_size=1,
+        max_pool_size=1,
+        name="write",
+        slow_query_threshold_ms=250,
+    )
+    pool = _FakeAsyncpgPool()
+    db.pool = pool
+
+    query = "UPDATE t SET a = :a"
+    async with db.transaction():
+        await db.execute(query, {"a": 1})
+        await db.execute(query, {"a": 2})
+        # child tasks inherit our context, but mustn't share our connection
+        await asyncio.create_task(db.execute(query, {"a": 3}))
+
+    transaction_connection, child_task_connection = pool.connections
+    assert transaction_connection.statuses == ["start", "commit"]
+    assert transaction_connection.queries == [
+        ("UPDATE t SET a = $1", (1,)),
+        ("UPDATE t SET a = $1", (2,)),
+    ]
+    assert child_task_connection.queries == [("UPDATE t SET a = $1", (3,))]
+
+
+@pytest.mark.asyncio
+async def test_asyncpg_records_are_returned_as_dicts():
+    db = database.create(
+        "asyncpg://u:p@localhost:5432/db",
+        db_ssl=False,
+        min_pool_size=1,
+        max_pool_size=1,
+        name="read",
+        slow_query_threshold_ms=250,
+    )
+    db.pool = _FakeAsyncpgPool()
+
+    rec = await db.fetch_one("SELECT thread_id FROM threads LIMIT 1")
+    recs = await db.fetch_all("SELECT thread_id FROM threads")
+
+    assert type(rec) is dict
+    assert all(type(rec) is dict for rec in recs)
+    assert json.dumps(recs) == '[{"thread_id": 1}, {"thread_id": 2}]'
+
+
+@pytest.mark.asyncio
+async def test_adaptive_pools_resize_within_their_bounds():
+    db = database.create(
+        "asyncpg://u:p@localhost:5432/db",
+        db_ssl=False,
+        min_pool_size=1,
+        max_pool_size=4,
+        name="read",
+        slow_query_threshold_ms=250,
+        adaptive_pool_size=True,
+        acquire_timeout_seconds=0.01,
+    )
+    assert isinstance(db, database.AsyncpgDatabase)
+    db.pool = _FakeAsyncpgPool()
+
+    await db.resize(0)
+    assert db.pool_max_size() == 1
+
+    release = asyncio.Event()
+
+    async def hold_connection(held: asyncio.Event) -> None:
+        async with db.transaction():
+            held.set()
+            await release.wait()
+
+    async def start_holding_connection() -> asyncio.Task[None]:
+        held = asyncio.Event()
+        task = asyncio.create_task(hold_connection(held))
+        await held.wait()
+        return task
+
+    holders = [await start_holding_connection()]
+    # waiting on a full pool times out, rather than hanging
+    with pytest.raises(TimeoutError):
+        await db.execute("SELECT 1")
+
+    await db.resize(10)
+    assert db.pool_max_size() == 4
+    await db.execute("SELECT 1")
+
+    # never below the connections in use
+    holders.append(await start_holding_connection())
+    await db.resize(1)
+    assert db.pool_max_size() == 2
+
+    release.set()
+    await asyncio.gather(*holders)
+    await db.resize(1)
+    assert db.pool_max_size() == 1
+
+
+class _FakeExpiringAsyncpgConnection(_FakeAsyncpgConnection):
     def __init__(self) -> None:
+        super().__init__()
+        self.closed = False
+
+    def add_termination_listener(self, callback: Any) -> None:
+        self.termination_listener = callback
+
+    async def close(self, timeout: float | None = None) -> None:
+        self.closed = True
+        self.termination_listener(self)
+
+
+class _FakeExpiringAsyncpgPool(_FakeAsyncpgPool):
+    @asynccontextmanager
+    async def acquire(
+        self,
+        timeout: float | None = None,
+    ) -> AsyncIterator[_FakeAsyncpgConnection]:
+        yield self.connections[-1]
+
+
+@pytest.mark.asyncio
+async def test_connections_are_recycled_on_release_after_their_lifetime():
+    db = database.create(
+        "asyncpg://u:p@localhost:5432/db",
+        db_ssl=False,
+        min_pool_size=1,
+        max_pool_size=1,
+        name="read",
+        slow_query_threshold_ms=250,
+        max_connection_lifetime_seconds=60,
+    )
+    assert isinstance(db, database.AsyncpgDatabase)
+    connection = _FakeExpiringAsyncpgConnection()
+    pool = _FakeExpiringAsyncpgPool()
+    pool.connections.append(connection)
+    db.pool = pool  # type: ignore[assignment]
+    await db._init_connection(connection)  # type: ignore[arg-type]
+
+    await db.execute("SELECT 1")
+    assert not connection.closed
+
+    db._connections_expire_at[connection.get_server_pid()] = time.monotonic()
+    async with db.connection():
+        # not while it's in use
+        assert not connection.closed
+    assert connection.closed
+    assert db._connections_expire_at == {}
+
+
+def test_connection_lifetimes_need_the_asyncpg_adapter():
+    with pytest.raises(ValueError):
+        database.create(
+            "postgresql://u:p@localhost:5432/db",
+            db_ssl=False,
+            min_pool_size=1,
+            max_pool_size=1,
+            name="read",
+            slow_query_threshold_ms=250,
+            max_connection_lifetime_seconds=60,
+        )
+
+
+class _FakeRecord:
+    def __init__(self, mapping: dict[str, Any]) -> None:
+        self._mapping = mapping
+
+    def __getitem__(self, index: int) -> Any:
+        return list(self._mapping.values())[index]
+
+
+class _FakeConnection:
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.queries: list[str] = []
+
+    async def __aenter__(self) -> "_FakeConnection":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        return None
+
+    async def fetch_all(
+        self,
+        query: str,
+        values: dict[str, Any] | None = None,
+    ) -> list[_FakeRecord]:
+        self.queries.append(query)
+        if query.startswith("EXPLAIN"):
+            return [_FakeRecord({"QUERY PLAN": "Seq Scan on thread_messages"})]
+
+        await asyncio.sleep(self.delay)
+        return [_FakeRecord({"thread_id": 1}), _FakeRecord({"thread_id": 2})]
+
+
+class _FakeConnectionPool:
+    def __init__(self, connection: _FakeConnection) -> None:
+        self._connection = connection
+
+    def connection(self) -> _FakeConnection:
+        return self._connection
+
+
+@pytest.mark.asyncio
+async def test_database_logs_and_explains_slow_queries(caplog):
+    connection = _FakeConnection(delay=0.02)
+    db = object.__new__(database.Database)
+    db.pool = _FakeConnectionPool(connection)
+    db.name = "read"
+    db.slow_query_threshold_ms = 10
+    db.explain_slow_queries = True
+    db._explained_at = {}
+    db._background_tasks = set()
+    db._acquire_waits = deque()
+
+    with caplog.at_level(logging.WARNING, logger=database.__name__):
+        recs = await db.fetch_all(
+            "SELECT thread_id FROM thread_messages WHERE thread_id = :thread_id",
+            {"thread_id": 1},
+        )
+        await asyncio.gather(*db._background_tasks)
+
+    assert recs == [{"thread_id": 1}, {"thread_id": 2}]
+    slow_query_log, query_plan_log = caplog.records
+    assert slow_query_log.fingerprint == (  # type: ignore[attr-defined]
+        "SELECT thread_id FROM thread_messages WHERE thread_id = ?"
+    )
+    assert slow_query_log.rows == 2  # type: ignore[attr-defined]
+    assert query_plan_log.sequential_scan is True  # type: ignore[attr-defined]
+    assert connection.queries[-1].startswith("EXPLAIN SELECT thread_id")
+
+
+class _FakeDatabaseRouter:
+    def __init__(self, read_database: Any = None) -> None:
+        self.read_database = read_database
+        self.written_thread_ids: list[int] = []
+
+    def reader(self, thread_id: int | None = None) -> Any:
+        return self.read_database
+
+    def record_write(self, thread_id: int) -> None:
+        self.written_thread_ids.append(thread_id)
+
+
+class _FakeReadDatabase:
+    def __init__(self, recs: list[dict[str, Any]] | None = None) -> None:
         self.query: str | None = None
         self.values: dict[str, Any] | None = None
+        self.recs = recs or []
 
     async def fetch_all(
         self,
@@ -45,13 +419,15 @@ class _FakeReadDatabase:
     ) -> list[dict[str, Any]]:
         self.query = " ".join(query.split())
         self.values = values
-        return []
+        return self.recs
 
 
 @pytest.mark.asyncio
 async def test_thread_message_fetch_many_orders_before_pagination(monkeypatch):
     read_database = _FakeReadDatabase()
-    monkeypatch.setattr(state, "read_database", read_database, raising=False)
+    monkeypatch.setattr(
+        state, "database_router", _FakeDatabaseRouter(read_database), raising=False
+    )
     created_at_gte = datetime(2026, 1, 1)
 
     await thread_messages.fetch_many(
@@ -62,17 +438,17 @@ async def test_thread_message_fetch_many_orders_before_pagination(monkeypatch):
     )
 
     assert read_database.query is not None
-    assert (
-        "created_at >= :created_at_gte "
+    assert read_database.query.endswith(
+        "WHERE thread_id = :thread_id AND created_at >= :created_at_gte "
         "ORDER BY created_at ASC, thread_message_id ASC "
-        "LIMIT :page_size OFFSET :offset"
-    ) in read_database.query
+        "LIMIT :limit OFFSET :offset"
+    )
+    # filters which weren't given don't appear in the statement
+    assert "COALESCE" not in read_database.query
     assert read_database.values == {
         "thread_id": 123,
-        "discord_user_id": None,
-        "role": None,
         "created_at_gte": created_at_gte,
-        "page_size": 50,
+        "limit": 50,
         "offset": 50,
     }
 
@@ -80,7 +456,9 @@ async def test_thread_message_fetch_many_orders_before_pagination(monkeypatch):
 @pytest.mark.asyncio
 async def test_thread_message_fetch_many_can_page_latest_messages(monkeypatch):
     read_database = _FakeReadDatabase()
-    monkeypatch.setattr(state, "read_database", read_database, raising=False)
+    monkeypatch.setattr(
+        state, "database_router", _FakeDatabaseRouter(read_database), raising=False
+    )
 
     await thread_messages.fetch_many(
         thread_id=123,
@@ -92,12 +470,232 @@ async def test_thread_message_fetch_many_can_page_latest_messages(monkeypatch):
     assert read_database.query is not None
     assert (
         "ORDER BY created_at DESC, thread_message_id DESC "
-        "LIMIT :page_size OFFSET :offset"
+        "LIMIT :limit OFFSET :offset"
     ) in read_database.query
     assert read_database.values == {
         "thread_id": 123,
-        "discord_user_id": None,
-        "role": None,
-        "page_size": 10,
+        "limit": 10,
         "offset": 0,
     }
+
+
+def _thread_message_rec(thread_message_id: int) -> dict[str, Any]:
+    return {
+        "thread_message_id": thread_message_id,
+        "thread_id": 123,
+        "content": "hello",
+        "compressed_content": None,
+        "content_codec": None,
+        "discord_user_id": 1,
+        "role": "user",
+        "tokens_used": 1,
+        "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc),
+    }
+
+
+@pytest.mark.asyncio
+async def test_thread_message_fetch_page_seeks_past_cursor(monkeypatch):
+    read_database = _FakeReadDatabase(
+        recs=[_thread_message_rec(i) for i in (9, 8, 7)],
+    )
+    monkeypatch.setattr(
+        state, "database_router", _FakeDatabaseRouter(read_database), raising=False
+    )
+    after = pagination.encode_cursor(
+        pagination.Cursor(created_at=datetime(2026, 1, 2, tzinfo=timezone.utc), id=10)
+    )
+
+    page = await thread_messages.fetch_page(
+        thread_id=123,
+        page_size=2,
+        after=after,
+        sort_order="desc",
+    )
+
+    assert read_database.query is not None
+    assert (
+        "AND (created_at, thread_message_id) < "
+        "(:after_created_at, :after_thread_message_id) "
+        "ORDER BY created_at DESC, thread_message_id DESC LIMIT :limit"
+    ) in read_database.query
+    assert "OFFSET" not in read_database.query
+    assert read_database.values is not None
+    assert read_database.values["after_thread_message_id"] == 10
+    assert read_database.values["limit"] == 3
+    # the extra row is only used to detect a following page
+    assert [m.thread_message_id for m in page.items] == [9, 8]
+    assert page.next_cursor is not None
+    assert pagination.decode_cursor(page.next_cursor) == pagination.Cursor(
+        created_at=datetime(2026, 1, 1, tzinfo=timezone.utc), id=8
+    )
+
+
+def test_decode_cursor_rejects_malformed_tokens():
+    with pytest.raises(pagination.InvalidCursorError):
+        pagination.decode_cursor("not a cursor")
+
+
+@pytest.mark.asyncio
+async def test_thread_fetch_many_orders_before_pagination(monkeypatch):
+    read_database = _FakeReadDatabase()
+    monkeypatch.setattr(
+        state, "database_router", _FakeDatabaseRouter(read_database), raising=False
+    )
+
+    await threads.fetch_many(page=3, page_size=20)
+
+    assert read_database.query is not None
+    assert read_database.query.endswith(
+        "FROM threads "
+        "ORDER BY created_at ASC, thread_id ASC LIMIT :limit OFFSET :offset"
+    )
+    assert read_database.values == {"limit": 20, "offset": 40}
+
+
+@pytest.mark.asyncio
+async def test_idle_thread_ids_only_seek_past_a_given_cursor(monkeypatch):
+    read_database = _FakeReadDatabase()
+    monkeypatch.setattr(
+        state, "database_router", _FakeDatabaseRouter(read_database), raising=False
+    )
+    idle_before = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    await threads.fetch_idle_thread_ids(idle_before, limit=100)
+    assert read_database.query is not None
+    assert "thread_id >" not in read_database.query
+    assert read_database.values == {"idle_before": idle_before, "limit": 100}
+
+    await threads.fetch_idle_thread_ids(idle_before, limit=100, after_thread_id=5)
+    assert read_database.query.endswith(
+        "AND thread_id > :after_thread_id ORDER BY thread_id ASC LIMIT :limit"
+    )
+    assert read_database.values["after_thread_id"] == 5
+
+
+class _FakeWriteDatabaseFetchOne:
+    def __init__(self) -> None:
+        self.query: str | None = None
+        self.values: dict[str, Any] | None = None
+
+    async def fetch_one(self, query: str, values: dict[str, Any]) -> None:
+        self.query = query
+        self.values = values
+        return None
+
+
+@pytest.mark.asyncio
+async def test_thread_partial_update_only_sets_given_columns(monkeypatch):
+    write_database = _FakeWriteDatabaseFetchOne()
+    database_router = _FakeDatabaseRouter()
+    monkeypatch.setattr(state, "write_database", write_database, raising=False)
+    monkeypatch.setattr(state, "database_router", database_router, raising=False)
+
+    await threads.partial_update(123, context_length=20)
+
+    assert write_database.query is not None
+    assert write_database.query.startswith(
+        "UPDATE threads SET context_length = :context_length "
+        "WHERE thread_id = :thread_id RETURNING thread_id,"
+    )
+    assert write_database.values == {"context_length": 20, "thread_id": 123}
+    assert database_router.written_thread_ids == [123]
+
+    # the same combination of columns reuses the same statement text
+    query = write_database.query
+    await threads.partial_update(456, context_length=10)
+    assert write_database.query is query
+
+
+@pytest.mark.asyncio
+async def test_thread_message_token_usage_is_aggregated_in_sql(monkeypatch):
+    read_database = _FakeReadDatabase(
+        recs=[
+            {
+                "day": date(2026, 1, 2),
+                "requester_user_id": 1,
+                "model": "gpt-4o",
+                "input_tokens": 300,
+                "output_tokens": 120,
+            },
+        ]
+    )
+    monkeypatch.setattr(
+        state, "database_router", _FakeDatabaseRouter(read_database), raising=False
+    )
+
+    token_usages = await thread_messages.fetch_token_usage_per_requester(
+        thread_id=123,
+    )
+
+    assert read_database.query is not None
+    assert "INNER JOIN threads" in read_database.query
+    assert "GROUP BY day, requester_user_id, model" in read_database.query
+    assert "WHERE thread_messages.thread_id = :thread_id" in read_database.query
+    assert read_database.values == {"thread_id": 123}
+    assert token_usages == [
+        thread_messages.RequesterTokenUsage(
+            day=date(2026, 1, 2),
+            discord_user_id=1,
+            model=gpt.AIModel.OPENAI_GPT_4_OMNI,
+            input_tokens=300,
+            output_tokens=120,
+        )
+    ]
+
+    # absent filters are left out, rather than matched with a catch-all
+    await thread_messages.fetch_token_usage_per_requester()
+    assert "thread_id = :thread_id" not in read_database.query
+    assert read_database.values == {}
+
+
+class _FakeWriteDatabase:
+    def __init__(self) -> None:
+        self.query: str | None = None
+        self.values: dict[str, Any] | None = None
+
+    async def execute(self, query: str, values: dict[str, Any]) -> None:
+        self.query = " ".join(query.split())
+        self.values = values
+
+
+@pytest.mark.asyncio
+async def test_usage_daily_backfill_recomputes_completed_days(monkeypatch):
+    write_database = _FakeWriteDatabase()
+    monkeypatch.setattr(state, "write_database", write_database, raising=False)
+
+    await usage_daily.backfill(day_gte=date(2026, 1, 1), day_lt=date(2026, 1, 3))
+
+    assert write_database.query is not None
+    assert (
+        "WHERE thread_messages.created_at < :created_at_lt "
+        "AND thread_messages.thread_id IN ("
+    ) in write_database.query
+    # cached input tokens only come from incremental updates, so they're kept
+    assert write_database.query.endswith(
+        "input_tokens = EXCLUDED.input_tokens, "
+        "output_tokens = EXCLUDED.output_tokens"
+    )
+    assert write_database.values == {
+        "created_at_lt": datetime(2026, 1, 3, tzinfo=timezone.utc),
+        "created_at_gte": datetime(2026, 1, 1, tzinfo=timezone.utc),
+    }
+
+
+@pytest.mark.asyncio
+async def test_usage_daily_backfill_attributes_replies_across_midnight(monkeypatch):
+    write_database = _FakeWriteDatabase()
+    monkeypatch.setattr(state, "write_database", write_database, raising=False)
+
+    await usage_daily.backfill(day_gte=date(2026, 1, 2), day_lt=date(2026, 1, 3))
+
+    # a reply at 00:00:01 on the 2nd to a prompt at 23:59:59 on the 1st is
+    # attributed over the thread, and only then restricted to the days
+    assert write_database.query is not None
+    attributed_messages, rollups = write_database.query.split(
+        ") AS attributed_messages"
+    )
+    assert "LAG(thread_messages.discord_user_id)" in attributed_messages
+    assert "thread_messages.created_at >= :created_at_gte" not in (attributed_messages)
+    assert rollups.startswith(
+        " WHERE requester_user_id IS NOT NULL AND created_at >= :created_at_gte"
+    )
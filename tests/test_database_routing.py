@@ -0,0 +1,99 @@
+from typing import Any
+
+import pytest
+
+from app import database_routing
+
+
+class _FakeDatabase:
+    def __init__(self, name: str, result: Any = 0) -> None:
+        self.name = name
+        self.result = result
+        self.healthy = True
+
+    async def fetch_val(self, query: str, values: dict | None = None) -> Any:
+        if not self.healthy:
+            raise ConnectionError("database is down")
+        return self.result
+
+
+def _router(
+    primary: _FakeDatabase,
+    replica: _FakeDatabase,
+) -> database_routing.DatabaseRouter:
+    return database_routing.DatabaseRouter(
+        primary=primary,  # type: ignore[arg-type]
+        replica=replica,  # type: ignore[arg-type]
+        max_replica_lag_ms=1000,
+        read_your_writes_seconds=60,
+        health_check_interval_seconds=1,
+    )
+
+
+def test_reads_of_recently_written_threads_are_pinned_to_the_primary():
+    primary = _FakeDatabase("write")
+    replica = _FakeDatabase("read")
+    router = _router(primary, replica)
+
+    router.record_write(1)
+
+    assert router.reader(1) is primary
+    assert router.reader(2) is replica
+    assert router.reader() is replica
+
+
+@pytest.mark.asyncio
+async def test_reads_fall_back_to_the_primary_while_the_replica_is_unavailable():
+    primary = _FakeDatabase("write")
+    replica = _FakeDatabase("read")
+    router = _router(primary, replica)
+
+    replica.healthy = False
+    await router.check_health()
+    assert router.reader() is primary
+
+    replica.healthy = True
+    replica.result = 2.5  # seconds behind
+    await router.check_health()
+    assert router.replica_lag == 2.5
+    assert router.reader() is primary
+
+    replica.result = 0
+    await router.check_health()
+    assert router.reader() is replica
+
+
+@pytest.mark.asyncio
+async def test_pinned_reads_go_to_the_replica_while_the_primary_is_down():
+    primary = _FakeDatabase("write")
+    replica = _FakeDatabase("read")
+    router = _router(primary, replica)
+    router.record_write(1)
+
+    primary.healthy = False
+    await router.check_health()
+
+    assert router.primary_healthy is False
+    assert router.reader(1) is replica
+
+
+def test_reports_read_from_the_replica_through_the_analytics_pool():
+    primary = _FakeDatabase("write")
+    replica = _FakeDatabase("read")
+    analytics = _FakeDatabase("analytics")
+    router = database_routing.DatabaseRouter(
+        primary=primary,  # type: ignore[arg-type]
+        replica=replica,  # type: ignore[arg-type]
+        analytics=analytics,  # type: ignore[arg-type]
+        max_replica_lag_ms=1000,
+        read_your_writes_seconds=60,
+        health_check_interval_seconds=1,
+    )
+    router.record_write(1)
+
+    with database_routing.analytics():
+        assert router.reader() is analytics
+        # reports still see their thread's latest writes
+        assert router.reader(1) is primary
+
+    assert router.reader() is replica
@@ -0,0 +1,63 @@
+from typing import Any
+
+import pytest
+from aiohttp.test_utils import TestClient
+from aiohttp.test_utils import TestServer
+
+from app import http_server
+from app import metrics
+from app import state
+
+
+class _FakeDiscordClient:
+    def __init__(self, ready: bool) -> None:
+        self.ready = ready
+
+    def is_ready(self) -> bool:
+        return self.ready
+
+
+class _FakeDatabase:
+    def __init__(self, healthy: bool = True) -> None:
+        self.healthy = healthy
+
+    async def fetch_val(self, query: str, values: dict | None = None) -> Any:
+        if not self.healthy:
+            raise ConnectionError("database is down")
+        return 1
+
+
+@pytest.mark.asyncio
+async def test_ready_requires_discord_and_databases(monkeypatch):
+    discord_client = _FakeDiscordClient(ready=False)
+    read_database = _FakeDatabase(healthy=False)
+    monkeypatch.setattr(state, "read_database", read_database, raising=False)
+    monkeypatch.setattr(state, "write_database", _FakeDatabase(), raising=False)
+
+    app = http_server.create_app(discord_client)  # type: ignore[arg-type]
+    async with TestClient(TestServer(app)) as client:
+        response = await client.get("/_ready")
+        assert response.status == 503
+        assert (await response.json())["reason"] == "discord"
+
+        discord_client.ready = True
+        response = await client.get("/_ready")
+        assert response.status == 503
+        assert (await response.json())["reason"] == "database"
+
+        read_database.healthy = True
+        response = await client.get("/_ready")
+        assert response.status == 200
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_prometheus_metrics():
+    metrics.TOKENS_TOTAL.labels(model="gpt-5.4", direction="input").inc(5)
+
+    app = http_server.create_app(_FakeDiscordClient(ready=True))  # type: ignore[arg-type]
+    async with TestClient(TestServer(app)) as client:
+        response = await client.get("/metrics")
+        body = await response.text()
+
+    assert response.status == 200
+    assert 'ai_bot_tokens_total{direction="input",model="gpt-5.4"}' in body
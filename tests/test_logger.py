@@ -0,0 +1,54 @@
+import json
+import logging
+
+from opentelemetry.sdk.trace import TracerProvider
+
+from app import logger
+
+
+def _make_record(msg: str, level: int = logging.ERROR) -> logging.LogRecord:
+    return logging.LogRecord(__name__, level, __file__, 1, msg, None, None)
+
+
+def test_rate_limit_filter_samples_repeated_errors():
+    rate_limit_filter = logger.RateLimitFilter(
+        burst=3,
+        window_seconds=60,
+        sample_every=5,
+    )
+
+    allowed = [
+        rate_limit_filter.filter(_make_record("Provider request failed"))
+        for _ in range(10)
+    ]
+    assert allowed == [True, True, True, False, True, False, False, False, False, True]
+
+    # other messages & levels are counted separately
+    assert rate_limit_filter.filter(_make_record("Something else failed"))
+    assert rate_limit_filter.filter(
+        _make_record("Provider request failed", logging.INFO)
+    )
+
+    # the next sampled record reports how many were dropped since the last
+    records = [_make_record("Provider request failed") for _ in range(5)]
+    assert [rate_limit_filter.filter(record) for record in records][-1]
+    assert records[-1].suppressed == 4  # type: ignore[attr-defined]
+
+
+def test_json_formatter_includes_request_context():
+    tracer = TracerProvider().get_tracer(__name__)
+    record = _make_record("Slow database query", logging.WARNING)
+    record.duration_ms = 512.5
+
+    with (
+        tracer.start_as_current_span("send_message_to_thread") as span,
+        logger.bind(thread_id=1234),
+    ):
+        assert logger.ContextFilter().filter(record)
+
+    log = json.loads(logger.JsonFormatter().format(record))
+    assert log["level"] == "WARNING"
+    assert log["message"] == "Slow database query"
+    assert log["request_id"] == format(span.get_span_context().trace_id, "032x")
+    assert log["thread_id"] == 1234
+    assert log["duration_ms"] == 512.5
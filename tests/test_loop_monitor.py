@@ -0,0 +1,34 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from app import loop_monitor
+
+
+def _blocking_json_decode() -> None:
+    time.sleep(0.3)
+
+
+async def _handler() -> None:
+    await asyncio.sleep(0.05)
+    _blocking_json_decode()
+
+
+@pytest.mark.asyncio
+async def test_loop_monitor_reports_blocking_handler(caplog):
+    monitor = loop_monitor.LoopMonitor(threshold_ms=100)
+    monitor.start()
+    try:
+        with caplog.at_level(logging.WARNING, logger=loop_monitor.__name__):
+            await asyncio.create_task(_handler(), name="discord.py: on_message")
+            await asyncio.sleep(0.25)
+    finally:
+        await monitor.stop()
+
+    [record] = caplog.records
+    assert record.handler == "discord.py: on_message"  # type: ignore[attr-defined]
+    assert "_blocking_json_decode" in record.stack  # type: ignore[attr-defined]
+    assert record.blocked_ms >= 100  # type: ignore[attr-defined]
+    assert monitor.lag_quantile(0.99) >= 0.1
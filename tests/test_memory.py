@@ -0,0 +1,52 @@
+import tracemalloc
+
+from app import caches
+from app import memory
+
+
+def test_lru_cache_evicts_least_recently_used_past_maxsize():
+    cache: caches.LRUCache[str, int] = caches.LRUCache("test", maxsize=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1  # "b" is now least recently used
+
+    cache["c"] = 3
+
+    assert len(cache) == 2
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_expires_entries_past_ttl(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(caches.time, "monotonic", lambda: now)
+    cache: caches.LRUCache[str, int] = caches.LRUCache(
+        "test", maxsize=2, ttl_seconds=10
+    )
+    cache["a"] = 1
+
+    now += 10
+    assert cache.get("a") == 1
+
+    now += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_memory_report_diffs_allocations_between_reports(monkeypatch):
+    monkeypatch.setattr(memory, "_last_snapshot", None)
+    memory.register_cache("test", lambda: 42)
+
+    try:
+        first_report = memory.build_report(top_n=5)
+        retained = [bytearray(1024) for _ in range(1000)]
+        second_report = memory.build_report(top_n=5)
+    finally:
+        tracemalloc.stop()
+
+    assert first_report.cache_sizes["test"] == 42
+    assert len(first_report.object_counts) == 5
+    assert second_report.allocation_diff is not None
+    assert any("test_memory.py" in line for line in second_report.allocation_diff)
+    assert retained
@@ -7,10 +7,26 @@ import pytest
 from app.adapters.openai import gpt
 
 
+@dataclass
+class _FakeInputTokensDetails:
+    cached_tokens: int = 4
+
+
+@dataclass
+class _FakeOutputTokensDetails:
+    reasoning_tokens: int = 2
+
+
 @dataclass
 class _FakeUsage:
     input_tokens: int = 11
     output_tokens: int = 7
+    input_tokens_details: _FakeInputTokensDetails = field(
+        default_factory=_FakeInputTokensDetails
+    )
+    output_tokens_details: _FakeOutputTokensDetails = field(
+        default_factory=_FakeOutputTokensDetails
+    )
 
 
 class _FakeOutputItem:
@@ -70,7 +86,9 @@ async def test_openai_send_uses_responses_api_with_image_content(monkeypatch):
     ]
     assert response.response_content == "done"
     assert response.input_tokens == 11
+    assert response.cached_input_tokens == 4
     assert response.output_tokens == 7
+    assert response.reasoning_tokens == 2
 
 
 def test_function_call_output_item_uses_responses_call_id():
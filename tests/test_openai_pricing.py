@@ -0,0 +1,48 @@
+from datetime import date
+
+import pytest
+
+from app import openai_pricing
+from app.adapters.openai.gpt import AIModel
+
+
+def test_price_table_prices_every_model():
+    price_table = openai_pricing.load_price_table()
+
+    assert price_table.models() == set(AIModel)
+    assert openai_pricing.input_price_per_million_tokens(AIModel.OPENAI_GPT_5_4) == 2.5
+    assert openai_pricing.output_price_per_million_tokens(AIModel.OPENAI_GPT_5_4) == 15
+
+
+def test_cost_many_prices_usage_at_the_rates_of_the_time():
+    price_table = openai_pricing.PriceTable(
+        [
+            openai_pricing.ModelPrice(
+                model=AIModel.OPENAI_GPT_5_4,
+                effective_from=date(2026, 1, 1),
+                input=2.0,
+                cached_input=0.5,
+                output=10.0,
+            ),
+            openai_pricing.ModelPrice(
+                model=AIModel.OPENAI_GPT_5_4,
+                effective_from=date(2026, 3, 1),
+                input=1.0,
+                cached_input=0.25,
+                output=5.0,
+            ),
+        ]
+    )
+
+    costs = price_table.cost_many(
+        models=[AIModel.OPENAI_GPT_5_4] * 3,
+        days=[date(2025, 12, 31), date(2026, 2, 28), date(2026, 3, 1)],
+        input_tokens=[1_000_000, 1_000_000, 1_000_000],
+        cached_input_tokens=[0, 400_000, 400_000],
+        output_tokens=[100_000, 0, 0],
+    )
+
+    assert costs == pytest.approx([3.0, 1.4, 0.7])
+
+    with pytest.raises(NotImplementedError):
+        price_table.price_at(AIModel.DEEPSEEK_CHAT, date(2026, 1, 1))
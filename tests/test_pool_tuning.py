@@ -0,0 +1,69 @@
+import pytest
+
+from app import pool_tuning
+from app.adapters import database
+
+
+class _FakeAsyncpgPool:
+    def __init__(self, size: int, idle_size: int) -> None:
+        self.size = size
+        self.idle_size = idle_size
+
+    def get_size(self) -> int:
+        return self.size
+
+    def get_idle_size(self) -> int:
+        return self.idle_size
+
+
+def _database(pool: _FakeAsyncpgPool) -> database.AsyncpgDatabase:
+    db = database.create(
+        "asyncpg://u:p@localhost:5432/db",
+        db_ssl=False,
+        min_pool_size=2,
+        max_pool_size=10,
+        name="read",
+        slow_query_threshold_ms=250,
+        adaptive_pool_size=True,
+    )
+    assert isinstance(db, database.AsyncpgDatabase)
+    db.pool = pool  # type: ignore[assignment]
+    return db
+
+
+def _tuner(db: database.Database) -> pool_tuning.PoolTuner:
+    return pool_tuning.PoolTuner(
+        databases=[db],
+        target_acquire_wait_ms=50,
+        interval_seconds=10,
+    )
+
+
+@pytest.mark.asyncio
+async def test_pools_grow_while_acquires_wait_too_long():
+    pool = _FakeAsyncpgPool(size=2, idle_size=0)
+    db = _database(pool)
+    tuner = _tuner(db)
+    await db.resize(db.min_pool_size)
+
+    for max_size in (3, 4, 6, 9, 10, 10):
+        db._acquire_waits.extend([0.2] * 10)
+        await tuner.tune()
+        assert db.pool_max_size() == max_size
+
+
+@pytest.mark.asyncio
+async def test_pools_shrink_while_connections_sit_idle():
+    pool = _FakeAsyncpgPool(size=4, idle_size=2)
+    db = _database(pool)
+    tuner = _tuner(db)
+    await db.resize(4)
+
+    # a (rare) slow acquire holds the pool at its size
+    db._acquire_waits.extend([0.001] * 99 + [0.2])
+    await tuner.tune()
+    assert db.pool_max_size() == 4
+
+    for max_size in (3, 2, 2):
+        await tuner.tune()
+        assert db.pool_max_size() == max_size
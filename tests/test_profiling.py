@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+import pytest
+
+from app import profiling
+
+
+async def _busy_handler() -> None:
+    while True:
+        time.sleep(0.005)  # block the loop, like a synchronous call would
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_profile_samples_loop_and_tasks():
+    busy_task = asyncio.create_task(_busy_handler())
+    try:
+        result = await profiling.profile(0.3)
+    finally:
+        busy_task.cancel()
+
+    assert result is not None
+    assert result.loop_samples > 0
+    assert "_busy_handler" in result.loop_stacks
+    assert "_busy_handler" in dict(result.top_coroutines)
+    for line in result.task_stacks.splitlines():
+        stack, count = line.rsplit(" ", maxsplit=1)
+        assert stack
+        assert int(count) > 0
+
+
+@pytest.mark.asyncio
+async def test_profile_allows_one_session_at_a_time():
+    first_session = asyncio.create_task(profiling.profile(0.2))
+    await asyncio.sleep(0)
+
+    assert await profiling.profile(0.2) is None
+    assert await first_session is not None
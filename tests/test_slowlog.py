@@ -0,0 +1,84 @@
+import time
+from datetime import datetime
+from datetime import timedelta
+
+from opentelemetry.sdk.trace import TracerProvider
+
+from app import slowlog
+
+
+def _record(duration_seconds: float, started_at: datetime) -> slowlog.RequestRecord:
+    return slowlog.RequestRecord(
+        kind="mention",
+        started_at=started_at,
+        duration_seconds=duration_seconds,
+        stages=[],
+        attributes={},
+    )
+
+
+def test_slow_request_log_keeps_slowest_recent_requests():
+    log = slowlog.SlowRequestLog(size=2, window=timedelta(hours=1))
+    now = datetime.now()
+
+    log.add(_record(5.0, now - timedelta(hours=2)))  # outside the window
+    log.add(_record(1.0, now))
+    log.add(_record(3.0, now))
+    log.add(_record(2.0, now))
+
+    assert [record.duration_seconds for record in log.slowest()] == [3.0, 2.0]
+    assert not log.is_slow(1.5)
+    assert log.is_slow(2.5)
+
+
+def test_expired_slow_requests_make_room_for_new_ones():
+    log = slowlog.SlowRequestLog(size=2, window=timedelta(milliseconds=50))
+    log.add(_record(30.0, datetime.now()))
+    log.add(_record(20.0, datetime.now()))
+    assert not log.is_slow(1.0)
+
+    time.sleep(0.1)
+
+    assert log.is_slow(1.0)
+
+
+def test_record_request_captures_stages_and_attributes(monkeypatch):
+    monkeypatch.setattr(
+        slowlog,
+        "slow_requests",
+        slowlog.SlowRequestLog(size=5, window=timedelta(hours=1)),
+    )
+    provider = TracerProvider()
+    provider.add_span_processor(slowlog.SpanRecorder())
+    tracer = provider.get_tracer(__name__)
+
+    with slowlog.record_request("query"):
+        with tracer.start_as_current_span(
+            "send_message_without_context",
+            attributes={"gen_ai.request.model": "gpt-4o"},
+        ) as request_span:
+            with tracer.start_as_current_span("gpt.send", attributes={"app.round": 1}):
+                time.sleep(0.01)
+            with tracer.start_as_current_span(
+                "ai_function", attributes={"app.ai_function": "get_weather"}
+            ):
+                pass
+            with tracer.start_as_current_span("persist_messages"):
+                pass
+            request_span.set_attribute("app.chunks", 2)
+
+    # requests without any spans (e.g. ignored messages) aren't recorded
+    with slowlog.record_request("mention"):
+        pass
+
+    (record,) = slowlog.slow_requests.slowest()
+    assert record.kind == "query"
+    assert record.attributes == {"gen_ai.request.model": "gpt-4o", "app.chunks": 2}
+    assert [stage.name for stage in record.stages] == [
+        "send_message_without_context",
+        "gpt.send (round 1)",
+        "ai_function (get_weather)",
+        "persist_messages",
+    ]
+    assert record.stages[1].duration_seconds >= 0.01
+    assert record.duration_seconds >= record.stages[0].duration_seconds
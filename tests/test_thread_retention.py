@@ -0,0 +1,197 @@
+import gzip
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from datetime import date
+from datetime import datetime
+from datetime import timezone
+from typing import Any
+
+import pytest
+from pydantic import ValidationError
+
+from app import compression
+from app import state
+from app.adapters.openai.gpt import AIModel
+from app.repositories.thread_message_archives import ThreadMessageArchive
+from app.repositories.thread_messages import RequesterTokenUsage
+from app.repositories.thread_messages import ThreadMessage
+from app.repositories.threads import Thread
+from app.usecases import thread_retention
+
+
+class _FakeWriteDatabase:
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        yield
+
+
+def _message(thread_message_id: int) -> ThreadMessage:
+    return ThreadMessage(
+        thread_message_id=thread_message_id,
+        thread_id=1,
+        stored_content=compression.StoredContent(text=f"message {thread_message_id}"),
+        discord_user_id=2,
+        role="user",
+        tokens_used=3,
+        created_at=datetime(2025, 1, thread_message_id, tzinfo=timezone.utc),
+    )
+
+
+@pytest.mark.asyncio
+async def test_archived_threads_are_rehydrated_when_resumed(monkeypatch):
+    monkeypatch.setattr(state, "write_database", _FakeWriteDatabase(), raising=False)
+    hot_messages = [_message(i) for i in range(1, 4)]
+    archives: dict[int, ThreadMessageArchive] = {}
+    thread = Thread(
+        thread_id=1,
+        initiator_user_id=2,
+        model=AIModel.OPENAI_GPT_4_OMNI,
+        context_length=5,
+        created_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+
+    async def fake_mark_archived(thread_id: int, idle_before: datetime) -> Thread:
+        return replace(thread, archived_at=idle_before)
+
+    async def fake_mark_unarchived(thread_id: int) -> None:
+        return None
+
+    async def fake_iterate_many(thread_id: int) -> AsyncIterator[ThreadMessage]:
+        for message in hot_messages:
+            yield message
+
+    async def fake_delete_many(thread_id: int, thread_message_id_lte: int) -> None:
+        hot_messages[:] = [
+            m for m in hot_messages if m.thread_message_id > thread_message_id_lte
+        ]
+
+    async def fake_create_many(messages: list[ThreadMessage]) -> None:
+        hot_messages.extend(messages)
+
+    async def fake_create_partitions_covering(**kwargs: Any) -> None:
+        return None
+
+    async def fake_archive_create(
+        thread_id: int,
+        message_count: int,
+        messages: bytes,
+    ) -> ThreadMessageArchive:
+        archives[thread_id] = ThreadMessageArchive(
+            thread_id=thread_id,
+            message_count=message_count,
+            messages=messages,
+            created_at=datetime.now(timezone.utc),
+        )
+        return archives[thread_id]
+
+    async def fake_archive_delete(thread_id: int) -> ThreadMessageArchive | None:
+        return archives.pop(thread_id, None)
+
+    threads = thread_retention.threads
+    thread_messages = thread_retention.thread_messages
+    thread_message_archives = thread_retention.thread_message_archives
+    monkeypatch.setattr(threads, "mark_archived", fake_mark_archived)
+    monkeypatch.setattr(threads, "mark_unarchived", fake_mark_unarchived)
+    monkeypatch.setattr(thread_messages, "iterate_many", fake_iterate_many)
+    monkeypatch.setattr(thread_messages, "delete_many", fake_delete_many)
+    monkeypatch.setattr(thread_messages, "create_many", fake_create_many)
+    monkeypatch.setattr(
+        thread_messages,
+        "create_partitions_covering",
+        fake_create_partitions_covering,
+    )
+    monkeypatch.setattr(thread_message_archives, "create", fake_archive_create)
+    monkeypatch.setattr(thread_message_archives, "delete", fake_archive_delete)
+
+    original_messages = list(hot_messages)
+    archived = await thread_retention.archive_thread(
+        1, idle_before=datetime(2025, 6, 1, tzinfo=timezone.utc)
+    )
+
+    assert archived is True
+    assert hot_messages == []
+    assert archives[1].message_count == 3
+
+    # unarchived threads are left alone
+    await thread_retention.ensure_hydrated(thread)
+    assert hot_messages == []
+
+    await thread_retention.ensure_hydrated(
+        replace(thread, archived_at=datetime.now(timezone.utc))
+    )
+    assert hot_messages == original_messages
+    assert archives == {}
+
+
+def test_archives_are_validated_when_decoded():
+    messages = [_message(i) for i in range(1, 3)]
+    assert (
+        thread_retention.decode_messages(thread_retention.encode_messages(messages))
+        == messages
+    )
+
+    invalid_archive = gzip.compress(b'{"thread_message_id": "x"}\n')
+    with pytest.raises(ValidationError):
+        thread_retention.decode_messages(invalid_archive)
+
+
+@pytest.mark.asyncio
+async def test_archived_token_usage_is_read_without_rehydrating(monkeypatch):
+    prompt = replace(
+        _message(1),
+        created_at=datetime(2025, 1, 1, 23, 59, 59, tzinfo=timezone.utc),
+    )
+    # the reply lands after midnight, yet is still attributed to the prompter
+    reply = replace(
+        _message(2),
+        discord_user_id=9,
+        role="assistant",
+        tokens_used=7,
+        created_at=datetime(2025, 1, 2, 0, 0, 1, tzinfo=timezone.utc),
+    )
+    archive = ThreadMessageArchive(
+        thread_id=1,
+        message_count=2,
+        messages=thread_retention.encode_messages([prompt, reply]),
+        created_at=datetime.now(timezone.utc),
+    )
+
+    async def fake_archive_fetch_one(thread_id: int) -> ThreadMessageArchive:
+        return archive
+
+    async def fake_archive_delete(thread_id: int) -> None:
+        raise AssertionError("reports mustn't rehydrate archived threads")
+
+    thread_message_archives = thread_retention.thread_message_archives
+    monkeypatch.setattr(thread_message_archives, "fetch_one", fake_archive_fetch_one)
+    monkeypatch.setattr(thread_message_archives, "delete", fake_archive_delete)
+    thread = Thread(
+        thread_id=1,
+        initiator_user_id=2,
+        model=AIModel.OPENAI_GPT_4_OMNI,
+        context_length=5,
+        created_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        archived_at=datetime(2025, 6, 1, tzinfo=timezone.utc),
+    )
+
+    token_usages = await thread_retention.fetch_archived_token_usage_per_requester(
+        thread
+    )
+
+    assert token_usages == [
+        RequesterTokenUsage(
+            day=date(2025, 1, 1),
+            discord_user_id=2,
+            model=AIModel.OPENAI_GPT_4_OMNI,
+            input_tokens=3,
+            output_tokens=0,
+        ),
+        RequesterTokenUsage(
+            day=date(2025, 1, 2),
+            discord_user_id=2,
+            model=AIModel.OPENAI_GPT_4_OMNI,
+            input_tokens=0,
+            output_tokens=7,
+        ),
+    ]
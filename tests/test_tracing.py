@@ -0,0 +1,21 @@
+import json
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+from app import tracing
+
+
+def test_file_exports_are_closed_on_shutdown(tmp_path):
+    export_path = tmp_path / "spans.jsonl"
+    exporter = tracing._FileSpanExporter(str(export_path))
+    provider = TracerProvider()
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+
+    with provider.get_tracer(__name__).start_as_current_span("request"):
+        pass
+    provider.shutdown()
+
+    assert exporter.out.closed
+    spans = [json.loads(line) for line in export_path.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["request"]
@@ -0,0 +1,63 @@
+import gzip
+import os
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+from datetime import datetime
+
+import pytest
+
+from app import compression
+from app import transcripts
+from app.repositories.thread_messages import ThreadMessage
+
+
+async def _messages(
+    count: int,
+    content: Callable[[], str] = lambda: "xxxxxxxxxx",
+) -> AsyncIterator[ThreadMessage]:
+    for i in range(count):
+        yield ThreadMessage(
+            thread_message_id=i,
+            thread_id=1,
+            stored_content=compression.StoredContent(text=f"{i}:{content()}"),
+            discord_user_id=2,
+            role="user",
+            tokens_used=1,
+            created_at=datetime(2026, 1, 1),
+        )
+
+
+@pytest.mark.asyncio
+async def test_small_transcripts_are_sent_as_plain_text():
+    transcript = await transcripts.write(_messages(3))
+
+    (part,) = transcripts.split(transcript, size_limit=10 * 1024 * 1024)
+
+    assert part.filename == "transcript.txt"
+    assert part.file.read().decode().splitlines() == [
+        f"[01/01/2026 12:00:00AM] {i}:xxxxxxxxxx" for i in range(3)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_large_transcripts_are_compressed_and_split():
+    # random content, so that compression can't keep it within one part
+    transcript = await transcripts.write(
+        _messages(2000, content=lambda: os.urandom(500).hex())
+    )
+    original = transcript.read()
+    transcript.seek(0)
+
+    parts = transcripts.split(transcript, size_limit=256 * 1024)
+
+    assert len(parts) > 1
+    assert [part.filename for part in parts[:2]] == [
+        "transcript.part1.txt.gz",
+        "transcript.part2.txt.gz",
+    ]
+    decompressed = b""
+    for part in parts:
+        compressed = part.file.read()
+        assert len(compressed) <= 256 * 1024
+        decompressed += gzip.decompress(compressed)
+    assert decompressed == original